@@ -5,56 +5,229 @@ import io
 import pandas as pd
 import boto3
 import os
+from concurrent.futures import ThreadPoolExecutor
+from sidecars import read_sidecar, write_sidecar, normalize_etag
+from column_stats import read_column_stats
+from job_sizing import FLOW_SIZING_KEYS, dataset_footprint, size_flow_job
+from flow_sampling import SAMPLING_STRATEGIES, PRECOMPUTED_STRATEGIES, sampling_config, precompute_sample
+from flow_transforms import parse_transform_steps, compile_transform_nodes
 
 # Environment variables
 CONTAINER_URI = os.environ.get(
     'CONTAINER_URI', '663277389841.dkr.ecr.us-east-1.amazonaws.com/sagemaker-data-wrangler-container:5.0.9')
 FLOW_S3_BUCKET = os.environ.get('BUCKET_NAME')
 FLOW_S3_PREFIX = os.environ.get('S3_DATA_PREFIX', 'flows')
+# Fallback job resources when the dataset cannot be sized
 INSTANCE_TYPE = os.environ.get('INSTANCE_TYPE', 'ml.m5.4xlarge')
 INSTANCE_COUNT = int(os.environ.get('INSTANCE_COUNT', '2'))
 SAMPLE_SIZE = int(os.environ.get('SAMPLE_SIZE', '50000'))
+# Byte ranges sampled across the object for schema inference. The ranges are fetched
+# concurrently, so the total read stays close to the previous single 1 MB request.
+SCHEMA_SAMPLE_RANGES = int(os.environ.get('SCHEMA_SAMPLE_RANGES', '8'))
+SCHEMA_SAMPLE_RANGE_BYTES = int(
+    os.environ.get('SCHEMA_SAMPLE_RANGE_BYTES', str(128 * 1024)))
 
 s3 = boto3.client("s3")
+logger = logging.getLogger()
 
+# Schemas of objects seen by this container, keyed by (bucket, key) and tagged with the
+# ETag they were inferred from
+_schema_cache = {}
 
-def generate_schema_from_s3(bucket, key, sample_rows=1000):
-    # Get just the first chunk of the file using byte range
-    try:
-        # Request first ~1MB of data (or adjust size as needed)
-        response = s3.get_object(
-            Bucket=bucket,
-            Key=key,
-            Range='bytes=0-1048576'  # First 1MB
-        )
 
-        # Read the chunk into pandas
-        chunk = pd.read_csv(
-            io.BytesIO(response['Body'].read()),
-            nrows=sample_rows  # Limit rows
-        )
+# Type mapping from pandas dtypes to Data Wrangler types
+TYPE_MAPPING = {
+    'object': 'string',
+    'int64': 'long',
+    'float64': 'float',
+    'datetime64[ns]': 'datetime'
+}
+
+# When ranges disagree the most general type wins
+TYPE_PRECEDENCE = ['long', 'float', 'datetime', 'string']
 
-        # Type mapping
-        type_mapping = {
-            'object': 'string',
-            'int64': 'long',
-            'float64': 'float',
-            'datetime64[ns]': 'datetime'
-        }
 
-        # Generate schema directly from data types
-        schema = {}
+def fetch_range(bucket, key, start, end):
+    return s3.get_object(
+        Bucket=bucket,
+        Key=key,
+        Range=f'bytes={start}-{end}'
+    )
+
+
+def parse_range(body, header_line, is_last, sample_rows):
+    """
+    Parse one byte range as CSV rows.
+
+    Ranges rarely start or end on a row boundary, so the first line (the header, or a
+    partial row) and the partial last line (unless the range ends the object) are
+    dropped before parsing. Returns the parsed rows and the byte size of the complete
+    lines, which is used to estimate the row count of the object.
+    """
+    lines = body.split(b'\n')[1:]
+    if not is_last:
+        lines = lines[:-1]
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return None, 0, 0
+    chunk = pd.read_csv(
+        io.BytesIO(header_line + b'\n' + b'\n'.join(lines)),
+        nrows=sample_rows,
+        on_bad_lines='skip'
+    )
+    return chunk, len(lines), sum(len(line) + 1 for line in lines)
+
+
+def merge_type_evidence(chunks):
+    """
+    Merge per-column types observed in each sampled range.
+
+    Columns that are entirely null in a range carry no evidence for that range, so a
+    column that is empty at the head of the file takes its type from later ranges.
+    """
+    evidence = {}
+    columns = []
+    for chunk in chunks:
         for column in chunk.columns:
+            if column not in evidence:
+                evidence[column] = set()
+                columns.append(column)
+            values = chunk[column].dropna()
+            if values.empty:
+                continue
             dtype = str(chunk[column].dtype)
-            schema[column] = type_mapping.get(dtype, 'string')
+            # Integer columns with nulls are parsed as float64
+            if dtype == 'float64' and len(values) < len(chunk[column]) \
+                    and (values == values.round()).all():
+                dtype = 'int64'
+            evidence[column].add(TYPE_MAPPING.get(dtype, 'string'))
+
+    schema = {}
+    for column in columns:
+        types = evidence[column]
+        if not types:
+            schema[column] = 'string'
+        elif types <= {'long', 'float'}:
+            schema[column] = max(types, key=TYPE_PRECEDENCE.index)
+        elif len(types) == 1:
+            schema[column] = types.pop()
+        else:
+            schema[column] = 'string'
+    return schema
+
+
+def generate_schema_from_s3(bucket, key, sample_rows=1000):
+    """
+    Infer the flow schema from byte ranges spread across the whole object.
+
+    The first range provides the header and the object size; the remaining ranges are
+    fetched concurrently and their type evidence is merged per column. A small profile
+    with the object size and an estimated row count is returned alongside the schema.
+    """
+    try:
+        first = fetch_range(bucket, key, 0, SCHEMA_SAMPLE_RANGE_BYTES - 1)
+        first_body = first['Body'].read()
+        # ContentRange looks like "bytes 0-131071/52428800"
+        content_range = first.get('ContentRange')
+        object_size = int(content_range.split('/')[-1]) if content_range else len(first_body)
+        header_line = first_body.split(b'\n', 1)[0].rstrip(b'\r')
+
+        ranges = []
+        if object_size > SCHEMA_SAMPLE_RANGE_BYTES and SCHEMA_SAMPLE_RANGES > 1:
+            step = (object_size - SCHEMA_SAMPLE_RANGE_BYTES) // (SCHEMA_SAMPLE_RANGES - 1)
+            for i in range(1, SCHEMA_SAMPLE_RANGES):
+                start = max(i * step, SCHEMA_SAMPLE_RANGE_BYTES)
+                end = min(start + SCHEMA_SAMPLE_RANGE_BYTES, object_size) - 1
+                if start <= end:
+                    ranges.append((start, end))
+
+        bodies = [(first_body, object_size <= SCHEMA_SAMPLE_RANGE_BYTES)]
+        if ranges:
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                futures = [executor.submit(fetch_range, bucket, key, start, end)
+                           for start, end in ranges]
+                for (start, end), future in zip(ranges, futures):
+                    bodies.append((future.result()['Body'].read(),
+                                   end >= object_size - 1))
+
+        chunks = []
+        sampled_lines = 0
+        sampled_bytes = 0
+        for body, is_last in bodies:
+            chunk, line_count, line_bytes = parse_range(
+                body, header_line, is_last, sample_rows)
+            if chunk is not None:
+                chunks.append(chunk)
+                sampled_lines += line_count
+                sampled_bytes += line_bytes
+
+        profile = {
+            "object_size": object_size,
+            "estimated_rows": int((object_size - len(header_line) - 1) / (sampled_bytes / sampled_lines))
+            if sampled_lines else 0,
+            "sampled_rows": sum(len(chunk) for chunk in chunks)
+        }
+
+        if not chunks:
+            return {"schema": {}, "profile": profile}
 
-        return {"schema": schema}
+        return {"schema": merge_type_evidence(chunks), "profile": profile}
 
     except Exception as e:
         print(f"Error reading from S3: {str(e)}")
         return None
 
 
+def get_schema(bucket, key):
+    """
+    Return the schema and profile for an object, reusing earlier results while the
+    object's ETag is unchanged.
+
+    Warm containers answer from memory after a single HEAD request; otherwise the
+    column stats a transform wrote with the object, or the schema sidecar written by
+    a previous run, are used. A changed ETag invalidates all of them and the schema
+    is inferred again.
+    """
+    etag = normalize_etag(s3.head_object(Bucket=bucket, Key=key).get('ETag'))
+
+    cached = _schema_cache.get((bucket, key))
+    if cached and cached['etag'] == etag:
+        logger.info(f"Schema cache hit (memory) for s3://{bucket}/{key}")
+        return cached['result']
+
+    stats = read_column_stats(s3, bucket, key, etag)
+    if stats and stats.get('columns'):
+        logger.info(f"Schema from column stats for s3://{bucket}/{key}")
+        result = {
+            "schema": {column: info['type'] if info['type'] in TYPE_PRECEDENCE else 'string'
+                       for column, info in stats['columns'].items()},
+            # Row counts from the stats are exact
+            "profile": {"object_size": stats['size'], "estimated_rows": stats['rows'], "sampled_rows": 0}
+        }
+        _schema_cache[(bucket, key)] = {'etag': etag, 'result': result}
+        return result
+
+    sidecar = read_sidecar(s3, bucket, key, 'schema')
+    if sidecar and sidecar.get('etag') == etag and sidecar.get('schema'):
+        logger.info(f"Schema cache hit (sidecar) for s3://{bucket}/{key}")
+        result = {"schema": sidecar['schema'], "profile": sidecar.get('profile', {})}
+        _schema_cache[(bucket, key)] = {'etag': etag, 'result': result}
+        return result
+
+    result = generate_schema_from_s3(bucket, key)
+    if result is None:
+        return None
+
+    _schema_cache[(bucket, key)] = {'etag': etag, 'result': result}
+    write_sidecar(s3, bucket, key, 'schema', {
+        'etag': etag,
+        'generated_at': datetime.utcnow().isoformat(),
+        'schema': result['schema'],
+        'profile': result.get('profile', {})
+    })
+    return result
+
+
 def parse_s3_uri(s3_uri):
     """
     Parse an S3 URI into bucket and key using string operations.
@@ -78,14 +251,19 @@ def parse_s3_uri(s3_uri):
     return bucket, key
 
 
-def generate_flow(dataset_s3_uri, target_column, problem_type):
+def generate_flow(dataset_s3_uri, target_column, problem_type, sampling_strategy='random', sample_size=SAMPLE_SIZE,
+                  transform_steps=None):
     source_id = "35160a5f-41b4-4b77-83f4-6330bd39f912"
     transform_id = "df6590b9-209e-4019-a568-cc633f41b402"
     report_id = "6a58f2fa-9d34-4a14-a92a-9c82468e8b47"
 
     filename = dataset_s3_uri.split('/')[-1]
     bucket, key = parse_s3_uri(dataset_s3_uri)
-    schema_result = generate_schema_from_s3(bucket, key)
+    try:
+        schema_result = get_schema(bucket, key)
+    except Exception as e:
+        logging.getLogger().warning(f"Error looking up cached schema: {str(e)}")
+        schema_result = generate_schema_from_s3(bucket, key)
     if schema_result is None:
         # If schema generation fails, use a default empty schema
         schema_result = {"schema": {}}
@@ -93,11 +271,29 @@ def generate_flow(dataset_s3_uri, target_column, problem_type):
         logger.warning(
             "Failed to generate schema, using empty schema as fallback")
 
+    # Stored in the flow so fraud_processing_job launches the job without sizing it again
+    try:
+        sizing = size_flow_job(dataset_footprint(
+            s3, dataset_s3_uri,
+            estimated_rows=schema_result.get("profile", {}).get("estimated_rows")))
+    except Exception as e:
+        logging.getLogger().warning(f"Error sizing processing job: {str(e)}")
+        sizing = {"instance_type": INSTANCE_TYPE, "instance_count": INSTANCE_COUNT}
+
+    # Requested transforms run as TRANSFORM nodes after type casting, inside the job.
+    # The report reads their output, so they must keep the target column.
+    transform_nodes, prepared_id = compile_transform_nodes(
+        parse_transform_steps(transform_steps, target_column), transform_id)
+    outputs = [f"{report_id}.default"]
+    if transform_nodes:
+        # Export the prepared data alongside the report
+        outputs.append(f"{prepared_id}.default")
+
     return {
         "metadata": {
             "version": 1,
             "disable_limits": False,
-            "instance_type": INSTANCE_TYPE,
+            "instance_type": sizing["instance_type"],
             "disable_validation": True
         },
         "parameters": [],
@@ -134,10 +330,7 @@ def generate_flow(dataset_s3_uri, target_column, problem_type):
                 "outputs": [
                     {
                         "name": "default",
-                        "sampling": {
-                                "sampling_method": "sample_by_count",
-                                "sample_size": SAMPLE_SIZE
-                        }
+                        "sampling": sampling_config(sampling_strategy, sample_size)
                     }
                 ]
             },
@@ -162,6 +355,7 @@ def generate_flow(dataset_s3_uri, target_column, problem_type):
                     }
                 ]
             },
+            *transform_nodes,
             {
                 "node_id": report_id,
                 "type": "VISUALIZATION",
@@ -173,13 +367,13 @@ def generate_flow(dataset_s3_uri, target_column, problem_type):
                             "problem_type": problem_type
                         },
                     "full_data": "true",
-                    "instance_type": INSTANCE_TYPE,
-                    "number_of_instances": 2
+                    "instance_type": sizing["instance_type"],
+                    "number_of_instances": sizing["instance_count"]
                 },
                 "inputs": [
                     {
                         "name": "df",
-                        "node_id": transform_id,
+                        "node_id": prepared_id,
                         "output_name": "default"
                     }
                 ],
@@ -192,13 +386,10 @@ def generate_flow(dataset_s3_uri, target_column, problem_type):
         ],
         "internal_metadata": {
             "dw_job": {
-                "instance_type": INSTANCE_TYPE,
-                "instance_count": 2,
+                **{key: sizing[key] for key in FLOW_SIZING_KEYS if key in sizing},
                 "job_name": "fraud-processing-job",
                 "container_uri": CONTAINER_URI,
-                "outputs": [
-                    f"{report_id}.default"
-                ]
+                "outputs": outputs
             }
         }
 
@@ -227,6 +418,9 @@ def lambda_handler(event, context):
         dataset_uri = None
         target_column = None
         problem_type = None
+        sampling_strategy = 'random'
+        sample_size = SAMPLE_SIZE
+        transform_steps = []
 
         for prop in properties:
             prop_name = prop.get('name')
@@ -238,11 +432,23 @@ def lambda_handler(event, context):
                 target_column = prop_value
             elif prop_name == 'problem_type':
                 problem_type = prop_value
+            elif prop_name == 'sampling_strategy' and prop_value:
+                sampling_strategy = prop_value.lower()
+            elif prop_name == 'sample_size' and prop_value:
+                sample_size = int(prop_value)
+            elif prop_name == 'transform_steps' and prop_value:
+                # Bedrock passes arrays as JSON text, direct callers may pass a list
+                if isinstance(prop_value, str) and prop_value.lstrip().startswith('['):
+                    prop_value = json.loads(prop_value)
+                transform_steps = prop_value
         # Validate required parameters
         if not all([dataset_uri, target_column, problem_type]):
             raise ValueError(
                 "Missing required parameters: input_s3_uri, target_column, and problem_type are required")
 
+        # Checked once the target column is known, steps must keep it for the report
+        transform_steps = parse_transform_steps(transform_steps, target_column)
+
         # Validate problem type
         if problem_type.lower() not in ["classification", "regression"]:
             raise ValueError(
@@ -252,13 +458,32 @@ def lambda_handler(event, context):
         # Convert to title case (e.g., "classification" -> "Classification")
         problem_type = problem_type.lower().title()
 
+        if sampling_strategy not in SAMPLING_STRATEGIES:
+            raise ValueError(
+                f"sampling_strategy must be one of {', '.join(SAMPLING_STRATEGIES)}")
+        if sampling_strategy == 'stratified' and problem_type != 'Classification':
+            raise ValueError(
+                "stratified sampling requires a Classification problem_type")
+        if sample_size <= 0:
+            raise ValueError("sample_size must be positive")
+
+        # Precomputed samples replace the dataset as the flow's source, so every job
+        # built from the flow reads only the sample
+        source_uri = dataset_uri
+        if sampling_strategy in PRECOMPUTED_STRATEGIES:
+            dataset_bucket, dataset_key = parse_s3_uri(dataset_uri)
+            source_uri, sample_size = precompute_sample(
+                s3, dataset_bucket, dataset_key, sampling_strategy, sample_size,
+                target_column=target_column)
+
         # Generate timestamp for unique flow name
         timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
         s3_key = f"{FLOW_S3_PREFIX}/flow-{timestamp}.flow"
 
         # Generate flow JSON
         flow_json = generate_flow(
-            dataset_uri, target_column, problem_type)
+            source_uri, target_column, problem_type, sampling_strategy, sample_size,
+            transform_steps)
 
         # Upload to S3
         flow_str = json.dumps(flow_json, indent=2)
@@ -273,6 +498,9 @@ def lambda_handler(event, context):
         result = {
             "flowName": s3_key.split('/')[-1],
             "s3Uri": f"s3://{FLOW_S3_BUCKET}/{s3_key}",
+            "datasetS3Uri": source_uri,
+            "samplingStrategy": sampling_strategy,
+            "transformSteps": [step["name"] for step in transform_steps],
             "status": "Completed",
             "message": "Flow file generated and uploaded successfully"
         }
@@ -0,0 +1,134 @@
+import logging
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from botocore.exceptions import ClientError
+
+from sidecars import normalize_etag
+
+logger = logging.getLogger()
+
+# random: Data Wrangler draws sample_size random rows (the previous behaviour)
+# first_k: Data Wrangler reads the first sample_size rows
+# stratified: a per-class sample of the target column is precomputed and the flow reads it
+# reservoir: a uniform sample is precomputed in one pass and the flow reads it
+SAMPLING_STRATEGIES = ('random', 'first_k', 'stratified', 'reservoir')
+PRECOMPUTED_STRATEGIES = ('stratified', 'reservoir')
+
+# Precomputed samples are kept out of the dataset prefixes the list functions show
+SAMPLE_PREFIX = os.environ.get('SAMPLE_PREFIX', '_samples')
+
+# Rows per chunk while streaming the dataset for a precomputed sample
+SAMPLE_CHUNK_ROWS = int(os.environ.get('SAMPLE_CHUNK_ROWS', '200000'))
+
+# Every class keeps at least this many rows (or all of them) in a stratified sample
+MIN_STRATUM_ROWS = int(os.environ.get('MIN_STRATUM_ROWS', '1000'))
+
+# Classes beyond this make the target unsuitable for stratification
+MAX_STRATA = 100
+
+
+def sampling_config(strategy, sample_size):
+    """Sampling block of the SOURCE node output for a strategy."""
+    if strategy == 'random':
+        return {"sampling_method": "sample_by_count", "sample_size": sample_size}
+    # first_k, and precomputed samples which are read in full
+    return {"sampling_method": "sample_by_limit", "limit_rows": sample_size}
+
+
+def sample_key(key, etag, strategy, sample_size, target_column=None):
+    name = f"{normalize_etag(etag)}-{strategy}-{sample_size}"
+    if target_column:
+        name += f"-{target_column}"
+    return f"{SAMPLE_PREFIX}/{key}/{name}.csv"
+
+
+def _bottom_k(current, keyed, k):
+    """Keep the k rows with the smallest random keys seen so far."""
+    combined = keyed if current is None else pd.concat([current, keyed], ignore_index=True)
+    if len(combined) > k:
+        combined = combined.nsmallest(k, '_sample_key')
+    return combined
+
+
+def stratum_quotas(class_counts, sample_size):
+    """
+    Proportional allocation of sample_size rows over classes, where every class keeps at
+    least MIN_STRATUM_ROWS rows (or all of them when it is smaller).
+    """
+    total = sum(class_counts.values())
+    quotas = {}
+    for label, count in class_counts.items():
+        proportional = int(round(sample_size * count / total))
+        quotas[label] = min(count, max(proportional, MIN_STRATUM_ROWS))
+    return quotas
+
+
+def precompute_sample(s3, bucket, key, strategy, sample_size, target_column=None, seed=None):
+    """
+    Stream the object once and draw a uniform (reservoir) or stratified sample.
+
+    Sampling keeps the rows with the smallest random keys, overall for reservoir and
+    per class for stratified, so only the sample is ever held in memory. The sample is
+    written next to other samples under SAMPLE_PREFIX and reused while the object's
+    ETag is unchanged. Returns the S3 URI of the sample and its size in rows.
+    """
+    etag = s3.head_object(Bucket=bucket, Key=key).get('ETag')
+    destination = sample_key(key, etag, strategy, sample_size,
+                             target_column if strategy == 'stratified' else None)
+    try:
+        head = s3.head_object(Bucket=bucket, Key=destination)
+        rows = int(head.get('Metadata', {}).get('rows', sample_size))
+        logger.info(f"Reusing {strategy} sample s3://{bucket}/{destination}")
+        return f"s3://{bucket}/{destination}", rows
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('NoSuchKey', '404', 'NotFound'):
+            raise
+
+    rng = np.random.default_rng(seed)
+    reservoir = None
+    strata = {}
+    class_counts = {}
+    total_rows = 0
+    body = s3.get_object(Bucket=bucket, Key=key)['Body']
+    for chunk in pd.read_csv(body, chunksize=SAMPLE_CHUNK_ROWS, dtype=str, keep_default_na=False):
+        keyed = chunk.assign(_sample_key=rng.random(len(chunk)),
+                             _row=np.arange(total_rows, total_rows + len(chunk)))
+        total_rows += len(chunk)
+        if strategy == 'reservoir':
+            reservoir = _bottom_k(reservoir, keyed, sample_size)
+            continue
+
+        if target_column not in chunk.columns:
+            raise ValueError(f"Target column {target_column} not found in s3://{bucket}/{key}")
+        for label, rows in keyed.groupby(target_column, sort=False):
+            class_counts[label] = class_counts.get(label, 0) + len(rows)
+            # A class never needs more than sample_size rows, whatever its final quota
+            strata[label] = _bottom_k(strata.get(label), rows, sample_size)
+        if len(strata) > MAX_STRATA:
+            raise ValueError(f"{target_column} has more than {MAX_STRATA} classes and cannot be used for stratified sampling")
+
+    if strategy == 'stratified':
+        quotas = stratum_quotas(class_counts, sample_size)
+        parts = [rows.nsmallest(quotas[label], '_sample_key') for label, rows in strata.items()]
+        sample = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+        logger.info(f"Stratified sample quotas {quotas} from class counts {class_counts}")
+    else:
+        sample = reservoir if reservoir is not None else pd.DataFrame()
+
+    if sample.empty:
+        raise ValueError(f"s3://{bucket}/{key} contains no rows to sample")
+
+    # Restore file order so the sample reads like the source
+    sample = sample.sort_values('_row').drop(columns=['_sample_key', '_row'])
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', dir='/tmp', newline='') as handle:
+        sample.to_csv(handle, index=False)
+        handle.flush()
+        s3.upload_file(handle.name, bucket, destination, ExtraArgs={
+            'ContentType': 'text/csv',
+            'Metadata': {'rows': str(len(sample)), 'source-rows': str(total_rows)}
+        })
+    logger.info(f"Wrote {strategy} sample of {len(sample)} rows out of {total_rows} to s3://{bucket}/{destination}")
+    return f"s3://{bucket}/{destination}", len(sample)
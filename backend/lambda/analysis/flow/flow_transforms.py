@@ -0,0 +1,177 @@
+import uuid
+
+# Data Wrangler custom transform running PySpark code on the node input `df`
+CUSTOM_PYSPARK_OPERATOR = "sagemaker.spark.custom_code_0.1"
+
+# Same columns the drop Lambda removes
+DROP_COLUMNS = ['label_name', 'entity_type', 'customer_name', 'billing_street',
+                'billing_country', 'billing_phone', 'customer_email', 'customer_job',
+                'event_id', 'ip_address']
+
+# Same columns the cat2ord Lambda encodes
+ORDINAL_COLUMNS = ['billing_city', 'billing_state', 'merchant',
+                   'payment_currency', 'product_category', 'user_agent']
+
+# PySpark equivalents of the Lambda transforms, keyed by the Lambda directory name.
+# Each snippet reproduces its Lambda's output columns.
+TRANSFORM_CODE = {
+    "drop": """
+df = df.drop(*[c for c in {columns!r} if c in df.columns])
+""",
+    "cat2ord": """
+from pyspark.sql import functions as F
+for c in [c for c in {columns!r} if c in df.columns]:
+    # Codes follow the sorted categories like pandas.Categorical, missing values are -1
+    levels = sorted(r[0] for r in df.select(c).where(F.col(c).isNotNull()).distinct().collect())
+    mapping = F.create_map(*[F.lit(x) for i, v in enumerate(levels) for x in (v, i)])
+    df = df.withColumn(c, F.coalesce(mapping[F.col(c)], F.lit(-1)))
+""",
+    "convert2long": """
+from pyspark.sql import functions as F
+if 'entity_id' in df.columns:
+    df = df.withColumn('entity_id', F.col('entity_id').cast('long'))
+""",
+    "converttime": """
+from pyspark.sql import functions as F
+if 'event_timestamp' in df.columns:
+    ts = F.to_timestamp(F.col('event_timestamp'))
+    df = (df.withColumn('year', F.year(ts)).withColumn('month', F.month(ts))
+            .withColumn('day', F.dayofmonth(ts)).drop('event_timestamp'))
+""",
+    "eventtime": """
+from pyspark.sql import functions as F
+df = df.withColumn('event_time', F.unix_timestamp().cast('double'))
+""",
+    "onehotencode": """
+from pyspark.sql import functions as F
+if 'is_fraud' in df.columns:
+    values = sorted(r[0] for r in df.select('is_fraud').where(F.col('is_fraud').isNotNull()).distinct().collect())
+    for v in values:
+        df = df.withColumn(f'is_fraud_{{v}}', F.col('is_fraud') == F.lit(v))
+    df = df.drop('is_fraud')
+""",
+    "symbolremoval": """
+from pyspark.sql import functions as F
+if 'entity_id' in df.columns:
+    df = df.withColumn('entity_id', F.regexp_replace(F.col('entity_id').cast('string'), '[-.]', ''))
+""",
+    "text2lower": """
+from pyspark.sql import functions as F
+df = df.select(*[F.lower(F.col(c)).alias(c) if t == 'string' else F.col(c) for c, t in df.dtypes])
+""",
+    "geovelocity": """
+from pyspark.sql import functions as F, Window
+ts = F.unix_timestamp(F.to_timestamp(F.col('event_timestamp')))
+w = Window.partitionBy({entity_column!r}).orderBy(ts)
+lat, lon = F.radians(F.col('billing_latitude')), F.radians(F.col('billing_longitude'))
+prev_lat, prev_lon = F.lag(lat).over(w), F.lag(lon).over(w)
+a = (F.sin((lat - prev_lat) / 2) ** 2
+     + F.cos(prev_lat) * F.cos(lat) * F.sin((lon - prev_lon) / 2) ** 2)
+distance = 2 * 6371.0088 * F.asin(F.sqrt(F.least(F.greatest(a, F.lit(0.0)), F.lit(1.0))))
+elapsed = (ts - F.lag(ts).over(w)).cast('double')
+speed = F.when(elapsed > 0, distance / (elapsed / 3600.0))
+df = (df.withColumn('prev_txn_distance_km', F.round(distance, 3))
+        .withColumn('prev_txn_elapsed_seconds', elapsed)
+        .withColumn('prev_txn_speed_kmh', F.round(speed, 3)))
+df = df.withColumn('impossible_travel', F.coalesce(
+    ((F.col('prev_txn_speed_kmh') > {max_speed_kmh}) |
+     ((F.col('prev_txn_elapsed_seconds') == 0) & (F.col('prev_txn_distance_km') > 1.0))).cast('int'),
+    F.lit(0)))
+""",
+}
+
+# Transforms that need state across the whole dataset or write several outputs; they
+# keep running as Lambda steps
+LAMBDA_ONLY_TRANSFORMS = ['split', 'rebalance', 'dedup', 'synthetic']
+
+
+def transform_code(name, options=None):
+    options = options or {}
+    if name == 'drop':
+        return TRANSFORM_CODE[name].format(columns=options.get('columns') or DROP_COLUMNS)
+    if name == 'cat2ord':
+        return TRANSFORM_CODE[name].format(columns=options.get('columns') or ORDINAL_COLUMNS)
+    if name == 'geovelocity':
+        return TRANSFORM_CODE[name].format(
+            entity_column=options.get('entity_column') or 'entity_id',
+            max_speed_kmh=float(options.get('max_speed_kmh') or 900.0))
+    return TRANSFORM_CODE[name].format()
+
+
+def removed_columns(name, options=None):
+    """Input columns a transform step removes from its output."""
+    options = options or {}
+    if name == 'drop':
+        return list(options.get('columns') or DROP_COLUMNS)
+    if name == 'converttime':
+        return ['event_timestamp']
+    if name == 'onehotencode':
+        return ['is_fraud']
+    return []
+
+
+def parse_transform_steps(steps, target_column=None):
+    """
+    Normalise a requested transform list. Accepts a list of names or of
+    {"name": ..., **options} objects, or a comma separated string of names.
+
+    The insights report reads the output of the transform chain, so steps that
+    remove target_column are rejected.
+    """
+    if isinstance(steps, str):
+        steps = [step.strip() for step in steps.split(',') if step.strip()]
+    parsed = []
+    for step in steps or []:
+        if isinstance(step, str):
+            step = {"name": step}
+        name = step.get("name", "").lower()
+        if name in LAMBDA_ONLY_TRANSFORMS:
+            raise ValueError(f"Transform {name} cannot run inside the flow, run it as a separate step")
+        if name not in TRANSFORM_CODE:
+            raise ValueError(
+                f"Unknown transform {name}. Supported transforms: {', '.join(TRANSFORM_CODE)}")
+        options = {key: value for key, value in step.items() if key != "name"}
+        if target_column and target_column in removed_columns(name, options):
+            raise ValueError(
+                f"Transform {name} removes the target column {target_column} the insights report "
+                f"needs, run it as a separate step after the report")
+        parsed.append({**step, "name": name})
+    return parsed
+
+
+def compile_transform_nodes(steps, input_node_id):
+    """
+    Compile transform steps into a chain of Data Wrangler TRANSFORM nodes starting
+    from input_node_id. Returns the nodes and the id of the last node in the chain.
+    """
+    nodes = []
+    previous = input_node_id
+    for step in steps:
+        node_id = str(uuid.uuid4())
+        options = {key: value for key, value in step.items() if key != "name"}
+        nodes.append({
+            "node_id": node_id,
+            "type": "TRANSFORM",
+            "operator": CUSTOM_PYSPARK_OPERATOR,
+            "parameters": {
+                "operator": "Python (PySpark)",
+                "pyspark_parameters": {
+                    "code": transform_code(step["name"], options).strip()
+                },
+                "name": step["name"]
+            },
+            "inputs": [
+                {
+                    "name": "df",
+                    "node_id": previous,
+                    "output_name": "default"
+                }
+            ],
+            "outputs": [
+                {
+                    "name": "default"
+                }
+            ]
+        })
+        previous = node_id
+    return nodes, previous
@@ -0,0 +1,113 @@
+import os
+import json
+import boto3
+import logging
+from datetime import datetime
+import job_tracker
+from report_cache import write_report_summary
+from report_metrics import get_metrics_index
+from websocket_clients import get_management_client
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize S3 client
+s3_client = boto3.client('s3')
+
+
+def completion_message(record):
+    """
+    Websocket message telling the client a tracked job finished
+    """
+    if record['status'] == 'Completed' and record.get('reportUri'):
+        text = (f"Data quality insight job {record['jobName']} completed. "
+                f"The report is ready at {record['reportUri']}.")
+    elif record['status'] == 'Completed':
+        text = f"Data quality insight job {record['jobName']} completed. Results are at {record.get('resultsPath')}."
+    else:
+        text = f"Data quality insight job {record['jobName']} {record['status'].lower()}."
+        if record.get('failureReason'):
+            text += f" Reason: {record['failureReason']}"
+    return {
+        'type': 'jobStatus',
+        'jobName': record['jobName'],
+        'status': record['status'],
+        'reportUri': record.get('reportUri'),
+        'resultsPath': record.get('resultsPath'),
+        'message': text,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+
+
+def notify_subscribers(record):
+    """
+    Push the completion message to every websocket connection that asked for the job.
+    Returns the number of connections reached.
+    """
+    message = json.dumps(completion_message(record))
+    delivered = 0
+    for subscriber in record.get('subscribers', []):
+        try:
+            get_management_client(subscriber['endpoint']).post_to_connection(
+                ConnectionId=subscriber['connectionId'],
+                Data=message
+            )
+            delivered += 1
+        except Exception as e:
+            # The client disconnected; the report stays listed under processor_output
+            logger.warning(f"Failed to notify connection {subscriber['connectionId']}: {str(e)}")
+    return delivered
+
+
+def summarize_report(report_uri):
+    """
+    Write the summary and metrics index sidecars analyze_report and compare_reports
+    answer from
+    """
+    try:
+        bucket, key = report_uri.replace("s3://", "").split("/", 1)
+        etag = s3_client.head_object(Bucket=bucket, Key=key).get('ETag')
+        write_report_summary(s3_client, bucket, key, etag)
+        get_metrics_index(s3_client, bucket, key, etag)
+    except Exception as e:
+        # The sidecars are built on first use when they are missing
+        logger.warning(f"Error summarizing report {report_uri}: {str(e)}")
+
+
+def handle_event(event):
+    """
+    Apply one processing job state-change event and notify subscribers once the job
+    reaches a terminal status
+    """
+    bucket = os.environ.get('BUCKET_NAME')
+    record = job_tracker.apply_event(s3_client, bucket, event)
+    if not record:
+        logger.info(f"Ignoring event for untracked job {event.get('detail', {}).get('ProcessingJobName')}")
+        return None
+    if record['status'] in job_tracker.TERMINAL_STATUSES and not record.get('notifiedAt'):
+        if record.get('reportUri'):
+            summarize_report(record['reportUri'])
+        delivered = notify_subscribers(record)
+        logger.info(f"Notified {delivered} connections that {record['jobName']} is {record['status']}")
+        record = job_tracker.mark_notified(s3_client, bucket, record)
+    return record
+
+
+def lambda_handler(event, context):
+    """
+    Lambda handler for SageMaker Processing Job State Change events from EventBridge
+    """
+    try:
+        logger.info(f"Received event: {json.dumps(event)}")
+        record = handle_event(event)
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'jobName': record['jobName'] if record else None,
+                'status': record['status'] if record else None
+            })
+        }
+    except Exception as e:
+        logger.error(f"Error handling job state change: {str(e)}")
+        raise
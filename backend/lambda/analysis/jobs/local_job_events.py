@@ -0,0 +1,72 @@
+"""
+Stand-in for the EventBridge rule when running or testing without AWS events.
+
+LocalJobEventSource polls DescribeProcessingJob for the jobs it watches and emits the
+same SageMaker Processing Job State Change events EventBridge would, one per status
+change, into a handler (job_events.handle_event by default):
+
+    source = LocalJobEventSource(sagemaker_client)
+    source.watch('fraud-detection-flow-processing-...')
+    source.run(interval=15, timeout=3600)
+
+Scripted statuses can be pushed with emit() without any SageMaker client at all.
+"""
+import time
+import logging
+import job_tracker
+
+logger = logging.getLogger()
+
+
+class LocalJobEventSource:
+
+    def __init__(self, sagemaker_client=None, handler=None):
+        if handler is None:
+            from job_events import handle_event
+            handler = handle_event
+        self.sagemaker_client = sagemaker_client
+        self.handler = handler
+        self.last_status = {}
+
+    def watch(self, job_name):
+        self.last_status.setdefault(job_name, None)
+
+    def emit(self, job_name, status, failure_reason=None):
+        """Deliver a state-change event for job_name, as EventBridge would."""
+        event = job_tracker.state_change_event({
+            'ProcessingJobName': job_name,
+            'ProcessingJobStatus': status,
+            'FailureReason': failure_reason
+        })
+        self.last_status[job_name] = status
+        return self.handler(event)
+
+    def poll(self):
+        """
+        Describe every watched job that has not finished and emit an event for each
+        status change. Returns the number of events emitted.
+        """
+        emitted = 0
+        for job_name, last in list(self.last_status.items()):
+            if last in job_tracker.TERMINAL_STATUSES:
+                continue
+            description = self.sagemaker_client.describe_processing_job(ProcessingJobName=job_name)
+            if description['ProcessingJobStatus'] != last:
+                self.last_status[job_name] = description['ProcessingJobStatus']
+                self.handler(job_tracker.state_change_event(description))
+                emitted += 1
+        return emitted
+
+    def pending(self):
+        return [name for name, status in self.last_status.items()
+                if status not in job_tracker.TERMINAL_STATUSES]
+
+    def run(self, interval=15, timeout=None):
+        """Poll until every watched job finished or timeout seconds passed."""
+        started = time.time()
+        while self.pending():
+            self.poll()
+            if not self.pending() or (timeout is not None and time.time() - started >= timeout):
+                break
+            time.sleep(interval)
+        return dict(self.last_status)
@@ -0,0 +1,132 @@
+import math
+
+import numpy as np
+
+# Reference quantile bins used for PSI and Jensen-Shannon on numeric columns
+DRIFT_BINS = 10
+
+# Proportions are floored at this value so empty bins do not make PSI infinite
+MIN_PROPORTION = 1e-4
+
+# Population stability index bands commonly used for retraining decisions
+PSI_MODERATE = 0.1
+PSI_MAJOR = 0.25
+
+# Kolmogorov-Smirnov statistic and Jensen-Shannon distance above which a column drifted
+KS_THRESHOLD = 0.1
+JS_THRESHOLD = 0.1
+
+# Categories compared per column, the rest are pooled as one 'other' bin
+MAX_CATEGORIES = 20
+
+
+def _psi(reference, current):
+    reference = np.maximum(reference, MIN_PROPORTION)
+    current = np.maximum(current, MIN_PROPORTION)
+    return float(np.sum((current - reference) * np.log(current / reference)))
+
+
+def _js_distance(reference, current):
+    """Jensen-Shannon distance (base 2, between 0 and 1)."""
+    middle = (reference + current) / 2
+
+    def kl(p):
+        mask = p > 0
+        return np.sum(p[mask] * np.log2(p[mask] / middle[mask]))
+
+    return float(math.sqrt(max(0.0, (kl(reference) + kl(current)) / 2)))
+
+
+def numeric_drift(reference, current):
+    """
+    PSI and Jensen-Shannon over reference decile bins and the Kolmogorov-Smirnov
+    statistic over the union of both sketches' quantile points, all from KLL sketches.
+    """
+    edges = np.unique(reference.quantiles(np.linspace(0, 1, DRIFT_BINS + 1)[1:-1]))
+    reference_cdf = np.concatenate([[0.0], reference.cdf(edges), [1.0]])
+    current_cdf = np.concatenate([[0.0], current.cdf(edges), [1.0]])
+    reference_bins = np.diff(reference_cdf)
+    current_bins = np.diff(current_cdf)
+
+    points = np.unique(np.concatenate([
+        reference.quantiles(np.linspace(0, 1, 101)), current.quantiles(np.linspace(0, 1, 101))]))
+    ks = float(np.max(np.abs(reference.cdf(points) - current.cdf(points))))
+    return {
+        'psi': round(_psi(reference_bins, current_bins), 6),
+        'ks': round(ks, 6),
+        'js': round(_js_distance(reference_bins, current_bins), 6),
+        'reference_median': reference.quantiles([0.5])[0],
+        'current_median': current.quantiles([0.5])[0]
+    }
+
+
+def categorical_drift(reference, current):
+    """
+    PSI and Jensen-Shannon over the most frequent categories of both datasets, with
+    counts from the count-min sketches and the remaining rows pooled as 'other'.
+    """
+    candidates = dict(reference.frequent.top(MAX_CATEGORIES))
+    for value, count in current.frequent.top(MAX_CATEGORIES):
+        candidates[value] = max(candidates.get(value, 0), count)
+    categories = sorted(candidates, key=candidates.get, reverse=True)[:MAX_CATEGORIES]
+
+    def proportions(column):
+        if not column.count:
+            return np.zeros(len(categories) + 1)
+        shares = column.frequent.estimate(categories) / column.count
+        # Count-min estimates only ever overcount, so the shares are scaled to fit
+        shares = shares / max(1.0, shares.sum())
+        return np.append(shares, max(0.0, 1.0 - shares.sum()))
+
+    reference_bins = proportions(reference)
+    current_bins = proportions(current)
+    shifted = np.argsort(-np.abs(current_bins[:-1] - reference_bins[:-1]))[:3]
+    return {
+        'psi': round(_psi(reference_bins, current_bins), 6),
+        'ks': None,
+        'js': round(_js_distance(reference_bins, current_bins), 6),
+        'largest_shifts': [
+            {'value': categories[i], 'reference_share': round(float(reference_bins[i]), 6),
+             'current_share': round(float(current_bins[i]), 6)}
+            for i in shifted if i < len(categories)
+        ]
+    }
+
+
+def drift_level(metrics):
+    if metrics['psi'] >= PSI_MAJOR:
+        return 'major'
+    if metrics['psi'] >= PSI_MODERATE or (metrics['ks'] or 0) >= KS_THRESHOLD or \
+            metrics['js'] >= JS_THRESHOLD:
+        return 'moderate'
+    return 'none'
+
+
+def compare_sketches(reference, current, columns=None):
+    """
+    Drift metrics of every column present in both dataset sketches, most drifted
+    first, with the columns only one of them has.
+    """
+    shared = [name for name in reference.columns if name in current.columns
+              and (not columns or name in columns)]
+    results = []
+    for name in shared:
+        ref, cur = reference.columns[name], current.columns[name]
+        numeric = ref.numeric and cur.numeric
+        metrics = numeric_drift(ref.kll, cur.kll) if numeric else categorical_drift(ref, cur)
+        ref_missing = ref.missing / reference.rows if reference.rows else 0.0
+        cur_missing = cur.missing / current.rows if current.rows else 0.0
+        results.append({
+            'column': name,
+            'type': 'numeric' if numeric else 'categorical',
+            **metrics,
+            'missing_rate_change': round(cur_missing - ref_missing, 6),
+            'drift': drift_level(metrics)
+        })
+    results.sort(key=lambda result: result['psi'], reverse=True)
+    return {
+        'columns': results,
+        'drifted': [result['column'] for result in results if result['drift'] != 'none'],
+        'onlyInReference': [name for name in reference.columns if name not in current.columns],
+        'onlyInCurrent': [name for name in current.columns if name not in reference.columns]
+    }
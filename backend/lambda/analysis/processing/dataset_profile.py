@@ -0,0 +1,201 @@
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from sidecars import read_sidecar, write_sidecar, normalize_etag
+from job_sizing import list_dataset_objects
+from input_sharding import next_line_start
+from sketches import DatasetSketch, sketch_csv
+
+logger = logging.getLogger()
+
+# Sketches of every object are kept as sidecars of this kind
+SKETCH_KIND = 'sketch'
+
+# Objects are sketched in line-aligned parts of about this size, in parallel
+PROFILE_PART_BYTES = int(os.environ.get('PROFILE_PART_BYTES', str(64 * 1024 * 1024)))
+PROFILE_WORKERS = int(os.environ.get('PROFILE_WORKERS', '4'))
+
+# Bytes before the sketched offset compared to recognise an object that was only appended to
+TAIL_CHECK_BYTES = 4096
+
+# Quantiles reported for numeric columns
+PROFILE_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+# Categorical columns with at most this many distinct values suit one-hot encoding
+ONE_HOT_MAX_DISTINCT = int(os.environ.get('ONE_HOT_MAX_DISTINCT', '20'))
+
+# Columns with at least this share of distinct values are near-unique (IDs, free text):
+# their values occur about once, so sketched counts would be collision noise
+NEAR_UNIQUE_RATIO = 0.9
+
+
+class _PrefixedBody(io.RawIOBase):
+    """File object reading the CSV header followed by a ranged S3 body."""
+
+    def __init__(self, prefix, body):
+        self._prefix = prefix
+        self._body = body
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            size = min(len(buffer), len(self._prefix))
+            buffer[:size] = self._prefix[:size]
+            self._prefix = self._prefix[size:]
+            return size
+        data = self._body.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _tail_md5(s3, bucket, key, offset):
+    start = max(0, offset - TAIL_CHECK_BYTES)
+    if offset <= start:
+        return None
+    data = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{offset - 1}")['Body'].read()
+    return hashlib.md5(data).hexdigest()
+
+
+def _read_header(s3, bucket, key, size):
+    end = next_line_start(s3, bucket, key, 1, size)
+    return s3.get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{end - 1}")['Body'].read()
+
+
+def _sketch_range(s3, bucket, key, header, start, end):
+    body = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end - 1}")['Body']
+    try:
+        return sketch_csv(io.BufferedReader(_PrefixedBody(header, body)))
+    finally:
+        body.close()
+
+
+def _part_ranges(s3, bucket, key, start, size):
+    """Line-aligned ranges covering [start, size) of an object."""
+    parts = max(1, -(-(size - start) // PROFILE_PART_BYTES))
+    boundaries = [start]
+    for i in range(1, parts):
+        boundary = next_line_start(s3, bucket, key, start + i * (size - start) // parts, size)
+        if boundaries[-1] < boundary < size:
+            boundaries.append(boundary)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _plan_object(s3, bucket, obj):
+    """
+    Decide how to profile one object: reuse its stored sketch, extend it with the
+    bytes appended since, or sketch it from scratch. Returns (stored sketch or None,
+    header, offset to sketch from).
+    """
+    key, size, etag = obj['Key'], obj['Size'], normalize_etag(obj.get('ETag'))
+    stored = read_sidecar(s3, bucket, key, SKETCH_KIND)
+    if stored and stored.get('etag') == etag:
+        return stored, stored['header'].encode('utf-8'), size
+    if stored and size > stored.get('offset', 0) and stored.get('tail_md5') and \
+            _tail_md5(s3, bucket, key, stored['offset']) == stored['tail_md5']:
+        logger.info(f"s3://{bucket}/{key} grew from {stored['offset']} to {size} bytes, sketching the new data")
+        return stored, stored['header'].encode('utf-8'), stored['offset']
+    header = _read_header(s3, bucket, key, size)
+    return None, header, len(header)
+
+
+def profile_dataset(s3, s3_uri):
+    """
+    Sketch every column of a CSV dataset in one streaming pass.
+
+    Objects are split into line-aligned parts that are sketched in parallel and
+    merged. Each object's merged sketch is stored as a sidecar with the offset it
+    covers, so unchanged objects are never read again and appended objects only
+    have their new bytes read. Returns the dataset sketch and reuse statistics.
+    """
+    bucket, objects = list_dataset_objects(s3, s3_uri)
+    if not objects:
+        raise ValueError(f"No objects found at {s3_uri}")
+
+    plans = [(obj, *_plan_object(s3, bucket, obj)) for obj in objects if obj['Size']]
+    tasks = []
+    for obj, stored, header, offset in plans:
+        if offset < obj['Size']:
+            for start, end in _part_ranges(s3, bucket, obj['Key'], offset, obj['Size']):
+                tasks.append((obj['Key'], header, start, end))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(PROFILE_WORKERS, len(tasks)))) as executor:
+        results = list(executor.map(lambda task: _sketch_range(s3, bucket, *task), tasks))
+
+    parts = {}
+    for (key, _, _, _), sketch in zip(tasks, results):
+        parts.setdefault(key, []).append(sketch)
+
+    dataset = DatasetSketch()
+    scanned_bytes = sum(end - start for _, _, start, end in tasks)
+    for obj, stored, header, offset in plans:
+        sketch = DatasetSketch.from_dict(stored['sketch']) if stored else DatasetSketch()
+        for part in parts.get(obj['Key'], []):
+            sketch.merge(part)
+        if obj['Key'] in parts:
+            write_sidecar(s3, bucket, obj['Key'], SKETCH_KIND, {
+                'etag': normalize_etag(obj.get('ETag')),
+                'offset': obj['Size'],
+                'tail_md5': _tail_md5(s3, bucket, obj['Key'], obj['Size']),
+                'header': header.decode('utf-8'),
+                'sketch': sketch.to_dict()
+            })
+        dataset.merge(sketch)
+
+    stats = {
+        'objects': len(plans),
+        'objectsReused': sum(1 for obj, stored, _, offset in plans if stored and offset == obj['Size']),
+        'objectsExtended': sum(1 for obj, stored, _, offset in plans if stored and offset < obj['Size']),
+        'bytesScanned': scanned_bytes,
+        'parts': len(tasks)
+    }
+    logger.info(f"Profiled {s3_uri}: {stats}")
+    return dataset, stats
+
+
+def encoding_hint(column, distinct):
+    if column.numeric:
+        return 'numeric'
+    if distinct <= ONE_HOT_MAX_DISTINCT:
+        return 'onehot'
+    return 'ordinal'
+
+
+def summarize_profile(dataset, columns=None, top_k=5):
+    """Readable statistics of the sketched columns."""
+    summary = {}
+    for name, column in dataset.columns.items():
+        if columns and name not in columns:
+            continue
+        distinct = column.hll.estimate()
+        entry = {
+            'type': 'numeric' if column.numeric else 'categorical',
+            'count': column.count,
+            'missing': column.missing,
+            'missing_rate': round(column.missing / dataset.rows, 6) if dataset.rows else 0.0,
+            'distinct_estimate': min(distinct, column.count),
+            'encoding_hint': encoding_hint(column, distinct)
+        }
+        near_unique = distinct >= NEAR_UNIQUE_RATIO * column.count
+        if (not column.numeric or distinct <= ONE_HOT_MAX_DISTINCT) and not near_unique:
+            # Frequent values of continuous columns say nothing. Counts within the
+            # sketch's error bound may be collisions rather than repeats.
+            error_bound = column.frequent.error_bound()
+            entry['top_values'] = [{'value': value, 'count_estimate': int(count),
+                                    'reliable': count > error_bound}
+                                   for value, count in column.frequent.top(top_k)]
+        if column.numeric:
+            entry.update({
+                'min': column.kll.min,
+                'max': column.kll.max,
+                'mean': column.kll.sum / column.kll.count if column.kll.count else None,
+                'quantiles': dict(zip((f"p{int(q * 100)}" for q in PROFILE_QUANTILES),
+                                      column.kll.quantiles(PROFILE_QUANTILES)))
+            })
+        summary[name] = entry
+    return summary
@@ -4,6 +4,18 @@ import boto3
 import uuid
 import logging
 from datetime import datetime
+from local_insights import build_insights_report
+from job_sizing import list_dataset_objects, dataset_footprint, size_flow_job, flow_job_sizing
+from input_sharding import shard_dataset
+import job_dedup
+import job_tracker
+from concurrent.futures import ThreadPoolExecutor
+from report_reader import REPORT_TOP_K_COLUMNS, REPORT_MAX_BYTES
+from report_metrics import get_metrics_index, compare_indexes
+from report_cache import ReportCache, project_object, read_report_summary, write_report_summary
+from sidecars import normalize_etag
+from dataset_profile import profile_dataset, summarize_profile
+from dataset_drift import compare_sketches
 
 # Set up logging
 logger = logging.getLogger()
@@ -12,6 +24,29 @@ logger.setLevel(logging.INFO)
 # Initialize S3 client
 s3_client = boto3.client('s3')
 
+# Datasets up to this many bytes are profiled in the Lambda instead of a processing job
+LOCAL_INSIGHTS_MAX_BYTES = int(os.environ.get('LOCAL_INSIGHTS_MAX_BYTES', str(100 * 1024 * 1024)))
+
+# How the transactions reach the instances: 'replicated' copies the whole dataset to
+# every instance, 'sharded' pre-splits it and gives each instance its own part files,
+# 'auto' shards whenever the job runs on more than one instance
+INPUT_DISTRIBUTION = os.environ.get('INPUT_DISTRIBUTION', 'auto')
+SHARDS_PER_INSTANCE = int(os.environ.get('SHARDS_PER_INSTANCE', '2'))
+
+# S3InputMode for sharded transactions; FastFile streams on demand where the job accepts it
+SHARDED_INPUT_MODE = os.environ.get('SHARDED_INPUT_MODE', 'File')
+
+# Report file name of the local engine, listed by list_reports_uri beside the Data
+# Wrangler job's data_wrangler_visualization_job.json. Its layout differs, so its name does.
+LOCAL_REPORT_FILE_NAME = 'local_insights_report.json'
+
+# Reports compared in one compare_reports call
+MAX_COMPARED_REPORTS = 20
+
+# Parsed reports survive between invocations of a warm container, so follow-up
+# questions about the same report are answered without reading it again
+report_cache = ReportCache()
+
 
 def read_report_json(s3_uri):
     """
@@ -32,7 +67,199 @@ def read_report_json(s3_uri):
         raise
 
 
-def process_fraud_detection(flow_s3_uri, transactions_s3_uri):
+def parse_list_param(value):
+    """
+    Accept a JSON list or a comma separated string
+    """
+    if not value:
+        return None
+    if isinstance(value, list):
+        return value
+    value = value.strip()
+    if value.startswith('['):
+        return json.loads(value)
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def read_report_projection(s3_uri, sections=None, columns=None, top_k=None):
+    """
+    Read the requested sections of a report within the response byte budget.
+    Projections are cached per report ETag; the default projection comes from the
+    report's summary sidecar, which is written on first use if the job did not.
+    """
+    uri_parts = s3_uri.replace("s3://", "").split("/")
+    bucket = uri_parts[0]
+    key = "/".join(uri_parts[1:])
+
+    etag = normalize_etag(s3_client.head_object(Bucket=bucket, Key=key).get('ETag'))
+    if top_k == REPORT_TOP_K_COLUMNS:
+        top_k = None
+    cache_key = (s3_uri, etag, tuple(sections or ()), tuple(columns or ()), top_k)
+    cached = report_cache.get(cache_key)
+    if cached:
+        logger.info(f"Report projection of {s3_uri} served from cache")
+        return cached
+
+    if not sections and not columns and top_k is None:
+        summary = read_report_summary(s3_client, bucket, key, etag)
+        if summary is None:
+            summary = write_report_summary(s3_client, bucket, key, etag)
+        result = (summary['data'], summary['projection'])
+    else:
+        options = {'sections': sections, 'columns': columns}
+        if top_k is not None:
+            options['top_k'] = top_k
+        result = project_object(s3_client, bucket, key, **options)
+        logger.info(f"Projected {result[1]['bytesScanned']} bytes of {s3_uri} to sections {result[1]['sections']}")
+    report_cache.put(cache_key, result)
+    return result
+
+
+def compare_reports(report_uris):
+    """
+    Compare per-column metrics of several reports against the first one. Each report
+    is reduced to a metrics index once; indexes are cached in the container and as
+    sidecars of the reports, so repeated comparisons only HEAD the reports.
+    """
+    if len(report_uris) < 2:
+        raise ValueError("At least two report_uris are required for compare_reports")
+    if len(report_uris) > MAX_COMPARED_REPORTS:
+        raise ValueError(f"At most {MAX_COMPARED_REPORTS} reports can be compared at once")
+
+    def load_index(s3_uri):
+        bucket, key = s3_uri.replace("s3://", "").split("/", 1)
+        etag = normalize_etag(s3_client.head_object(Bucket=bucket, Key=key).get('ETag'))
+        cache_key = ('metrics', s3_uri, etag)
+        index = report_cache.get(cache_key)
+        if index is None:
+            index = get_metrics_index(s3_client, bucket, key, etag)
+            report_cache.put(cache_key, index)
+        return index
+
+    with ThreadPoolExecutor(max_workers=min(8, len(report_uris))) as executor:
+        indexes = list(executor.map(load_index, report_uris))
+
+    # An empty index would compare as "no drift"
+    unreadable = [s3_uri for s3_uri, index in zip(report_uris, indexes) if not index['columns']]
+    if unreadable:
+        raise ValueError(f"No per-column metrics found in {', '.join(unreadable)}; "
+                         f"the report layout is not recognised")
+
+    comparison = compare_indexes(indexes, report_uris)
+    # Least changed columns go first when the comparison exceeds the response budget
+    changed = comparison['changedColumns']
+    total_changed = len(changed)
+    while changed and len(json.dumps(comparison, default=str)) > REPORT_MAX_BYTES:
+        changed.pop()
+    if len(changed) < total_changed:
+        comparison['truncated'] = f"changedColumns (first {len(changed)} of {total_changed})"
+    return comparison
+
+
+def profile_columns(s3_uri, columns=None, top_k=5):
+    """
+    Approximate column statistics of a dataset of any size from mergeable sketches
+    """
+    dataset, stats = profile_dataset(s3_client, s3_uri)
+    summary = summarize_profile(dataset, columns=columns, top_k=top_k)
+    result = {'datasetS3Uri': s3_uri, 'rows': dataset.rows, 'columns': summary, 'profile': stats}
+    # Fewer frequent values first, then fewer columns, to fit the response budget
+    while len(json.dumps(result, default=str)) > REPORT_MAX_BYTES and top_k > 1:
+        top_k -= 1
+        for entry in summary.values():
+            del entry.get('top_values', [])[top_k:]
+    names = list(summary)
+    while len(json.dumps(result, default=str)) > REPORT_MAX_BYTES and names:
+        summary.pop(names.pop())
+        result['truncated'] = f"columns (first {len(summary)} of {len(dataset.columns)})"
+    return result
+
+
+def detect_drift(reference_s3_uri, current_s3_uri, columns=None):
+    """
+    Column drift between a reference and a current dataset from their sketches.
+    Sketches are stored per object, so an unchanged reference is never read again.
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        reference_future = executor.submit(profile_dataset, s3_client, reference_s3_uri)
+        current_future = executor.submit(profile_dataset, s3_client, current_s3_uri)
+        reference, reference_stats = reference_future.result()
+        current, current_stats = current_future.result()
+
+    drift = compare_sketches(reference, current, columns=columns)
+    result = {
+        'referenceS3Uri': reference_s3_uri,
+        'currentS3Uri': current_s3_uri,
+        'referenceRows': reference.rows,
+        'currentRows': current.rows,
+        **drift,
+        'profile': {'reference': reference_stats, 'current': current_stats}
+    }
+    # Least drifted columns go first when the result exceeds the response budget
+    total = len(drift['columns'])
+    while drift['columns'] and len(json.dumps(result, default=str)) > REPORT_MAX_BYTES:
+        drift['columns'].pop()
+    if len(drift['columns']) < total:
+        result['truncated'] = f"columns (first {len(drift['columns'])} of {total})"
+    return result
+
+
+def read_insights_parameters(flow):
+    """
+    Get target column and problem type from the data insights node of a flow
+    """
+    for node in flow.get('nodes', []):
+        parameters = node.get('parameters', {}).get('insights_report_parameters')
+        if parameters:
+            return parameters['target_column'], parameters['problem_type']
+    raise ValueError("No data insights node found in flow")
+
+
+def has_custom_transforms(flow):
+    """
+    True when the flow transforms the data beyond type casting, which only the
+    processing job can run
+    """
+    return any(node.get('type') == 'TRANSFORM' and 'infer_and_cast_type' not in node.get('operator', '')
+               for node in flow.get('nodes', []))
+
+
+def create_local_insights(flow, transactions_s3_uri, dataset_bucket, objects):
+    """
+    Build the insights report in-process and store it where the processing job would
+    """
+    bucket = os.environ.get('BUCKET_NAME')
+    target_column, problem_type = read_insights_parameters(flow)
+
+    timestamp = datetime.now().strftime('%d-%H-%M-%S')
+    job_name = f"fraud-detection-local-insights-{timestamp}-{str(uuid.uuid4())[:8]}"
+    results_key = f"processor_output/{job_name}"
+
+    report = build_insights_report(
+        s3_client, dataset_bucket, [obj['Key'] for obj in objects],
+        target_column, problem_type, dataset_uri=transactions_s3_uri)
+
+    report_key = f"{results_key}/{LOCAL_REPORT_FILE_NAME}"
+    report_body = json.dumps(report).encode('utf-8')
+    response = s3_client.put_object(
+        Bucket=bucket,
+        Key=report_key,
+        Body=report_body,
+        ContentType='application/json'
+    )
+    write_report_summary(s3_client, bucket, report_key, response.get('ETag'), body=report_body)
+    logger.info(f"Local insights report for {report['dataset']['rows']} rows written to s3://{bucket}/{report_key}")
+
+    return {
+        'jobName': job_name,
+        'jobArn': None,
+        'resultsPath': f"s3://{bucket}/{results_key}",
+        'reportUri': f"s3://{bucket}/{report_key}",
+        'status': 'Completed'
+    }
+
+
+def process_fraud_detection(flow_s3_uri, transactions_s3_uri, input_distribution=None):
     """
     Core function to process fraud detection using SageMaker
     """
@@ -43,8 +270,6 @@ def process_fraud_detection(flow_s3_uri, transactions_s3_uri):
 
         # Get environment variables
         bucket = os.environ.get('BUCKET_NAME')
-        iam_role = os.environ.get('SAGEMAKER_ROLE_ARN')
-        container_uri = os.environ.get('CONTAINER_URI')
 
         # Generate unique flow export ID
         timestamp = datetime.now().strftime('%d-%H-%M-%S')
@@ -61,6 +286,113 @@ def process_fraud_detection(flow_s3_uri, transactions_s3_uri):
         if not transactions_s3_uri:
             raise ValueError("transactions_s3_uri is required")
 
+        flow = read_report_json(flow_s3_uri)
+
+        # Small datasets take seconds in-process but minutes to provision a job for
+        dataset_bucket, objects = list_dataset_objects(s3_client, transactions_s3_uri)
+        total_bytes = sum(obj['Size'] for obj in objects)
+        if objects and total_bytes <= LOCAL_INSIGHTS_MAX_BYTES and not has_custom_transforms(flow):
+            fingerprint = job_dedup.job_fingerprint(flow, objects, {'engine': 'local'})
+            existing, _ = job_dedup.find_reusable(s3_client, sagemaker_client, bucket, fingerprint)
+            if existing:
+                return reused_result(existing)
+            logger.info(f"Dataset is {total_bytes} bytes, generating insights locally")
+            result = create_local_insights(flow, transactions_s3_uri, dataset_bucket, objects)
+            job_dedup.claim(s3_client, bucket, fingerprint, {**result, 'engine': 'local'}, replace=True)
+            return result
+
+        # Sizing create_flow stored in the flow, recomputed only for flows written without it
+        sizing = flow_job_sizing(flow)
+        if sizing is None:
+            sizing = size_flow_job(dataset_footprint(s3_client, transactions_s3_uri, objects=objects))
+
+        input_distribution = (input_distribution or INPUT_DISTRIBUTION).lower()
+        if input_distribution not in ('auto', 'sharded', 'replicated'):
+            raise ValueError("input_distribution must be 'auto', 'sharded' or 'replicated'")
+        sharded = input_distribution == 'sharded' or (
+            input_distribution == 'auto' and sizing['instance_count'] > 1)
+
+        # Identical flow, inputs and request parameters produce identical results, so a
+        # running or finished job with the same fingerprint is returned instead of launching another
+        processing_job_name = f"fraud-detection-flow-processing-{flow_export_id}"
+        s3_job_results_path = f"{s3_output_base_path}/{processing_job_name}/{output_name.replace('.', '/')}"
+        fingerprint = job_dedup.job_fingerprint(flow, objects, {
+            'engine': 'processing_job',
+            'input_distribution': input_distribution
+        })
+        existing, stale_etag = job_dedup.find_reusable(s3_client, sagemaker_client, bucket, fingerprint)
+        if existing:
+            return reused_result(existing)
+        record = {
+            'engine': 'processing_job',
+            'jobName': processing_job_name,
+            'resultsPath': s3_job_results_path,
+            'flowS3Uri': flow_s3_uri,
+            'transactionsS3Uri': transactions_s3_uri
+        }
+        # Conditional on the failed job's record when there is one, so concurrent retries
+        # of a failed job launch it once
+        if not job_dedup.claim(s3_client, bucket, fingerprint, record, if_match=stale_etag):
+            # Lost the race against an identical request
+            existing, _ = job_dedup.find_reusable(s3_client, sagemaker_client, bucket, fingerprint)
+            if existing:
+                return reused_result(existing)
+            raise RuntimeError("An identical processing job is being submitted by another request, "
+                               "retry in a few seconds")
+
+        try:
+            result = start_processing_job(
+                sagemaker_client, flow, flow_s3_uri, transactions_s3_uri, objects, sizing, sharded,
+                processing_job_name, s3_output_base_path, output_name)
+        except Exception:
+            job_dedup.release(s3_client, bucket, fingerprint)
+            raise
+        job_dedup.claim(s3_client, bucket, fingerprint, {**record, 'jobArn': result['jobArn']}, replace=True)
+        return result
+
+    except Exception as e:
+        logger.warning(f"Error in process_fraud_detection: {str(e)}")
+        raise
+
+
+def reused_result(record):
+    """
+    Response for a request answered by an earlier identical job
+    """
+    result = {
+        'jobName': record['jobName'],
+        'jobArn': record.get('jobArn'),
+        'resultsPath': record['resultsPath'],
+        'status': record['status'],
+        'reused': True
+    }
+    if record.get('reportUri'):
+        result['reportUri'] = record['reportUri']
+    return result
+
+
+def start_processing_job(sagemaker_client, flow, flow_s3_uri, transactions_s3_uri, objects, sizing, sharded,
+                         processing_job_name, s3_output_base_path, output_name):
+    """
+    Shard the input if requested and create the Data Wrangler processing job
+    """
+    try:
+        iam_role = os.environ.get('SAGEMAKER_ROLE_ARN')
+        container_uri = os.environ.get('CONTAINER_URI')
+
+        transactions_input_uri = transactions_s3_uri
+        transactions_input_mode = 'File'
+        transactions_distribution = 'FullyReplicated'
+        if sharded:
+            # Each instance downloads about 1/N of the data instead of all of it
+            transactions_input_uri, part_count = shard_dataset(
+                s3_client, transactions_s3_uri, objects,
+                sizing['instance_count'] * SHARDS_PER_INSTANCE)
+            if part_count > 1:
+                transactions_input_mode = SHARDED_INPUT_MODE
+                transactions_distribution = 'ShardedByS3Key'
+                sizing = {**sizing, 'volume_size_gb': sizing['sharded_volume_size_gb']}
+
         # Configure processing job inputs and outputs
         processing_inputs = [
             {
@@ -76,45 +408,51 @@ def process_fraud_detection(flow_s3_uri, transactions_s3_uri):
             {
                 'InputName': 'transactions',
                 'S3Input': {
-                    'S3Uri': transactions_s3_uri,
+                    'S3Uri': transactions_input_uri,
                     'LocalPath': '/opt/ml/processing/transactions',
                     'S3DataType': 'S3Prefix',
-                    'S3InputMode': 'File',
-                    'S3DataDistributionType': 'FullyReplicated'
+                    'S3InputMode': transactions_input_mode,
+                    'S3DataDistributionType': transactions_distribution
                 }
             }
         ]
 
+        # Flows with transform steps also export the prepared data of their last node
+        flow_outputs = flow.get('internal_metadata', {}).get('dw_job', {}).get('outputs') or [output_name]
+        if output_name not in flow_outputs:
+            flow_outputs = [output_name] + flow_outputs
         processing_outputs = {
             'Outputs': [
                 {
-                    'OutputName': output_name,
+                    'OutputName': name,
                     'S3Output': {
                         'S3Uri': s3_output_base_path,
-                        'LocalPath': '/opt/ml/processing/output',
+                        'LocalPath': '/opt/ml/processing/output' if name == output_name
+                        else f"/opt/ml/processing/prepared/{name.split('.')[0]}",
                         'S3UploadMode': 'EndOfJob'
                     }
                 }
+                for name in flow_outputs
             ]
         }
 
         # Configure job settings
-        processing_job_name = f"fraud-detection-flow-processing-{flow_export_id}"
-        instance_count = int(os.environ.get('INSTANCE_COUNT', '2'))
-        instance_type = os.environ.get('INSTANCE_TYPE', 'ml.m5.4xlarge')
-        volume_size = int(os.environ.get('VOLUME_SIZE', '30'))
+        instance_count = sizing['instance_count']
+        instance_type = sizing['instance_type']
+        volume_size = sizing['volume_size_gb']
 
         # Output configuration
         output_config = {
-            output_name: {
+            name: {
                 "content_type": "CSV"
             }
+            for name in flow_outputs
         }
 
         # Refit configuration
         refit_trained_params = {
             "refit": False,
-            "output_flow": f"fraud-detection-flow-processing-{flow_export_id}.flow"
+            "output_flow": f"{processing_job_name}.flow"
         }
 
         # Create processing job
@@ -148,18 +486,37 @@ def process_fraud_detection(flow_s3_uri, transactions_s3_uri):
         # Prepare response
         s3_job_results_path = f"{s3_output_base_path}/{processing_job_name}/{output_name.replace('.', '/')}"
 
+        prepared_paths = [f"{s3_output_base_path}/{processing_job_name}/{name.replace('.', '/')}"
+                          for name in flow_outputs if name != output_name]
+
         return {
             'jobName': processing_job_name,
             'jobArn': response['ProcessingJobArn'],
             'resultsPath': s3_job_results_path,
+            **({'preparedDataPath': prepared_paths[0]} if prepared_paths else {}),
+            'resources': sizing,
+            'inputDistribution': transactions_distribution,
             'status': 'InProgress'
         }
 
     except Exception as e:
-        logger.warning(f"Error in process_fraud_detection: {str(e)}")
+        logger.warning(f"Error in start_processing_job: {str(e)}")
         raise
 
 
+def requesting_connection(event):
+    """
+    Websocket connection the chat handler passed in the agent session attributes
+    """
+    attributes = event.get('sessionAttributes') or {}
+    if not attributes.get('connectionId') or not attributes.get('websocketEndpoint'):
+        return None
+    return {
+        'connectionId': attributes['connectionId'],
+        'endpoint': attributes['websocketEndpoint']
+    }
+
+
 def lambda_handler(event, context):
     """
     Lambda handler function for Bedrock agent action to start fraud processing job or analyze report
@@ -188,19 +545,26 @@ def lambda_handler(event, context):
                 raise ValueError(
                     "report_uri parameter is required for analyze_report function")
 
-            # Read and analyze the report
-            report_data = read_report_json(report_uri)
+            # Read only the sections needed for the analysis
+            top_k = params.get('top_k')
+            report_data, projection = read_report_projection(
+                report_uri,
+                sections=parse_list_param(params.get('sections')),
+                columns=parse_list_param(params.get('columns')),
+                top_k=int(top_k) if top_k else None)
 
             # Format response with report analysis
             result = {
                 'reportUri': report_uri,
                 'data': report_data,
+                'projection': projection,
                 'status': 'Completed'
             }
         elif api_path == '/create_data_quality_insight':
             # Extract parameters for report creation
             flow_s3_uri = params.get('flow_s3_uri')
             transactions_s3_uri = params.get('transactions_s3_uri')
+            input_distribution = params.get('input_distribution')
 
             logger.info(
                 f"Extracted URIs - flow: {flow_s3_uri}, transactions: {transactions_s3_uri}")
@@ -210,12 +574,93 @@ def lambda_handler(event, context):
                     "flow_s3_uri and transactions_s3_uri are required parameters")
 
             # Process fraud detection
-            result = process_fraud_detection(flow_s3_uri, transactions_s3_uri)
+            result = process_fraud_detection(
+                flow_s3_uri, transactions_s3_uri, input_distribution)
+
+            # Running jobs are tracked so their completion reaches the chat that asked
+            if result['status'] not in job_tracker.TERMINAL_STATUSES:
+                job_tracker.track_job(s3_client, os.environ.get('BUCKET_NAME'), result,
+                                      requesting_connection(event))
+        elif api_path == '/compare_reports':
+            report_uris = parse_list_param(params.get('report_uris'))
+            if not report_uris:
+                raise ValueError(
+                    "report_uris parameter is required for compare_reports function")
+
+            result = {
+                **compare_reports(report_uris),
+                'status': 'Completed'
+            }
+        elif api_path == '/profile_dataset':
+            s3_uri = params.get('s3_uri')
+            if not s3_uri:
+                raise ValueError(
+                    "s3_uri parameter is required for profile_dataset function")
+
+            top_k = params.get('top_k')
+            result = {
+                **profile_columns(s3_uri, columns=parse_list_param(params.get('columns')),
+                                  top_k=int(top_k) if top_k else 5),
+                'status': 'Completed'
+            }
+        elif api_path == '/detect_drift':
+            reference_s3_uri = params.get('reference_s3_uri')
+            current_s3_uri = params.get('current_s3_uri')
+            if not reference_s3_uri or not current_s3_uri:
+                raise ValueError(
+                    "reference_s3_uri and current_s3_uri are required parameters")
+
+            result = {
+                **detect_drift(reference_s3_uri, current_s3_uri,
+                               columns=parse_list_param(params.get('columns'))),
+                'status': 'Completed'
+            }
+        elif api_path == '/get_job_status':
+            job_name = params.get('job_name')
+            if not job_name:
+                raise ValueError(
+                    "job_name parameter is required for get_job_status function")
+
+            record = job_tracker.get_job_status(
+                s3_client, boto3.client('sagemaker', region_name=os.environ.get('AWS_REGION', 'us-east-1')),
+                os.environ.get('BUCKET_NAME'), job_name)
+            result = {
+                'jobName': record['jobName'],
+                'resultsPath': record.get('resultsPath'),
+                'status': record['status']
+            }
+            for field in ('reportUri', 'failureReason'):
+                if record.get(field):
+                    result[field] = record[field]
+        else:
+            raise ValueError(f"Unsupported API path: {api_path}")
 
         # Add informative message to result
+        if api_path == '/analyze_report':
+            message = 'Analysis completed successfully.'
+        elif api_path == '/profile_dataset':
+            message = (f"Profiled {len(result['columns'])} columns of {result['rows']} rows; "
+                       'counts, distinct values and quantiles are sketch estimates.')
+        elif api_path == '/detect_drift':
+            message = (f"{len(result['drifted'])} of {len(result['columns'])} shared columns drifted"
+                       f"{': ' + ', '.join(result['drifted']) if result['drifted'] else ''}.")
+        elif api_path == '/compare_reports':
+            message = (f"Compared {len(result['reports'])} reports: {len(result['changedColumns'])} "
+                       f"columns changed against the baseline, {result['unchangedColumns']} unchanged.")
+        elif result['status'] == 'Completed' and not result.get('reportUri') and result.get('resultsPath'):
+            message = 'Data quality insight job completed. Results are under resultsPath.'
+        elif result['status'] == 'Completed':
+            message = 'Data quality insight report is ready. Use analyze_report with the reportUri.'
+        elif result['status'] in job_tracker.TERMINAL_STATUSES:
+            message = f"Data quality insight job {result['status'].lower()}."
+        else:
+            message = ('Data quality insight job is now running. The chat is notified when the '
+                       'report is ready; get_job_status returns its current status.')
+        if result.get('reused'):
+            message = f"An identical request was already submitted as {result['jobName']}. {message}"
         result_with_message = {
             **result,
-            'message': 'Analysis completed successfully.' if 'reportUri' in result else 'Data quality insight job is now running.'
+            'message': message
         }
 
         # Format response to match Bedrock agent's OpenAPI schema
@@ -0,0 +1,168 @@
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sidecars import read_sidecar, write_sidecar, normalize_etag
+
+logger = logging.getLogger()
+
+# Part files are written under their own prefix so dataset listings do not pick them up
+SHARD_PREFIX = os.environ.get('SHARD_PREFIX', '_shards')
+
+# S3 multipart limits: every part but the last is at least 5 MB, copied parts at most 5 GB
+MIN_PART_BYTES = 5 * 1024 * 1024
+MAX_COPY_PART_BYTES = 5 * 1024 ** 3
+
+# Bytes read around a split point to find the next line break
+BOUNDARY_PROBE_BYTES = 64 * 1024
+
+MAX_SHARD_WORKERS = 16
+
+# Part files expire with the _shards/ lifecycle rule of the bucket (backend-stack.ts), so
+# running jobs never lose their input to a later split. A recorded set is reused only
+# while it is young enough for a job started on it to finish before it expires.
+SHARD_REUSE_MAX_AGE_SECONDS = int(os.environ.get('SHARD_REUSE_MAX_AGE_SECONDS', str(6 * 86400)))
+
+
+def _read_range(s3, bucket, key, start, end):
+    return s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")['Body'].read()
+
+
+def next_line_start(s3, bucket, key, offset, size):
+    """Offset of the first line starting at or after offset."""
+    if offset <= 0:
+        return 0
+    position = offset - 1
+    while position < size:
+        probe = _read_range(s3, bucket, key, position, min(position + BOUNDARY_PROBE_BYTES, size) - 1)
+        newline = probe.find(b'\n')
+        if newline >= 0:
+            return position + newline + 1
+        position += len(probe)
+    return size
+
+
+def plan_object_shards(s3, bucket, obj, shard_count):
+    """
+    Split one CSV object into up to shard_count line-aligned byte ranges of its data
+    rows. Returns the header line and the list of (start, end) ranges, end exclusive.
+    """
+    key, size = obj['Key'], obj['Size']
+    head = _read_range(s3, bucket, key, 0, min(BOUNDARY_PROBE_BYTES, size) - 1)
+    header_end = head.find(b'\n') + 1
+    if header_end <= 0:
+        header_end = next_line_start(s3, bucket, key, len(head), size)
+        head = _read_range(s3, bucket, key, 0, header_end - 1)
+    header = head[:header_end]
+
+    data_bytes = size - header_end
+    # Shards smaller than one multipart part gain nothing and cost a request each
+    shard_count = max(1, min(shard_count, data_bytes // MIN_PART_BYTES))
+    target = data_bytes / shard_count
+
+    boundaries = [header_end]
+    for i in range(1, shard_count):
+        boundary = next_line_start(s3, bucket, key, header_end + int(i * target), size)
+        if boundary > boundaries[-1] and boundary < size:
+            boundaries.append(boundary)
+    boundaries.append(size)
+    return header, list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def write_shard(s3, bucket, source_key, header, start, end, destination_key):
+    """
+    Write header + source[start:end] as a new object.
+
+    The first MIN_PART_BYTES of the range are read and uploaded with the header; the
+    rest is copied server-side with UploadPartCopy, so large shards never pass
+    through the Lambda.
+    """
+    lead_end = min(end, start + MIN_PART_BYTES)
+    lead = header + _read_range(s3, bucket, source_key, start, lead_end - 1)
+    if lead_end == end:
+        s3.put_object(Bucket=bucket, Key=destination_key, Body=lead)
+        return
+
+    upload_id = s3.create_multipart_upload(Bucket=bucket, Key=destination_key)['UploadId']
+    try:
+        parts = []
+        response = s3.upload_part(Bucket=bucket, Key=destination_key, UploadId=upload_id,
+                                  PartNumber=1, Body=lead)
+        parts.append({'PartNumber': 1, 'ETag': response['ETag']})
+        position = lead_end
+        while position < end:
+            part_end = min(end, position + MAX_COPY_PART_BYTES)
+            response = s3.upload_part_copy(
+                Bucket=bucket, Key=destination_key, UploadId=upload_id,
+                PartNumber=len(parts) + 1,
+                CopySource={'Bucket': bucket, 'Key': source_key},
+                CopySourceRange=f"bytes={position}-{part_end - 1}")
+            parts.append({'PartNumber': len(parts) + 1, 'ETag': response['CopyPartResult']['ETag']})
+            position = part_end
+        s3.complete_multipart_upload(Bucket=bucket, Key=destination_key, UploadId=upload_id,
+                                     MultipartUpload={'Parts': parts})
+    except Exception:
+        s3.abort_multipart_upload(Bucket=bucket, Key=destination_key, UploadId=upload_id)
+        raise
+
+
+def shard_dataset(s3, s3_uri, objects, shard_count):
+    """
+    Pre-split a dataset into about shard_count part files for ShardedByS3Key inputs.
+
+    Each object gets a share of the parts proportional to its size and every part
+    starts with the object's header. Parts live under a prefix derived from the
+    objects' ETags and are recorded in a 'shards' sidecar, so an unchanged dataset is
+    only split once (see SHARD_REUSE_MAX_AGE_SECONDS). Datasets that already have
+    shard_count objects are used as-is.
+    Returns the S3 URI of the prefix to read and the number of part files.
+    """
+    bucket, dataset_key = s3_uri.replace('s3://', '').split('/', 1)
+    if len(objects) >= shard_count:
+        return s3_uri, len(objects)
+
+    fingerprint = hashlib.md5(
+        '|'.join(f"{obj['Key']}:{normalize_etag(obj.get('ETag'))}" for obj in objects).encode()
+    ).hexdigest()[:16]
+    sidecar = read_sidecar(s3, bucket, dataset_key, 'shards')
+    if (sidecar and sidecar.get('fingerprint') == fingerprint and sidecar.get('requested') == shard_count
+            and time.time() - sidecar.get('created_at', 0) < SHARD_REUSE_MAX_AGE_SECONDS):
+        logger.info(f"Reusing {sidecar['part_count']} shards of {s3_uri} at {sidecar['uri']}")
+        return sidecar['uri'], sidecar['part_count']
+
+    # Timestamped so a split after the reuse window never writes into a set being expired
+    created_at = time.time()
+    prefix = f"{SHARD_PREFIX}/{dataset_key.rstrip('/')}/{fingerprint}-{shard_count}-{int(created_at)}/"
+    total_bytes = sum(obj['Size'] for obj in objects)
+    tasks = []
+    for obj in objects:
+        if not obj['Size']:
+            continue
+        share = max(1, round(shard_count * obj['Size'] / total_bytes)) if total_bytes else 1
+        header, ranges = plan_object_shards(s3, bucket, obj, share)
+        for start, end in ranges:
+            if start >= end:
+                continue
+            tasks.append((obj['Key'], header, start, end,
+                          f"{prefix}part-{len(tasks):05d}.csv"))
+
+    if not tasks:
+        return s3_uri, len(objects)
+
+    with ThreadPoolExecutor(max_workers=min(MAX_SHARD_WORKERS, len(tasks))) as executor:
+        futures = [executor.submit(write_shard, s3, bucket, *task) for task in tasks]
+        for future in futures:
+            future.result()
+
+    shard_uri = f"s3://{bucket}/{prefix}"
+    write_sidecar(s3, bucket, dataset_key, 'shards', {
+        'fingerprint': fingerprint,
+        'requested': shard_count,
+        'part_count': len(tasks),
+        'uri': shard_uri,
+        'created_at': created_at
+    })
+    logger.info(f"Split {s3_uri} into {len(tasks)} shards at {shard_uri}")
+    return shard_uri, len(tasks)
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import logging
+import time
+
+from botocore.exceptions import ClientError
+
+from sidecars import sidecar_key, normalize_etag
+
+logger = logging.getLogger()
+
+# Fingerprint records are sidecars of this kind, keyed by the fingerprint itself
+RECORD_KIND = 'processing_job'
+
+# Jobs in these states are reused instead of launching an identical one
+REUSABLE_STATUSES = ('InProgress', 'Completed')
+
+# A claim whose job never showed up in SageMaker is abandoned after this long
+STALE_CLAIM_SECONDS = 300
+
+
+def job_fingerprint(flow, objects, parameters):
+    """
+    Hash of everything that determines a processing job's results: the flow content,
+    the ETag of every input object and the parameters of the request (engine, input
+    distribution). Derived settings such as the job sizing are left out, since they
+    depend on sidecars that change over time and identical requests would otherwise
+    fingerprint differently.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(flow, sort_keys=True).encode('utf-8'))
+    for obj in sorted(objects, key=lambda o: o['Key']):
+        digest.update(f"\n{obj['Key']}:{normalize_etag(obj.get('ETag'))}".encode('utf-8'))
+    digest.update(json.dumps(parameters, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _record_key(fingerprint):
+    return sidecar_key(fingerprint, RECORD_KIND)
+
+
+def read_record(s3, bucket, fingerprint):
+    """The record of a fingerprint and its ETag, or (None, None) when there is none."""
+    try:
+        response = s3.get_object(Bucket=bucket, Key=_record_key(fingerprint))
+        return json.loads(response['Body'].read().decode('utf-8')), response.get('ETag')
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return None, None
+        raise
+
+
+def claim(s3, bucket, fingerprint, record, if_match=None, replace=False):
+    """
+    Store the record for a fingerprint. By default the write only succeeds when no
+    record exists yet, and with if_match only while the record still has that ETag,
+    so of two concurrent identical requests only one launches a job, whether the
+    fingerprint is new or its last job failed. replace overwrites the caller's own
+    record unconditionally. Returns True when this caller owns the fingerprint.
+    """
+    if replace:
+        kwargs = {}
+    elif if_match:
+        kwargs = {'IfMatch': if_match}
+    else:
+        kwargs = {'IfNoneMatch': '*'}
+    try:
+        s3.put_object(Bucket=bucket, Key=_record_key(fingerprint),
+                      Body=json.dumps({**record, 'claimedAt': time.time()}),
+                      ContentType='application/json', **kwargs)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('PreconditionFailed', 'ConditionalRequestConflict', '412'):
+            return False
+        raise
+
+
+def release(s3, bucket, fingerprint):
+    """Drop a claim whose job could not be created."""
+    try:
+        s3.delete_object(Bucket=bucket, Key=_record_key(fingerprint))
+    except ClientError as e:
+        logger.warning(f"Error releasing job fingerprint {fingerprint}: {str(e)}")
+
+
+def job_status(sagemaker_client, record):
+    """
+    Current status of the job behind a record, or None when the record is unusable.
+    Records of in-process reports carry their final status directly.
+    """
+    if record.get('engine') == 'local':
+        return record.get('status')
+    try:
+        return sagemaker_client.describe_processing_job(
+            ProcessingJobName=record['jobName'])['ProcessingJobStatus']
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('ValidationException', 'ResourceNotFound'):
+            raise
+        # Claimed but not created yet: another request is still submitting it
+        if time.time() - record.get('claimedAt', 0) < STALE_CLAIM_SECONDS:
+            return 'InProgress'
+        return None
+
+
+def find_reusable(s3, sagemaker_client, bucket, fingerprint):
+    """
+    Look up the job of a fingerprint. Returns the record of an in-progress or
+    completed job, with its current status, and None; or, when a new job has to be
+    launched, None and the ETag of the unusable record to pass to claim as if_match
+    (None when there is no record).
+    """
+    record, etag = read_record(s3, bucket, fingerprint)
+    if not record:
+        return None, None
+    status = job_status(sagemaker_client, record)
+    if status in REUSABLE_STATUSES:
+        logger.info(f"Reusing {status} job {record['jobName']} for fingerprint {fingerprint}")
+        return {**record, 'status': status}, None
+    logger.info(f"Job {record.get('jobName')} for fingerprint {fingerprint} is {status}, launching a new one")
+    return None, etag
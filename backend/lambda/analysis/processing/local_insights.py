@@ -0,0 +1,443 @@
+import logging
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from column_stats import ColumnStats
+
+logger = logging.getLogger()
+
+# Rows per chunk while streaming the dataset
+CHUNK_ROWS = int(os.environ.get('LOCAL_INSIGHTS_CHUNK_ROWS', '100000'))
+
+# Exact distinct values tracked per column before cardinality is reported as a lower bound
+DISTINCT_CAP = int(os.environ.get('LOCAL_INSIGHTS_DISTINCT_CAP', '10000'))
+
+# Rows kept in the reservoir sample used by the quick model
+MODEL_SAMPLE_ROWS = int(os.environ.get('LOCAL_INSIGHTS_MODEL_SAMPLE_ROWS', '50000'))
+
+# Bins per feature for the decision stump quick model
+STUMP_BINS = 32
+
+# Categories seen in fewer sample rows than this share one bin in the quick model
+MIN_CATEGORY_ROWS = 30
+
+# Layout version of the local report, bumped when its sections change
+REPORT_VERSION = 1
+
+HIGH_MISSING_RATE = 0.3
+LOW_MINORITY_SHARE = 0.05
+LEAKAGE_SCORE = 0.95
+
+
+class ColumnInsights:
+    """
+    Single-pass accumulator for the figures of one column that column_stats.ColumnStats
+    does not keep: frequent values, moments of numeric columns and their moments per
+    target class (or with a numeric target) for the correlation with the target.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.numeric = True
+        self.values = Counter()
+        self.distinct_capped = False
+        self.count = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        # Per target class moments of this column, for the correlation with the target
+        self.by_class = {}
+        # Cross moments with a numeric target (regression)
+        self.pairs = 0
+        self.sum_xy = 0.0
+        self.sum_x = 0.0
+        self.sum_xx = 0.0
+        self.sum_y = 0.0
+        self.sum_yy = 0.0
+
+    def update(self, series, target=None, regression=False):
+        non_null = series.dropna()
+
+        if not self.distinct_capped:
+            self.values.update(non_null.astype(str).value_counts().to_dict())
+            if len(self.values) > DISTINCT_CAP:
+                self.distinct_capped = True
+                self.values = Counter(dict(self.values.most_common(DISTINCT_CAP)))
+
+        if self.numeric and not pd.api.types.is_numeric_dtype(series.dtype):
+            self.numeric = False
+        if not self.numeric or non_null.empty:
+            return
+
+        values = non_null.to_numpy(dtype='float64')
+        self.count += len(values)
+        self.sum += values.sum()
+        self.sum_sq += np.square(values).sum()
+
+        if target is None:
+            return
+        paired = pd.DataFrame({'x': series, 'y': target}).dropna()
+        if paired.empty:
+            return
+        if regression:
+            x = paired['x'].to_numpy(dtype='float64')
+            y = pd.to_numeric(paired['y'], errors='coerce').to_numpy(dtype='float64')
+            valid = ~np.isnan(y)
+            x, y = x[valid], y[valid]
+            self.pairs += len(x)
+            self.sum_x += x.sum()
+            self.sum_xx += np.square(x).sum()
+            self.sum_y += y.sum()
+            self.sum_yy += np.square(y).sum()
+            self.sum_xy += (x * y).sum()
+        else:
+            x = paired['x'].astype('float64')
+            grouped = pd.DataFrame({'x': x, 'xx': x * x}).groupby(paired['y'].astype(str).to_numpy())
+            sums = grouped.sum()
+            counts = grouped.size()
+            for label in sums.index:
+                moments = self.by_class.setdefault(label, [0, 0.0, 0.0])
+                moments[0] += int(counts[label])
+                moments[1] += float(sums.at[label, 'x'])
+                moments[2] += float(sums.at[label, 'xx'])
+
+    def target_correlation(self, regression, positive_label=None):
+        """
+        Pearson correlation for a numeric target, otherwise the correlation ratio (eta)
+        between the class and this column, signed for binary targets so that a positive
+        value means higher values for the positive (minority) class.
+        """
+        if not self.numeric:
+            return None
+        if regression:
+            n = self.pairs
+            if n < 2:
+                return None
+            cov = self.sum_xy / n - (self.sum_x / n) * (self.sum_y / n)
+            var_x = self.sum_xx / n - (self.sum_x / n) ** 2
+            var_y = self.sum_yy / n - (self.sum_y / n) ** 2
+            if var_x <= 0 or var_y <= 0:
+                return None
+            return float(cov / np.sqrt(var_x * var_y))
+
+        n = sum(m[0] for m in self.by_class.values())
+        if n < 2 or len(self.by_class) < 2:
+            return None
+        total = sum(m[1] for m in self.by_class.values())
+        total_sq = sum(m[2] for m in self.by_class.values())
+        mean = total / n
+        total_var = total_sq / n - mean ** 2
+        if total_var <= 0:
+            return None
+        between = sum(m[0] * (m[1] / m[0] - mean) ** 2 for m in self.by_class.values() if m[0]) / n
+        eta = float(np.sqrt(max(0.0, min(1.0, between / total_var))))
+        if len(self.by_class) == 2 and positive_label in self.by_class:
+            positive = self.by_class[positive_label]
+            if positive[0] and positive[1] / positive[0] < mean:
+                eta = -eta
+        return eta
+
+    def summary(self, total_rows, stats):
+        """
+        Column report from the shared statistics of the column (an entry of
+        ColumnStats.to_dict()) and the figures accumulated here.
+        """
+        count = total_rows - stats['nulls']
+        numeric = self.numeric and stats['type'] in ('long', 'float') and count > 0
+        # Exact while under DISTINCT_CAP, otherwise the shared HyperLogLog estimate
+        cardinality = stats['distinct_estimate'] if self.distinct_capped else len(self.values)
+        result = {
+            'type': 'numeric' if numeric else 'categorical',
+            'count': count,
+            'missing': stats['nulls'],
+            'missing_rate': round(stats['nulls'] / total_rows, 6) if total_rows else 0.0,
+            'cardinality': cardinality,
+            'cardinality_is_estimate': self.distinct_capped
+        }
+        if not numeric:
+            result['top_values'] = [{'value': value, 'count': int(count)}
+                                    for value, count in self.values.most_common(5)]
+        else:
+            mean = self.sum / self.count
+            result.update({
+                'min': float(stats['min']),
+                'max': float(stats['max']),
+                'mean': float(mean),
+                'std': float(np.sqrt(max(0.0, self.sum_sq / self.count - mean ** 2)))
+            })
+        return result
+
+
+def _best_threshold(bins, y, regression, n_classes, n_bins):
+    """
+    Bin threshold of the best single split of the fit rows (decision stump): rows with
+    bins up to the threshold go left. None when no split separates the rows.
+    """
+    n = len(y)
+    if n_bins < 2 or n < 2:
+        return None
+
+    if regression:
+        counts = np.bincount(bins, minlength=n_bins).astype('float64')
+        sums = np.bincount(bins, weights=y, minlength=n_bins)
+        sums_sq = np.bincount(bins, weights=y * y, minlength=n_bins)
+        left_n, left_s, left_sq = (np.cumsum(a)[:-1] for a in (counts, sums, sums_sq))
+        right_n, right_s, right_sq = n - left_n, sums.sum() - left_s, sums_sq.sum() - left_sq
+        with np.errstate(divide='ignore', invalid='ignore'):
+            impurity = (left_sq - left_s ** 2 / left_n) + (right_sq - right_s ** 2 / right_n)
+    else:
+        counts = np.zeros((n_bins, n_classes))
+        np.add.at(counts, (bins, y), 1)
+        left = np.cumsum(counts, axis=0)[:-1]
+        right = counts.sum(axis=0) - left
+        left_n = left.sum(axis=1)
+        right_n = right.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            left_gini = 1.0 - np.square(left / left_n[:, None]).sum(axis=1)
+            right_gini = 1.0 - np.square(right / right_n[:, None]).sum(axis=1)
+        impurity = left_n * left_gini + right_n * right_gini
+    impurity = np.where((left_n > 0) & (right_n > 0), impurity, np.inf)
+    if not np.isfinite(impurity).any():
+        return None
+    return int(np.argmin(impurity))
+
+
+def _holdout_gain(fit_bins, fit_y, score_bins, score_y, regression, n_classes, threshold):
+    """
+    Error reduction on the score rows of the stump fitted on the fit rows, against
+    predicting the fit rows' overall mean (or class shares) for every row: the
+    squared error for numeric targets, the Brier score for classes. 0 when the split
+    does not help on rows it was not fitted on.
+    """
+    fit_left = fit_bins <= threshold
+    score_left = score_bins <= threshold
+    if regression:
+        baseline = np.full(len(score_y), fit_y.mean())
+        prediction = np.where(score_left, fit_y[fit_left].mean(), fit_y[~fit_left].mean())
+        parent = np.square(score_y - baseline).sum()
+        split = np.square(score_y - prediction).sum()
+    else:
+        onehot = np.eye(n_classes)[score_y]
+        shares = np.bincount(fit_y, minlength=n_classes) / len(fit_y)
+        left_shares = np.bincount(fit_y[fit_left], minlength=n_classes) / fit_left.sum()
+        right_shares = np.bincount(fit_y[~fit_left], minlength=n_classes) / (~fit_left).sum()
+        prediction = np.where(score_left[:, None], left_shares, right_shares)
+        parent = np.square(onehot - shares).sum()
+        split = np.square(onehot - prediction).sum()
+    if parent <= 0:
+        return 0.0
+    return float(max(0.0, 1.0 - split / parent))
+
+
+def _feature_bins(values, fit, order_target):
+    """
+    Ordered bin ids of a feature, with the bin edges or category order learned on the
+    fit rows only. Numeric features are split on quantile bins with missing values in
+    a bin of their own, categorical features on their most frequent categories
+    ordered by their mean target; other categories share one bin.
+    """
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        x = values.to_numpy(dtype='float64')
+        finite = x[fit][~np.isnan(x[fit])]
+        if finite.size == 0:
+            return None, 0
+        edges = np.unique(np.quantile(finite, np.linspace(0, 1, STUMP_BINS + 1)[1:-1]))
+        bins = np.searchsorted(edges, x, side='right')
+        bins = np.where(np.isnan(x), len(edges) + 1, bins)
+        return bins, len(edges) + 2
+
+    codes, _ = pd.factorize(values.astype(str), use_na_sentinel=False)
+    # Only frequent categories get their own bin, so identifiers cannot memorise the target
+    frequency = np.bincount(codes[fit], minlength=codes.max() + 1)
+    frequent = np.argsort(frequency, kind='stable')[::-1][:STUMP_BINS]
+    frequent = frequent[frequency[frequent] >= MIN_CATEGORY_ROWS]
+    remap = np.full(len(frequency), len(frequent), dtype=np.int64)
+    remap[frequent] = np.arange(len(frequent))
+    codes = remap[codes]
+    n_bins = len(frequent) + 1
+    fit_counts = np.bincount(codes[fit], minlength=n_bins)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.bincount(codes[fit], weights=order_target, minlength=n_bins) / fit_counts
+    means = np.where(fit_counts > 0, means, order_target.mean())
+    rank = np.empty(n_bins, dtype=np.int64)
+    rank[np.argsort(means, kind='stable')] = np.arange(n_bins)
+    return rank[codes], n_bins
+
+
+def quick_feature_importance(sample, target_column, regression, seed=None):
+    """
+    Feature importance from one decision stump per feature on the reservoir sample.
+
+    The sample is split in half: bins, category order and split threshold are learned
+    on one half and the stump is scored on the other, so a feature scores how much it
+    improves predictions of rows it has not seen (0 to 1). Scores are not normalised,
+    so features of a dataset without signal all score close to 0.
+    """
+    sample = sample.dropna(subset=[target_column])
+    if len(sample) < 2:
+        return {}
+
+    if regression:
+        y = pd.to_numeric(sample[target_column], errors='coerce')
+        sample = sample[y.notna()]
+        y = y[y.notna()].to_numpy(dtype='float64')
+        n_classes = 0
+        order_target = y
+    else:
+        y, classes = pd.factorize(sample[target_column].astype(str))
+        n_classes = len(classes)
+        if n_classes < 2:
+            return {}
+        # Rate of the rarest class orders categories for binary and multiclass targets
+        rare = np.bincount(y).argmin()
+        order_target = (y == rare).astype('float64')
+
+    fit = np.zeros(len(y), dtype=bool)
+    fit[np.random.default_rng(seed).permutation(len(y))[:len(y) // 2]] = True
+    if fit.sum() < 2 or (~fit).sum() < 1:
+        return {}
+
+    gains = {}
+    for column in sample.columns:
+        if column == target_column:
+            continue
+        bins, n_bins = _feature_bins(sample[column], fit, order_target[fit])
+        if bins is None:
+            continue
+        bins = bins.astype(np.int64)
+        threshold = _best_threshold(bins[fit], y[fit], regression, n_classes, n_bins)
+        gains[column] = 0.0 if threshold is None else round(_holdout_gain(
+            bins[fit], y[fit], bins[~fit], y[~fit], regression, n_classes, threshold), 6)
+    return gains
+
+
+def build_insights_report(s3, bucket, keys, target_column, problem_type, dataset_uri=None, seed=None):
+    """
+    Stream the CSV objects once and build a data insights report.
+
+    Produces missing rates, cardinality, target correlation, class balance, duplicate
+    rows and quick-model feature importance. The layout is the engine's own, tagged
+    with report_version; report_reader and report_metrics read it as well as the
+    Data Wrangler job's report.
+    """
+    regression = problem_type.lower() == 'regression'
+    rng = np.random.default_rng(seed)
+    stats = ColumnStats()
+    columns = {}
+    column_order = []
+    total_rows = 0
+    row_hashes = []
+    target_counts = Counter()
+    reservoir = None
+
+    for key in keys:
+        body = s3.get_object(Bucket=bucket, Key=key)['Body']
+        for chunk in pd.read_csv(body, chunksize=CHUNK_ROWS):
+            if target_column not in chunk.columns:
+                raise ValueError(f"Target column {target_column} not found in s3://{bucket}/{key}")
+            total_rows += len(chunk)
+            stats.update(chunk)
+            row_hashes.append(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+            target = chunk[target_column]
+            if not regression:
+                target_counts.update(target.dropna().astype(str).value_counts().to_dict())
+
+            for column in chunk.columns:
+                if column not in columns:
+                    columns[column] = ColumnInsights(column)
+                    column_order.append(column)
+                columns[column].update(chunk[column], None if column == target_column else target, regression)
+
+            # Bottom-k random keys give a uniform reservoir sample over all chunks
+            keyed = chunk.assign(_sample_key=rng.random(len(chunk)))
+            reservoir = keyed if reservoir is None else pd.concat([reservoir, keyed], ignore_index=True)
+            if len(reservoir) > MODEL_SAMPLE_ROWS:
+                reservoir = reservoir.nsmallest(MODEL_SAMPLE_ROWS, '_sample_key')
+
+    if total_rows == 0:
+        raise ValueError("Dataset contains no rows")
+
+    hashes = np.concatenate(row_hashes)
+    duplicate_rows = int(total_rows - np.unique(hashes).size)
+
+    positive_label = None
+    class_balance = None
+    if not regression and target_counts:
+        labelled = sum(target_counts.values())
+        positive_label = min(target_counts, key=target_counts.get)
+        class_balance = {
+            'counts': dict(target_counts),
+            'ratios': {label: round(count / labelled, 6) for label, count in target_counts.items()},
+            'minority_class': positive_label,
+            'imbalance_ratio': round(max(target_counts.values()) / max(min(target_counts.values()), 1), 4)
+        }
+
+    importance = quick_feature_importance(reservoir.drop(columns='_sample_key'), target_column, regression,
+                                          seed=seed)
+
+    shared = stats.to_dict()['columns']
+    column_reports = {}
+    warnings = []
+    for column in column_order:
+        insights = columns[column]
+        report = insights.summary(total_rows, shared[column])
+        if report['type'] == 'numeric':
+            # Median from the reservoir sample, exact for datasets that fit in it
+            median = pd.to_numeric(reservoir[column], errors='coerce').median()
+            report['median'] = float(median) if pd.notna(median) else None
+        if column != target_column:
+            correlation = insights.target_correlation(regression, positive_label)
+            report['target_correlation'] = round(correlation, 6) if correlation is not None else None
+            report['feature_importance'] = importance.get(column)
+        column_reports[column] = report
+
+        if report['missing_rate'] > HIGH_MISSING_RATE:
+            warnings.append({'type': 'high_missing_rate', 'column': column,
+                             'message': f"{column} is missing in {report['missing_rate']:.1%} of rows"})
+        if report['cardinality'] == 1:
+            warnings.append({'type': 'constant_column', 'column': column,
+                             'message': f"{column} has a single distinct value"})
+        if report['type'] == 'categorical' and report['count'] > 100 and \
+                (insights.distinct_capped or report['cardinality'] > 0.9 * report['count']):
+            warnings.append({'type': 'high_cardinality', 'column': column,
+                             'message': f"{column} is almost unique per row and behaves like an identifier"})
+        correlation = report.get('target_correlation')
+        if column != target_column and correlation is not None and abs(correlation) >= LEAKAGE_SCORE:
+            warnings.append({'type': 'target_leakage', 'column': column,
+                             'message': f"{column} is almost perfectly correlated with {target_column}"})
+
+    if duplicate_rows:
+        warnings.append({'type': 'duplicate_rows', 'column': None,
+                         'message': f"{duplicate_rows} duplicate rows found"})
+    if class_balance and min(class_balance['ratios'].values()) < LOW_MINORITY_SHARE:
+        warnings.append({'type': 'class_imbalance', 'column': target_column,
+                         'message': f"Minority class {positive_label} is {min(class_balance['ratios'].values()):.2%} of labelled rows"})
+
+    ranked = sorted(importance.items(), key=lambda item: item[1], reverse=True)
+    return {
+        'report_version': REPORT_VERSION,
+        'report_type': 'data_insights',
+        'engine': 'local',
+        'dataset': {
+            'uri': dataset_uri,
+            'rows': total_rows,
+            'columns': len(column_order)
+        },
+        'target_column': target_column,
+        'problem_type': problem_type,
+        'summary': {
+            'rows': total_rows,
+            'columns': len(column_order),
+            'missing_cells': int(sum(shared[c]['nulls'] for c in column_order)),
+            'duplicate_rows': duplicate_rows,
+            'duplicate_rate': round(duplicate_rows / total_rows, 6),
+            'model_sample_rows': int(len(reservoir))
+        },
+        'class_balance': class_balance,
+        'duplicate_rows': duplicate_rows,
+        'feature_importance': [{'column': column, 'importance': value} for column, value in ranked],
+        'columns': column_reports,
+        'warnings': warnings
+    }
@@ -0,0 +1,143 @@
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from sidecars import read_sidecar, write_sidecar, normalize_etag
+from sketches import HyperLogLog, hash_values
+
+logger = logging.getLogger()
+
+# Column statistics of every transform output, stored as a sidecar of the output object
+STATS_KIND = 'column_stats'
+STATS_VERSION = 1
+
+# Low precision keeps the registers out of the sidecar small; about 3% relative error
+STATS_HLL_PRECISION = 10
+
+# When chunks disagree the most general type wins, as in create_flow's schema inference
+TYPE_PRECEDENCE = ['long', 'float', 'datetime', 'bool', 'string']
+
+
+def _column_type(series, values):
+    """Data Wrangler type of one chunk of a column, or None when it is entirely null."""
+    if values.empty:
+        return None
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'bool'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'long'
+    if pd.api.types.is_float_dtype(dtype):
+        # Integer columns with nulls are parsed as floats
+        numbers = values.to_numpy(dtype=np.float64)
+        return 'long' if len(values) < len(series) and np.all(numbers == np.round(numbers)) else 'float'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    return 'string'
+
+
+def _bound(value):
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        return value.item()
+    return value
+
+
+class ColumnStats:
+    """
+    Row count and per-column nulls, min/max and distinct estimates of a CSV being
+    written, updated with every chunk written so no second pass over the output is needed.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        for name in chunk.columns:
+            series = chunk[name]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype(series.dtype.categories.dtype)
+            values = series.dropna()
+            column = self.columns.setdefault(name, {
+                'types': set(), 'nulls': 0, 'min': None, 'max': None,
+                'hll': HyperLogLog(STATS_HLL_PRECISION)
+            })
+            column['nulls'] += len(series) - len(values)
+            column_type = _column_type(series, values)
+            if column_type is None:
+                continue
+            column['types'].add(column_type)
+            column['hll'].add_hashes(hash_values(values.unique()))
+            # Bounds are only comparable while every chunk agrees on numbers or datetimes
+            if column['types'] <= {'long', 'float'} or column['types'] == {'datetime'}:
+                low, high = _bound(values.min()), _bound(values.max())
+                column['min'] = low if column['min'] is None else min(column['min'], low)
+                column['max'] = high if column['max'] is None else max(column['max'], high)
+
+    def to_dict(self):
+        columns = {}
+        for name, column in self.columns.items():
+            types = column['types']
+            if not types:
+                column_type = 'string'
+            elif types <= {'long', 'float'} or len(types) == 1:
+                column_type = max(types, key=TYPE_PRECEDENCE.index)
+            else:
+                column_type = 'string'
+            non_null = self.rows - column['nulls']
+            columns[name] = {
+                'type': column_type,
+                'nulls': column['nulls'],
+                'distinct_estimate': min(column['hll'].estimate(), non_null),
+                'min': column['min'] if column_type != 'string' else None,
+                'max': column['max'] if column_type != 'string' else None
+            }
+        return {'rows': self.rows, 'columns': columns}
+
+
+def write_column_stats(s3, bucket, key, stats):
+    """
+    Store the statistics of a written object as its sidecar, tagged with the object's
+    ETag and size so readers can tell they still describe it.
+    """
+    try:
+        head = s3.head_object(Bucket=bucket, Key=key)
+    except Exception as e:
+        logger.warning(f"Error reading s3://{bucket}/{key} for its column stats: {str(e)}")
+        return None
+    payload = {
+        'version': STATS_VERSION,
+        'etag': normalize_etag(head.get('ETag')),
+        'size': head['ContentLength'],
+        'generated_at': datetime.utcnow().isoformat(),
+        **stats.to_dict()
+    }
+    write_sidecar(s3, bucket, key, STATS_KIND, payload)
+    logger.info(f"Wrote column stats for s3://{bucket}/{key}: {payload['rows']} rows, "
+                f"{len(payload['columns'])} columns")
+    return payload
+
+
+def write_frame_stats(s3, bucket, key, df):
+    """Statistics sidecar of an object written from an in-memory frame."""
+    stats = ColumnStats()
+    try:
+        stats.update(df)
+    except Exception as e:
+        # The output is already written; readers fall back to scanning it
+        logger.warning(f"Error computing column stats for s3://{bucket}/{key}: {str(e)}")
+        return None
+    return write_column_stats(s3, bucket, key, stats)
+
+
+def read_column_stats(s3, bucket, key, etag):
+    """Statistics of an object, or None when missing or written for another ETag."""
+    stats = read_sidecar(s3, bucket, key, STATS_KIND)
+    if stats and stats.get('version') == STATS_VERSION and stats.get('etag') == normalize_etag(etag):
+        return stats
+    return None
@@ -0,0 +1,145 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+logger = logging.getLogger()
+
+# Rows per chunk when reading a CSV with read_csv_compact
+CHUNK_ROWS = int(os.environ.get('COMPACTION_CHUNK_ROWS', '500000'))
+
+# String columns whose distinct/total ratio is at or below this become categoricals
+CATEGORY_THRESHOLD = float(os.environ.get('COMPACTION_CATEGORY_THRESHOLD', '0.5'))
+
+# float32 round-trips every decimal with up to 6 significant digits
+FLOAT32_SIGNIFICANT_DIGITS = 6
+
+
+def memory_usage_mb(df):
+    """Resident size of a DataFrame in MB, including the contents of object columns."""
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def _is_text(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return False
+    return pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+
+
+def _fits_float32(values):
+    """
+    True when every value has at most FLOAT32_SIGNIFICANT_DIGITS significant digits,
+    so storing it as float32 writes back the same text to CSV.
+    """
+    finite = values[np.isfinite(values) & (values != 0)]
+    if finite.size == 0:
+        return True
+    if np.abs(finite).max() > np.finfo(np.float32).max:
+        return False
+    exponent = np.floor(np.log10(np.abs(finite)))
+    scaled = finite * np.power(10.0, FLOAT32_SIGNIFICANT_DIGITS - 1 - exponent)
+    return bool(np.all(np.abs(scaled - np.rint(scaled)) < 1e-6))
+
+
+def compact_frame(df, category_threshold=CATEGORY_THRESHOLD):
+    """
+    Downcast numeric columns to the smallest dtype that holds their value range and turn
+    low-cardinality string columns into categoricals.
+
+    All conversions are lossless for the CSV the transforms write back. Returns the
+    compacted frame and a report with memory before and after.
+    """
+    before = float(memory_usage_mb(df))
+    changes = {}
+
+    for col in df.columns:
+        series = df[col]
+        old_dtype = str(series.dtype)
+
+        if pd.api.types.is_bool_dtype(series.dtype):
+            continue
+        if pd.api.types.is_integer_dtype(series.dtype):
+            downcast = 'unsigned' if len(series) and series.min() >= 0 else 'integer'
+            df[col] = pd.to_numeric(series, downcast=downcast)
+        elif pd.api.types.is_float_dtype(series.dtype):
+            if series.dtype != np.float32 and _fits_float32(series.to_numpy(dtype='float64')):
+                df[col] = series.astype('float32')
+        elif _is_text(series) and len(series):
+            if series.nunique(dropna=True) <= category_threshold * len(series):
+                df[col] = series.astype('category')
+
+        if str(df[col].dtype) != old_dtype:
+            changes[col] = f"{old_dtype}->{df[col].dtype}"
+
+    after = float(memory_usage_mb(df))
+    report = {
+        'memory_before_mb': round(before, 2),
+        'memory_after_mb': round(after, 2),
+        'reduction_factor': round(before / after, 2) if after else None,
+        'columns': changes
+    }
+    return df, report
+
+
+def _concat_compacted(chunks):
+    """
+    Concatenate compacted chunks, unioning categoricals so per-chunk categories do not
+    fall back to object dtype.
+    """
+    if len(chunks) == 1:
+        return chunks[0]
+
+    for col in chunks[0].columns:
+        float_dtypes = {chunk[col].dtype for chunk in chunks
+                        if pd.api.types.is_float_dtype(chunk[col].dtype)}
+        if len(float_dtypes) > 1:
+            # float32 chunks are widened through their shortest repr, which restores the
+            # original decimals instead of the float32 approximation
+            for chunk in chunks:
+                if chunk[col].dtype == np.float32:
+                    chunk[col] = chunk[col].to_numpy().astype(str).astype('float64')
+
+        if any(isinstance(chunk[col].dtype, pd.CategoricalDtype) for chunk in chunks):
+            parts = [chunk[col] if isinstance(chunk[col].dtype, pd.CategoricalDtype)
+                     else chunk[col].astype('category') for chunk in chunks]
+            categories = union_categoricals(parts, sort_categories=True).categories
+            for chunk, part in zip(chunks, parts):
+                chunk[col] = part.cat.set_categories(categories)
+
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_csv_compact(source, chunksize=CHUNK_ROWS, category_threshold=CATEGORY_THRESHOLD, **read_csv_kwargs):
+    """
+    Read a CSV in chunks and compact each chunk before the next one is parsed, so the
+    uncompacted frame never exists in memory at once.
+
+    source can be anything pd.read_csv accepts, including the streaming Body of an
+    S3 get_object response. Returns the compacted frame and a memory report.
+    """
+    chunks = []
+    before = 0.0
+    original_dtypes = {}
+    for chunk in pd.read_csv(source, chunksize=chunksize, **read_csv_kwargs):
+        before += float(memory_usage_mb(chunk))
+        if not original_dtypes:
+            original_dtypes = {col: str(dtype) for col, dtype in chunk.dtypes.items()}
+        chunk, _ = compact_frame(chunk, category_threshold)
+        chunks.append(chunk)
+
+    if not chunks:
+        raise ValueError("CSV input contains no data")
+
+    df = _concat_compacted(chunks)
+    del chunks
+    # Second pass over the combined frame settles dtypes that differed between chunks
+    df, report = compact_frame(df, category_threshold)
+    report['memory_before_mb'] = round(before, 2)
+    report['columns'] = {col: f"{original_dtypes[col]}->{dtype}" for col, dtype in df.dtypes.items()
+                         if col in original_dtypes and str(dtype) != original_dtypes[col]}
+    after = report['memory_after_mb']
+    report['reduction_factor'] = round(before / after, 2) if after else None
+    logger.info("Compacted frame from %.2f MB to %.2f MB", before, after)
+    return df, report
@@ -0,0 +1,43 @@
+import io
+import os
+
+import pandas as pd
+
+# Byte ranges fetched to sample rows of a CSV object before streaming it
+SAMPLE_RANGES = int(os.environ.get('SAMPLE_RANGES', '8'))
+SAMPLE_RANGE_BYTES = int(os.environ.get('SAMPLE_RANGE_BYTES', str(1024 * 1024)))
+
+
+def sample_rows(s3, bucket, key, object_size):
+    """
+    Read a sample of rows from evenly spaced byte ranges of a CSV object. Returns the
+    sample and the average bytes per sampled row, for row count estimates.
+
+    Each range except the first is realigned to line boundaries by dropping the partial
+    first and last lines, so the sample costs a few small GETs instead of a full read.
+    """
+    if object_size <= SAMPLE_RANGES * SAMPLE_RANGE_BYTES:
+        ranges = [(0, object_size - 1)]
+    else:
+        step = object_size // SAMPLE_RANGES
+        ranges = [(i * step, i * step + SAMPLE_RANGE_BYTES - 1) for i in range(SAMPLE_RANGES)]
+
+    header_line = b''
+    lines = []
+    sampled_bytes = 0
+    for start, end in ranges:
+        body = s3.get_object(Bucket=bucket, Key=key, Range=f'bytes={start}-{end}')['Body'].read()
+        parts = body.split(b'\n')
+        # First line is the header (start == 0) or a partial row; last may be cut off
+        if start == 0:
+            header_line = parts[0]
+        if end < object_size - 1:
+            parts = parts[:-1]
+        rows = [p for p in parts[1:] if p.strip()]
+        sampled_bytes += sum(len(p) + 1 for p in rows)
+        lines.extend(rows)
+
+    sample = pd.read_csv(io.BytesIO(header_line + b'\n' + b'\n'.join(lines)),
+                         on_bad_lines='skip')
+    bytes_per_row = sampled_bytes / max(len(lines), 1)
+    return sample, bytes_per_row
@@ -0,0 +1,179 @@
+import logging
+import math
+import os
+
+from sidecars import read_sidecar, normalize_etag
+
+logger = logging.getLogger()
+
+GIB = 1024 ** 3
+
+# Instance types Data Wrangler processing jobs are sized from, smallest first, with memory in GiB
+INSTANCE_TIERS = [
+    ('ml.m5.xlarge', 16),
+    ('ml.m5.2xlarge', 32),
+    ('ml.m5.4xlarge', 64),
+    ('ml.m5.12xlarge', 192),
+    ('ml.m5.24xlarge', 384)
+]
+
+# Spark holds a parsed CSV in several times its size on disk
+MEMORY_EXPANSION = float(os.environ.get('SIZING_MEMORY_EXPANSION', '4'))
+
+# Per-row overhead in memory, which dominates for narrow files with many rows
+ROW_OVERHEAD_BYTES = int(os.environ.get('SIZING_ROW_OVERHEAD_BYTES', '256'))
+
+# Share of instance memory planned for data, the rest is left to the JVM and the OS
+USABLE_MEMORY_FRACTION = 0.5
+
+# Datasets needing more than one instance of this type are scaled out instead of up
+SCALE_OUT_INSTANCE_TYPE = os.environ.get('SIZING_SCALE_OUT_INSTANCE_TYPE', 'ml.m5.12xlarge')
+MAX_INSTANCE_COUNT = int(os.environ.get('SIZING_MAX_INSTANCE_COUNT', '10'))
+
+# File mode copies the whole input to every instance; outputs and shuffle spill need about as much again
+VOLUME_DATA_MULTIPLIER = 3
+VOLUME_BASE_GB = 10
+MIN_VOLUME_GB = 30
+MAX_VOLUME_GB = 16384
+
+# Sizing kept in a flow's job metadata (internal_metadata.dw_job)
+FLOW_SIZING_KEYS = ('instance_type', 'instance_count', 'volume_size_gb', 'sharded_volume_size_gb')
+
+# Objects whose sidecars are consulted for row counts; the rest are extrapolated by size
+MAX_SIDECAR_LOOKUPS = 20
+
+
+def list_dataset_objects(s3, s3_uri):
+    """
+    List the objects a processing job reads for an S3Prefix input.
+
+    A URI naming a single object lists just that object (plus any objects sharing it as
+    a key prefix, which the job would read as well). Returns the bucket and the objects
+    as list_objects_v2 entries (Key, Size, ETag).
+    """
+    bucket, prefix = s3_uri.replace('s3://', '').split('/', 1)
+    objects = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            if not obj['Key'].endswith('/'):
+                objects.append({'Key': obj['Key'], 'Size': obj['Size'], 'ETag': obj.get('ETag')})
+    return bucket, objects
+
+
+def cached_row_count(s3, bucket, objects):
+    """
+    Row count from the column stats transforms write with their outputs, or from the
+    profiles in schema sidecars, whose ETag still matches. Objects without a usable
+    sidecar are extrapolated from the bytes per row of those with one. Returns None
+    when no sidecar is available.
+    """
+    rows = 0
+    covered_bytes = 0
+    for obj in objects[:MAX_SIDECAR_LOOKUPS]:
+        etag = normalize_etag(obj.get('ETag'))
+        stats = read_sidecar(s3, bucket, obj['Key'], 'column_stats')
+        if stats and stats.get('etag') == etag:
+            rows += int(stats['rows'])
+            covered_bytes += obj['Size']
+            continue
+        sidecar = read_sidecar(s3, bucket, obj['Key'], 'schema')
+        if not sidecar or sidecar.get('etag') != etag:
+            continue
+        estimated = sidecar.get('profile', {}).get('estimated_rows')
+        if estimated:
+            rows += int(estimated)
+            covered_bytes += obj['Size']
+
+    if not covered_bytes:
+        return None
+    total_bytes = sum(obj['Size'] for obj in objects)
+    return int(rows * total_bytes / covered_bytes)
+
+
+def dataset_footprint(s3, s3_uri, objects=None, estimated_rows=None):
+    """
+    Total bytes, object count and best known row count of a dataset URI.
+
+    objects can be passed when the caller already listed the URI, estimated_rows when
+    the row count is already known (e.g. from a fresh schema profile).
+    """
+    if objects is None:
+        bucket, objects = list_dataset_objects(s3, s3_uri)
+    else:
+        bucket = s3_uri.replace('s3://', '').split('/', 1)[0]
+
+    rows_source = 'provided' if estimated_rows else None
+    if not estimated_rows and objects:
+        estimated_rows = cached_row_count(s3, bucket, objects)
+        rows_source = 'sidecar' if estimated_rows else None
+
+    return {
+        'uri': s3_uri,
+        'total_bytes': sum(obj['Size'] for obj in objects),
+        'object_count': len(objects),
+        'estimated_rows': estimated_rows,
+        'rows_source': rows_source
+    }
+
+
+def size_processing_job(footprint, sharded=False):
+    """
+    Pick instance type, instance count and volume size for a processing job over the
+    dataset described by footprint.
+
+    The smallest instance whose usable memory holds the expanded dataset is used on
+    its own; beyond SCALE_OUT_INSTANCE_TYPE the job scales out to more instances. The
+    volume holds the input copy plus outputs and spill; with a sharded input each
+    instance only copies its share of the data. INSTANCE_TYPE, INSTANCE_COUNT
+    and VOLUME_SIZE environment variables, when set, override the model.
+    """
+    total_bytes = footprint.get('total_bytes') or 0
+    rows = footprint.get('estimated_rows') or 0
+    working_bytes = max(total_bytes * MEMORY_EXPANSION, rows * ROW_OVERHEAD_BYTES)
+
+    instance_type, instance_count = None, 1
+    scale_out_memory = dict(INSTANCE_TIERS)[SCALE_OUT_INSTANCE_TYPE]
+    for tier_type, memory_gb in INSTANCE_TIERS:
+        if memory_gb > scale_out_memory:
+            break
+        if working_bytes <= memory_gb * GIB * USABLE_MEMORY_FRACTION:
+            instance_type = tier_type
+            break
+    if instance_type is None:
+        instance_type = SCALE_OUT_INSTANCE_TYPE
+        instance_count = min(MAX_INSTANCE_COUNT,
+                             math.ceil(working_bytes / (scale_out_memory * GIB * USABLE_MEMORY_FRACTION)))
+
+    instance_bytes = total_bytes / instance_count if sharded else total_bytes
+    volume_size_gb = math.ceil(instance_bytes * VOLUME_DATA_MULTIPLIER / GIB) + VOLUME_BASE_GB
+    volume_size_gb = min(MAX_VOLUME_GB, max(MIN_VOLUME_GB, volume_size_gb))
+
+    sizing = {
+        'instance_type': os.environ.get('INSTANCE_TYPE') or instance_type,
+        'instance_count': int(os.environ.get('INSTANCE_COUNT') or instance_count),
+        'volume_size_gb': int(os.environ.get('VOLUME_SIZE') or volume_size_gb)
+    }
+    logger.info(f"Sized processing job for {total_bytes} bytes in {footprint.get('object_count')} objects "
+                f"({rows or 'unknown'} rows): {sizing}")
+    return sizing
+
+
+def size_flow_job(footprint):
+    """
+    size_processing_job for either input distribution: the sizing plus the volume each
+    instance needs when the input is sharded, as create_flow stores it in a flow.
+    """
+    sizing = size_processing_job(footprint)
+    sizing['sharded_volume_size_gb'] = sizing['volume_size_gb']
+    if sizing['instance_count'] > 1:
+        sizing['sharded_volume_size_gb'] = size_processing_job(footprint, sharded=True)['volume_size_gb']
+    return sizing
+
+
+def flow_job_sizing(flow):
+    """Sizing stored in a flow's job metadata, or None for flows written without one."""
+    dw_job = flow.get('internal_metadata', {}).get('dw_job', {})
+    if not all(dw_job.get(key) for key in FLOW_SIZING_KEYS):
+        return None
+    return {key: dw_job[key] for key in FLOW_SIZING_KEYS}
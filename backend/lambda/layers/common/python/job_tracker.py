@@ -0,0 +1,165 @@
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+from sidecars import read_sidecar, write_sidecar
+
+logger = logging.getLogger()
+
+# Tracked jobs are sidecars of this kind, keyed by the job name
+TRACKER_KIND = 'job_status'
+
+TERMINAL_STATUSES = ('Completed', 'Failed', 'Stopped')
+
+# A non-terminal status nobody has updated for this long is refreshed with
+# DescribeProcessingJob, in case a state-change event was missed
+STATUS_CACHE_TTL_SECONDS = int(os.environ.get('STATUS_CACHE_TTL_SECONDS', '60'))
+
+# Report file name list_reports_uri looks for under processor_output
+REPORT_FILE_NAME = 'data_wrangler_visualization_job.json'
+
+# EventBridge detail type of SageMaker processing job state changes
+STATE_CHANGE_DETAIL_TYPE = 'SageMaker Processing Job State Change'
+
+# Records already read by this container, keyed by job name
+_status_cache = {}
+
+
+def _now():
+    return time.time()
+
+
+def _cache(record):
+    _status_cache[record['jobName']] = (_now(), record)
+    return record
+
+
+def _is_fresh(record, read_at):
+    return record.get('status') in TERMINAL_STATUSES or _now() - read_at < STATUS_CACHE_TTL_SECONDS
+
+
+def read_job(s3, bucket, job_name):
+    return read_sidecar(s3, bucket, job_name, TRACKER_KIND)
+
+
+def _write_job(s3, bucket, record):
+    record['updatedAt'] = _now()
+    write_sidecar(s3, bucket, record['jobName'], TRACKER_KIND, record)
+    return _cache(record)
+
+
+def track_job(s3, bucket, job, connection=None):
+    """
+    Record a submitted job so state-change events can update it. job is the result of
+    create_data_quality_insight; connection ({'connectionId', 'endpoint'}) is the
+    websocket connection to notify when the job finishes. Tracking a job again adds
+    the connection to its subscribers.
+    """
+    record = read_job(s3, bucket, job['jobName']) or {
+        'jobName': job['jobName'],
+        'jobArn': job.get('jobArn'),
+        'resultsPath': job.get('resultsPath'),
+        'status': job.get('status', 'InProgress'),
+        'subscribers': []
+    }
+    if job.get('reportUri'):
+        record['reportUri'] = job['reportUri']
+    if connection and connection.get('connectionId') and connection not in record['subscribers']:
+        record['subscribers'].append(connection)
+    return _write_job(s3, bucket, record)
+
+
+def state_change_event(description):
+    """
+    EventBridge state-change event for a DescribeProcessingJob response. Used to feed
+    statuses read directly from SageMaker through the same path as real events.
+    """
+    return {
+        'source': 'aws.sagemaker',
+        'detail-type': STATE_CHANGE_DETAIL_TYPE,
+        'time': datetime.now(timezone.utc).isoformat(),
+        'detail': {
+            'ProcessingJobName': description['ProcessingJobName'],
+            'ProcessingJobArn': description.get('ProcessingJobArn'),
+            'ProcessingJobStatus': description['ProcessingJobStatus'],
+            'FailureReason': description.get('FailureReason'),
+            'ExitMessage': description.get('ExitMessage')
+        }
+    }
+
+
+def find_report_uri(s3, bucket, job_name):
+    """URI of the insights report a finished job wrote, or None."""
+    prefix = f"processor_output/{job_name}/"
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            if obj['Key'].endswith(REPORT_FILE_NAME):
+                return f"s3://{bucket}/{obj['Key']}"
+    return None
+
+
+def apply_event(s3, bucket, event):
+    """
+    Update a tracked job from a state-change event. Returns the updated record, or
+    None for jobs this tracker did not submit. Events can arrive more than once and
+    out of order, so a terminal status is never replaced.
+    """
+    detail = event.get('detail', {})
+    job_name = detail.get('ProcessingJobName')
+    record = read_job(s3, bucket, job_name) if job_name else None
+    if not record:
+        return None
+    status = detail.get('ProcessingJobStatus')
+    if record.get('status') in TERMINAL_STATUSES or status == record.get('status'):
+        return _cache(record)
+
+    record['status'] = status
+    if detail.get('FailureReason'):
+        record['failureReason'] = detail['FailureReason']
+    if status == 'Completed' and not record.get('reportUri'):
+        record['reportUri'] = find_report_uri(s3, bucket, job_name)
+    logger.info(f"Job {job_name} is now {status}")
+    return _write_job(s3, bucket, record)
+
+
+def mark_notified(s3, bucket, record):
+    record['notifiedAt'] = _now()
+    return _write_job(s3, bucket, record)
+
+
+def get_job_status(s3, sagemaker_client, bucket, job_name):
+    """
+    Status record of a tracked job, served from the container cache or the tracker
+    record while they are fresh. Only a stale non-terminal status costs a
+    DescribeProcessingJob call. Jobs that were never tracked are described directly.
+    """
+    cached = _status_cache.get(job_name)
+    if cached and _is_fresh(cached[1], cached[0]):
+        return cached[1]
+
+    record = read_job(s3, bucket, job_name)
+    if record and _is_fresh(record, record.get('updatedAt', 0)):
+        return _cache(record)
+
+    try:
+        description = sagemaker_client.describe_processing_job(ProcessingJobName=job_name)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('ValidationException', 'ResourceNotFound'):
+            raise ValueError(f"Processing job {job_name} not found")
+        raise
+    if not record:
+        record = track_job(s3, bucket, {
+            'jobName': job_name,
+            'jobArn': description.get('ProcessingJobArn'),
+            'status': 'InProgress'
+        })
+    previous_status = record.get('status')
+    updated = apply_event(s3, bucket, state_change_event(description))
+    if updated.get('status') == previous_status:
+        # Unchanged status: refresh the timestamp so the next lookups hit the cache
+        updated = _write_job(s3, bucket, updated)
+    return updated
@@ -0,0 +1,465 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from sidecars import read_sidecar, write_sidecar, sidecar_key, normalize_etag
+from object_index import INDEX_KIND, read_index as read_object_index, list_shards, merge_shards
+
+logger = logging.getLogger()
+
+# Listings of a prefix are persisted as a sidecar of this kind, keyed by the prefix,
+# and rewritten only when the objects change. When the prefix was last listed is kept
+# in a small sidecar of its own, so listings that find nothing new only rewrite that.
+LISTING_KIND = 'listing'
+CHECK_KIND = 'listing_check'
+LISTING_VERSION = 2
+
+# Warm containers answer from memory for this long before checking S3 again
+LISTING_CACHE_TTL_SECONDS = int(os.environ.get('LISTING_CACHE_TTL_SECONDS', '30'))
+
+# Prefixes whose keys are written in name order (keys_in_order in LIST_OPERATIONS) are
+# listed in full this often; in between only keys after the last known one are listed,
+# so deletions appear on the next full listing. Other prefixes are listed in full
+# every time.
+FULL_LISTING_SECONDS = int(os.environ.get('FULL_LISTING_SECONDS', '300'))
+
+# A listing persisted by any container this recently is used as is
+LISTING_COALESCE_SECONDS = float(os.environ.get('LISTING_COALESCE_SECONDS', '5'))
+
+# The container listing a prefix holds a lease sidecar of this kind, taken with a
+# conditional put. Other containers poll for its listing instead of listing the prefix
+# too, so clients connecting together share one S3 listing per prefix. A lease older
+# than LISTING_LEASE_SECONDS is taken over, and waiters stop waiting after that long.
+LEASE_KIND = 'listing_lease'
+LISTING_LEASE_SECONDS = float(os.environ.get('LISTING_LEASE_SECONDS', '30'))
+LEASE_POLL_SECONDS = 0.2
+
+# Key ranges listed concurrently during a full listing
+LISTING_WORKERS = int(os.environ.get('LISTING_WORKERS', '8'))
+
+# Levels of single sub-prefixes descended while looking for ones to list in parallel
+MAX_PARTITION_DEPTH = 3
+
+# List operations of the websocket API: the prefix listed, the key suffix (or
+# suffixes) kept, the response field, whether the newest objects come first and
+# whether new keys sort after existing ones. Flow keys carry a %Y%m%d-%H%M%S timestamp;
+# datasets are named freely and job names start with a day of month and one of two
+# prefixes, so their new keys can sort anywhere.
+LIST_OPERATIONS = {
+    'listS3URIs': {'prefix': os.environ.get('LIST_DATA_PREFIX', 'input_data'),
+                   'suffix': '.csv', 'field': 'uris', 'newest_first': False},
+    'listFlowURIs': {'prefix': os.environ.get('LIST_FLOW_PREFIX', 'flows'),
+                     'suffix': '.flow', 'field': 'flows', 'newest_first': False, 'keys_in_order': True},
+    'listReportURIs': {'prefix': os.environ.get('LIST_REPORTS_PREFIX', 'processor_output/'),
+                       'suffix': ('data_wrangler_visualization_job.json', 'local_insights_report.json'),
+                       'field': 'reports',
+                       'newest_first': True}
+}
+
+# Filters and ordering accepted by list_objects
+LIST_FILTERS = ('search', 'column', 'min_rows', 'modified_after', 'sort', 'descending', 'limit')
+SORT_FIELDS = ('name', 'last_modified', 'size', 'rows')
+
+# Listings and object indexes of this container, keyed by (bucket, prefix)
+_listing_cache = {}
+_object_index_cache = {}
+
+# Listings and object indexes being fetched in this container, keyed by what is fetched
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def _entry(obj):
+    last_modified = obj.get('LastModified')
+    return {
+        'size': obj['Size'],
+        'etag': normalize_etag(obj.get('ETag')),
+        'last_modified': last_modified.isoformat() if hasattr(last_modified, 'isoformat') else last_modified
+    }
+
+
+def _list_objects(s3, bucket, prefix, start_after=None, end_before=None):
+    """
+    Objects under prefix with keys after start_after and before end_before, following
+    continuation tokens past 1000 keys.
+    """
+    kwargs = {'Bucket': bucket, 'Prefix': prefix}
+    if start_after:
+        kwargs['StartAfter'] = start_after
+    objects = {}
+    for page in s3.get_paginator('list_objects_v2').paginate(**kwargs):
+        for obj in page.get('Contents', []):
+            if end_before and obj['Key'] >= end_before:
+                return objects
+            if not obj['Key'].endswith('/'):
+                objects[obj['Key']] = _entry(obj)
+    return objects
+
+
+def _partitions(s3, bucket, prefix):
+    """
+    Sub-prefixes of prefix, descending through prefixes that hold a single one.
+    Returns the prefix reached, its sub-prefixes and the objects directly under it;
+    without sub-prefixes those objects are the complete listing.
+    """
+    for _ in range(MAX_PARTITION_DEPTH):
+        sub_prefixes, direct = [], {}
+        for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix, Delimiter='/'):
+            sub_prefixes.extend(common['Prefix'] for common in page.get('CommonPrefixes', []))
+            for obj in page.get('Contents', []):
+                if not obj['Key'].endswith('/'):
+                    direct[obj['Key']] = _entry(obj)
+        if len(sub_prefixes) != 1 or direct:
+            return prefix, sub_prefixes, direct
+        prefix = sub_prefixes[0]
+    return prefix, [], None
+
+
+def full_listing(s3, bucket, prefix):
+    """
+    List every object under prefix. The key space is cut at sub-prefix boundaries into
+    one contiguous range per worker and the ranges are listed concurrently, so the
+    request count stays that of a sequential listing.
+    """
+    prefix, sub_prefixes, direct = _partitions(s3, bucket, prefix)
+    if not sub_prefixes and direct is not None:
+        return direct
+    if len(sub_prefixes) < 2:
+        return _list_objects(s3, bucket, prefix)
+
+    step = -(-len(sub_prefixes) // LISTING_WORKERS)
+    boundaries = sub_prefixes[step::step]
+    ranges = list(zip([None] + boundaries, boundaries + [None]))
+    objects = {}
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        for listed in executor.map(lambda bounds: _list_objects(s3, bucket, prefix, *bounds), ranges):
+            objects.update(listed)
+    return objects
+
+
+def _read_index(s3, bucket, prefix):
+    index = read_sidecar(s3, bucket, prefix, LISTING_KIND)
+    if index and index.get('version') == LISTING_VERSION:
+        return index
+    return None
+
+
+def _read_check(s3, bucket, prefix):
+    check = read_sidecar(s3, bucket, prefix, CHECK_KIND)
+    if check and check.get('version') == LISTING_VERSION:
+        return check
+    return None
+
+
+def _persisted_listing(s3, bucket, prefix, cached):
+    """
+    Listing as last persisted by any container, or None. The listing itself is only
+    fetched when it changed since the one cached in this container.
+    """
+    check = _read_check(s3, bucket, prefix)
+    if not check:
+        return None
+    index = cached['index'] if cached else None
+    if not index or index['updated_at'] != check['updated_at']:
+        index = _read_index(s3, bucket, prefix)
+    if not index:
+        return None
+    return {**index, 'listed_at': check['listed_at'], 'checked_at': check['checked_at']}
+
+
+def _single_flight(key, fn):
+    """
+    Run fn once for concurrent callers with the same key: the first caller runs it and
+    the others wait for and share its result, or its exception.
+    """
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = _in_flight[key] = Future()
+    if not leader:
+        return future.result()
+    try:
+        future.set_result(fn())
+    except Exception as e:
+        future.set_exception(e)
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+    return future.result()
+
+
+def _precondition_failed(error):
+    return error.response['Error']['Code'] in ('PreconditionFailed', 'ConditionalRequestConflict', '412')
+
+
+def _acquire_lease(s3, bucket, prefix):
+    """
+    Take the listing lease of a prefix. Returns the lease's ETag when taken, and the
+    time its holder took it when another container holds it. Both are None when
+    leases cannot be used (the caller then lists without one).
+    """
+    key = sidecar_key(prefix, LEASE_KIND)
+    now = time.time()
+    body = json.dumps({'taken_at': now})
+    try:
+        try:
+            return s3.put_object(Bucket=bucket, Key=key, Body=body, IfNoneMatch='*')['ETag'], None
+        except ClientError as e:
+            if not _precondition_failed(e):
+                raise
+        current = s3.get_object(Bucket=bucket, Key=key)
+        lease = json.loads(current['Body'].read().decode('utf-8'))
+        if not lease.get('released') and now - lease.get('taken_at', 0) < LISTING_LEASE_SECONDS:
+            return None, lease['taken_at']
+        # Released or abandoned: take it over unless another container just did
+        try:
+            return s3.put_object(Bucket=bucket, Key=key, Body=body, IfMatch=current['ETag'])['ETag'], None
+        except ClientError as e:
+            if not _precondition_failed(e):
+                raise
+            return None, now
+    except (ClientError, ValueError) as e:
+        logger.warning(f"Listing s3://{bucket}/{prefix} without a lease: {str(e)}")
+        return None, None
+
+
+def _release_lease(s3, bucket, prefix, etag):
+    try:
+        s3.put_object(Bucket=bucket, Key=sidecar_key(prefix, LEASE_KIND),
+                      Body=json.dumps({'released': True}), IfMatch=etag)
+    except ClientError as e:
+        # Taken over after expiring, or lost; it expires either way
+        logger.info(f"Could not release the listing lease of s3://{bucket}/{prefix}: {str(e)}")
+
+
+def _wait_for_listing(s3, bucket, prefix, cached, since, refresh):
+    """
+    Poll for the listing of the container holding the lease since the given time.
+    Returns it, or None when the holder did not persist one in time.
+    """
+    field = 'listed_at' if refresh else 'checked_at'
+    while time.time() < since + LISTING_LEASE_SECONDS:
+        time.sleep(LEASE_POLL_SECONDS)
+        check = _read_check(s3, bucket, prefix)
+        if check and check[field] >= since:
+            return _persisted_listing(s3, bucket, prefix, cached)
+    return None
+
+
+def _update_listing(s3, bucket, prefix, refresh):
+    now = time.time()
+    cached = _listing_cache.get((bucket, prefix))
+    # Another container may have brought the persisted index up to date just now
+    index = _persisted_listing(s3, bucket, prefix, cached) or (cached['index'] if cached else None)
+    if index:
+        last_listed = index['listed_at'] if refresh else index['checked_at']
+        if now - last_listed < LISTING_COALESCE_SECONDS:
+            _listing_cache[(bucket, prefix)] = {'index': index, 'checked_at': now}
+            return index
+
+    lease, held_since = _acquire_lease(s3, bucket, prefix)
+    if held_since is not None:
+        listed = _wait_for_listing(s3, bucket, prefix, cached, held_since, refresh)
+        if listed:
+            _listing_cache[(bucket, prefix)] = {'index': listed, 'checked_at': time.time()}
+            return listed
+        logger.info(f"No listing of s3://{bucket}/{prefix} from the lease holder, listing it")
+    # Stamped after the lease was taken, so waiters recognise this listing
+    now = time.time()
+    try:
+        return _list_prefix(s3, bucket, prefix, index, refresh, now)
+    finally:
+        if lease:
+            _release_lease(s3, bucket, prefix, lease)
+
+
+def _keys_in_order(prefix):
+    return any(spec['prefix'] == prefix and spec.get('keys_in_order') for spec in LIST_OPERATIONS.values())
+
+
+def _list_prefix(s3, bucket, prefix, index, refresh, now):
+    """Bring index (None for none) up to date with S3 and persist it."""
+    if (refresh or not index or not _keys_in_order(prefix)
+            or now - index['listed_at'] >= FULL_LISTING_SECONDS):
+        objects = full_listing(s3, bucket, prefix)
+        changed = index is None or objects != index['objects']
+        index = {**(index or {'version': LISTING_VERSION, 'prefix': prefix}), 'objects': objects, 'listed_at': now}
+        logger.info(f"Listed {len(objects)} objects under s3://{bucket}/{prefix}")
+    else:
+        added = _list_objects(s3, bucket, prefix, start_after=index.get('last_key'))
+        changed = bool(added)
+        index = {**index, 'objects': {**index['objects'], **added}}
+        if added:
+            logger.info(f"Added {len(added)} objects to the listing of s3://{bucket}/{prefix}")
+
+    # The check is persisted after every listing so that containers asking within the
+    # coalescing window reuse the listing rather than listing again. It is written
+    # after the listing, and not at all when that fails, so it never announces a
+    # listing other containers cannot read.
+    index['checked_at'] = now
+    persisted = True
+    if changed:
+        index['last_key'] = max(index['objects'], default=None)
+        index['updated_at'] = now
+        persisted = write_sidecar(s3, bucket, prefix, LISTING_KIND,
+                                  {field: index[field] for field in
+                                   ('version', 'prefix', 'objects', 'last_key', 'updated_at')})
+    if persisted:
+        write_sidecar(s3, bucket, prefix, CHECK_KIND, {
+            'version': LISTING_VERSION,
+            'listed_at': index['listed_at'],
+            'checked_at': now,
+            'updated_at': index['updated_at']
+        })
+    _listing_cache[(bucket, prefix)] = {'index': index, 'checked_at': now}
+    return index
+
+
+def get_listing(s3, bucket, prefix, refresh=False):
+    """
+    Listing index of a prefix: its objects keyed by key with size, ETag and
+    last-modified time.
+
+    Warm containers reuse their listing for LISTING_CACHE_TTL_SECONDS. Otherwise the
+    prefix is listed again. For prefixes whose keys are written in name order only the
+    keys after the last known one are listed, which is a single request however many
+    objects the prefix holds, and the whole prefix every FULL_LISTING_SECONDS or when
+    refresh is set. The persisted index is fetched only when another container changed
+    it since this one read it.
+
+    Identical requests are coalesced: concurrent callers in a container share one
+    in-flight listing, callers in other containers wait for the listing of the
+    container holding the prefix's lease, and a prefix checked by any container within
+    LISTING_COALESCE_SECONDS is not listed again.
+    """
+    cached = _listing_cache.get((bucket, prefix))
+    if cached and not refresh and time.time() - cached['checked_at'] < LISTING_CACHE_TTL_SECONDS:
+        return cached['index']
+    return _single_flight((bucket, prefix, refresh), lambda: _update_listing(s3, bucket, prefix, refresh))
+
+
+def get_object_index(s3, bucket, prefix, refresh=False):
+    """
+    Object metadata index of a prefix, reused by warm containers like listings.
+
+    The index is kept in shards (see object_index.py). Once they are listed, only
+    shards whose ETag changed since this container read them are fetched again.
+    """
+    now = time.time()
+    cached = _object_index_cache.get((bucket, prefix))
+    if cached and not refresh and now - cached['checked_at'] < LISTING_CACHE_TTL_SECONDS:
+        return cached['index']
+
+    def read():
+        known = cached['shards'] if cached else {}
+        etags = list_shards(s3, bucket, prefix)
+        stale = [shard for shard, etag in etags.items() if shard not in known or known[shard][0] != etag]
+        shards = {shard: known[shard] for shard in etags if shard not in stale}
+        if stale:
+            with ThreadPoolExecutor(max_workers=min(LISTING_WORKERS, len(stale))) as executor:
+                for shard, index in zip(stale, executor.map(
+                        lambda shard: read_object_index(s3, bucket, shard), stale)):
+                    shards[shard] = (etags[shard], index)
+        index = merge_shards(prefix, [index for _, index in shards.values()])
+        _object_index_cache[(bucket, prefix)] = {'index': index, 'shards': shards, 'checked_at': now}
+        return index
+    return _single_flight((INDEX_KIND, bucket, prefix), read)
+
+
+def _indexed_objects(s3, bucket, prefix, refresh):
+    """
+    Listing entries enriched with the object index: rows, columns and schema of
+    objects whose ETag the index has seen. Objects indexed since the listing are
+    added and objects deleted since it dropped.
+    """
+    listing = get_listing(s3, bucket, prefix, refresh)
+    index = get_object_index(s3, bucket, prefix, refresh)
+    objects = {}
+    for key, entry in listing['objects'].items():
+        if index['deleted'].get(key, 0) > listing['listed_at']:
+            continue
+        metadata = index['objects'].get(key)
+        objects[key] = {**entry, **metadata} if metadata and metadata['etag'] == entry['etag'] else dict(entry)
+    for key, metadata in index['objects'].items():
+        objects.setdefault(key, dict(metadata))
+    return objects
+
+
+def list_objects(s3, bucket, prefix, suffix='', newest_first=False, refresh=False, search=None,
+                 column=None, min_rows=None, modified_after=None, sort=None, descending=None, limit=None):
+    """
+    Objects under prefix whose key ends with suffix, with their URI, size, ETag,
+    last-modified time and, when indexed, rows, columns, schema and column stats key.
+
+    search matches part of the key, column keeps objects with that column, min_rows
+    and modified_after (ISO 8601) drop smaller and older objects. sort is one of
+    SORT_FIELDS; by default objects are sorted by name, or newest first.
+    """
+    objects = _indexed_objects(s3, bucket, prefix, refresh)
+    results = []
+    for key, entry in objects.items():
+        if not key.endswith(suffix) or (search and search.lower() not in key.lower()):
+            continue
+        if column and column not in (entry.get('columns') or []):
+            continue
+        if min_rows is not None and (entry.get('rows') or 0) < int(min_rows):
+            continue
+        if modified_after and (entry.get('last_modified') or '') < modified_after:
+            continue
+        results.append({'uri': f"s3://{bucket}/{key}", 'key': key, **entry})
+
+    sort = sort or ('last_modified' if newest_first else 'name')
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"Unknown sort field: {sort}")
+    if descending is None:
+        descending = sort != 'name'
+    field = 'key' if sort == 'name' else sort
+    # Objects without the field (e.g. rows of unindexed objects) go last either way
+    present = [entry for entry in results if entry.get(field) is not None]
+    missing = [entry for entry in results if entry.get(field) is None]
+    present.sort(key=lambda entry: entry[field], reverse=bool(descending))
+    results = present + sorted(missing, key=lambda entry: entry['key'])
+    return results[:int(limit)] if limit else results
+
+
+def list_uris(s3, bucket, prefix, suffix='', newest_first=False, refresh=False):
+    """S3 URIs of the objects under prefix whose key ends with suffix."""
+    return [entry['uri'] for entry in list_objects(s3, bucket, prefix, suffix, newest_first, refresh)]
+
+
+def run_list_operation(s3, bucket, operation, refresh=False, details=False, **filters):
+    """
+    Response body of one of the LIST_OPERATIONS, e.g. {'flows': [...]}. With details
+    the matching objects' metadata is returned under 'objects' as well.
+    """
+    spec = LIST_OPERATIONS.get(operation)
+    if not spec:
+        raise ValueError(f"Unknown list operation: {operation}")
+    objects = list_objects(s3, bucket, spec['prefix'], spec['suffix'], spec['newest_first'],
+                           refresh, **filters)
+    body = {spec['field']: [entry['uri'] for entry in objects]}
+    if details:
+        body['objects'] = objects
+    return body
+
+
+def list_all(s3, bucket, refresh=False, details=False):
+    """
+    Datasets, flows and reports in one response, with the prefixes listed concurrently.
+    With details their metadata is returned under 'objects', keyed by the same fields.
+    """
+    result = {'objects': {}} if details else {}
+    with ThreadPoolExecutor(max_workers=len(LIST_OPERATIONS)) as executor:
+        bodies = executor.map(lambda operation: run_list_operation(s3, bucket, operation, refresh, details),
+                              LIST_OPERATIONS)
+        for spec, body in zip(LIST_OPERATIONS.values(), bodies):
+            if details:
+                result['objects'][spec['field']] = body.pop('objects')
+            result.update(body)
+    return result
@@ -0,0 +1,190 @@
+import logging
+import os
+import time
+from datetime import datetime
+from urllib.parse import quote_plus, unquote_plus
+
+from sidecars import SIDECAR_PREFIX, read_sidecar, write_sidecar, sidecar_key, normalize_etag
+
+logger = logging.getLogger()
+
+# Object metadata of a listed prefix, kept as sidecars of this kind: one shard per
+# sub-prefix (e.g. one per processing job output), keyed by the sub-prefix, so an event
+# rewrites the metadata of its neighbours rather than of the whole prefix
+INDEX_KIND = 'object_index'
+INDEX_VERSION = 2
+
+# Column stats written by the transforms (see column_stats.py)
+STATS_KIND = 'column_stats'
+
+# Bytes read from the head of a CSV without column stats for its header and row estimate
+HEADER_SAMPLE_BYTES = 65536
+
+# Deleted keys are remembered this long so listings older than the deletion can drop them
+TOMBSTONE_SECONDS = int(os.environ.get('OBJECT_INDEX_TOMBSTONE_SECONDS', '86400'))
+
+OBJECT_CREATED = 'Object Created'
+OBJECT_DELETED = 'Object Deleted'
+
+
+def object_event(bucket, key, created=True, size=None, etag=None):
+    """
+    EventBridge-shaped S3 event, as delivered by the bucket's EventBridge notifications.
+    The key is URL-encoded like S3 encodes it ('a b+c.csv' -> 'a+b%2Bc.csv').
+    """
+    detail_object = {'key': quote_plus(key, safe='/')}
+    if created:
+        detail_object.update({'size': size, 'etag': etag})
+    return {
+        'source': 'aws.s3',
+        'detail-type': OBJECT_CREATED if created else OBJECT_DELETED,
+        'time': datetime.utcnow().isoformat(),
+        'detail': {'bucket': {'name': bucket}, 'object': detail_object}
+    }
+
+
+def _empty_index(prefix):
+    return {'version': INDEX_VERSION, 'prefix': prefix, 'objects': {}, 'deleted': {}}
+
+
+def shard_prefix(key, prefix):
+    """
+    Index shard of a key under prefix: the prefix and the first path segment below it.
+
+    processor_output/, processor_output/job-1/output/report.json -> processor_output/job-1/
+    input_data, input_data/transactions.csv -> input_data/
+    """
+    cut = key.find('/', len(prefix) + 1)
+    if cut < 0:
+        cut = key.rfind('/')
+    return key[:max(cut + 1, len(prefix))]
+
+
+def read_index(s3, bucket, shard):
+    """One index shard, empty when it does not exist or predates INDEX_VERSION."""
+    index = read_sidecar(s3, bucket, shard, INDEX_KIND)
+    if index and index.get('version') == INDEX_VERSION:
+        return index
+    return _empty_index(shard)
+
+
+def list_shards(s3, bucket, prefix):
+    """ETags of the index shards of a prefix, keyed by shard prefix."""
+    root = f"{SIDECAR_PREFIX}/{INDEX_KIND}/"
+    shards = {}
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=f"{root}{prefix}"):
+        for obj in page.get('Contents', []):
+            shard = obj['Key'][len(root):-len('.json')]
+            if obj['Key'].endswith('.json') and shard.startswith(prefix):
+                shards[shard] = normalize_etag(obj.get('ETag'))
+    return shards
+
+
+def merge_shards(prefix, shards):
+    """Index of a whole prefix from its shards."""
+    index = _empty_index(prefix)
+    for shard in shards:
+        index['objects'].update(shard['objects'])
+        index['deleted'].update(shard['deleted'])
+    return index
+
+
+def _csv_metadata(s3, bucket, key, etag, size):
+    """
+    Rows, columns and schema of a CSV from the column stats its transform wrote, or
+    the header and a row estimate from its first bytes when there are none.
+    """
+    stats = read_sidecar(s3, bucket, key, STATS_KIND)
+    if stats and stats.get('etag') == etag:
+        return {
+            'rows': stats['rows'],
+            'rows_exact': True,
+            'columns': list(stats['columns']),
+            'schema': {column: info['type'] for column, info in stats['columns'].items()},
+            'stats': sidecar_key(key, STATS_KIND)
+        }
+    head = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{HEADER_SAMPLE_BYTES - 1}")['Body'].read()
+    lines = head.split(b'\n')
+    header = lines[0].rstrip(b'\r').decode('utf-8', errors='replace')
+    rows = lines[1:] if size <= HEADER_SAMPLE_BYTES else lines[1:-1]
+    rows = [line for line in rows if line.strip()]
+    if size <= HEADER_SAMPLE_BYTES:
+        estimated = len(rows)
+    elif rows:
+        estimated = int((size - len(lines[0]) - 1) / (sum(len(line) + 1 for line in rows) / len(rows)))
+    else:
+        estimated = None
+    return {
+        'rows': estimated,
+        'rows_exact': size <= HEADER_SAMPLE_BYTES,
+        'columns': [column.strip('"') for column in header.split(',')] if header else [],
+        'schema': None,
+        'stats': None
+    }
+
+
+def describe_object(s3, bucket, key):
+    """Index entry of an object, or None when it no longer exists."""
+    try:
+        head = s3.head_object(Bucket=bucket, Key=key)
+    except Exception as e:
+        logger.info(f"Not indexing s3://{bucket}/{key}: {str(e)}")
+        return None
+    last_modified = head.get('LastModified')
+    entry = {
+        'size': head['ContentLength'],
+        'etag': normalize_etag(head.get('ETag')),
+        'last_modified': last_modified.isoformat() if hasattr(last_modified, 'isoformat') else last_modified,
+        'indexed_at': datetime.utcnow().isoformat()
+    }
+    if key.endswith('.csv'):
+        entry.update(_csv_metadata(s3, bucket, key, entry['etag'], entry['size']))
+    return entry
+
+
+def index_prefix_for(key, prefixes):
+    """The longest indexed prefix a key falls under, or None."""
+    matches = [prefix for prefix in prefixes if key.startswith(prefix)]
+    return max(matches, key=len) if matches else None
+
+
+def apply_event(s3, bucket, event, prefixes):
+    """
+    Apply one S3 object event to the index shard the object belongs to. prefixes maps
+    each indexed prefix to the key suffix (or suffixes) its listing serves; other
+    objects are not indexed.
+
+    Created objects are described and upserted, deleted ones removed and remembered
+    for TOMBSTONE_SECONDS. A column stats sidecar landing re-describes the object it
+    belongs to, since transforms write it just after the object. Returns the index
+    entry, or None when the event does not concern an indexed object.
+    """
+    detail = event.get('detail', {})
+    bucket = detail.get('bucket', {}).get('name') or bucket
+    # Keys arrive URL-encoded, as in S3 event notifications
+    key = unquote_plus(detail.get('object', {}).get('key', ''))
+    created = event.get('detail-type') != OBJECT_DELETED
+
+    stats_prefix = f"{SIDECAR_PREFIX}/{STATS_KIND}/"
+    if key.startswith(stats_prefix) and key.endswith('.json'):
+        key, created = key[len(stats_prefix):-len('.json')], True
+    prefix = index_prefix_for(key, prefixes)
+    if prefix is None or not key.endswith(prefixes[prefix]):
+        return None
+
+    shard = shard_prefix(key, prefix)
+    index = read_index(s3, bucket, shard)
+    now = time.time()
+    index['deleted'] = {deleted: at for deleted, at in index['deleted'].items()
+                        if now - at < TOMBSTONE_SECONDS}
+    entry = describe_object(s3, bucket, key) if created else None
+    if entry:
+        index['objects'][key] = entry
+        index['deleted'].pop(key, None)
+    else:
+        index['objects'].pop(key, None)
+        index['deleted'][key] = now
+    index['updated_at'] = now
+    write_sidecar(s3, bucket, shard, INDEX_KIND, index)
+    logger.info(f"{'Indexed' if entry else 'Removed'} s3://{bucket}/{key} in the {shard} index")
+    return entry
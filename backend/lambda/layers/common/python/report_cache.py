@@ -0,0 +1,95 @@
+import json
+import logging
+import os
+from collections import OrderedDict
+
+from sidecars import read_sidecar, write_sidecar, normalize_etag
+from report_reader import load_report_projection, REPORT_CHUNK_BYTES
+
+logger = logging.getLogger()
+
+# Parsed reports kept by a warm container, in bytes of their JSON encoding
+REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Default projection of a report, stored as a sidecar so follow-up analyses are one small GET
+SUMMARY_KIND = 'report_summary'
+# Bumped when the default projection changes, so summaries of older projections are rebuilt
+SUMMARY_VERSION = 2
+
+
+class ReportCache:
+    """
+    Least recently used cache of parsed reports with a total size limit. Entries are
+    keyed by report URI and ETag, so a rewritten report is never served stale.
+    """
+
+    def __init__(self, max_bytes=REPORT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.size -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def project_object(s3, bucket, key, **options):
+    """Stream a report object through load_report_projection."""
+    body = s3.get_object(Bucket=bucket, Key=key)['Body']
+    try:
+        return load_report_projection(body.iter_chunks(REPORT_CHUNK_BYTES), **options)
+    finally:
+        body.close()
+
+
+def read_report_summary(s3, bucket, key, etag):
+    """Summary sidecar of the report, or None when missing or written for another ETag."""
+    summary = read_sidecar(s3, bucket, key, SUMMARY_KIND)
+    if summary and summary.get('etag') == normalize_etag(etag) and summary.get('version') == SUMMARY_VERSION:
+        return summary
+    return None
+
+
+def write_report_summary(s3, bucket, key, etag=None, body=None):
+    """
+    Compute the default projection of a report and store it as its summary sidecar.
+    Called once a report is written; body, the report bytes when the caller still has
+    them, saves reading it back. Returns the summary.
+    """
+    if etag is None:
+        etag = s3.head_object(Bucket=bucket, Key=key).get('ETag')
+    if body is not None:
+        report, projection = load_report_projection([body])
+    else:
+        report, projection = project_object(s3, bucket, key)
+    summary = {
+        'version': SUMMARY_VERSION,
+        'etag': normalize_etag(etag),
+        'data': report,
+        'projection': projection
+    }
+    write_sidecar(s3, bucket, key, SUMMARY_KIND, summary)
+    logger.info(f"Wrote summary of s3://{bucket}/{key} ({len(json.dumps(report, default=str))} bytes)")
+    return summary
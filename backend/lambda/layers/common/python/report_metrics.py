@@ -0,0 +1,283 @@
+import logging
+import math
+
+from sidecars import read_sidecar, write_sidecar, normalize_etag
+from report_reader import (JsonStream, Oversized, COLUMN_FIELD_MAX_BYTES, REPORT_CHUNK_BYTES, COLUMNS_SECTION,
+                           NAME_FIELDS, IMPORTANCE_FIELDS, iter_sections, section_name, first_field,
+                           target_name, ranking_scores)
+
+logger = logging.getLogger()
+
+# Per-column metrics of a report, stored column-wise as a sidecar of the report
+INDEX_KIND = 'report_metrics'
+INDEX_VERSION = 2
+
+METRIC_FIELDS = ('missing_rate', 'cardinality', 'mean', 'std', 'min', 'max', 'median',
+                 'target_correlation', 'feature_importance')
+
+SUMMARY_FIELDS = ('rows', 'columns', 'missing_cells', 'duplicate_rows', 'duplicate_rate')
+
+# Names of the metrics in the local engine's report and in the Data Wrangler report,
+# compared in snake case
+METRIC_ALIASES = {
+    'missing_rate': ('missing_rate', 'missing_ratio', 'missing_fraction'),
+    'cardinality': ('cardinality', 'distinct_count', 'unique_count', 'number_of_unique_values', 'distinct'),
+    'mean': ('mean', 'average'),
+    'std': ('std', 'stddev', 'standard_deviation'),
+    'min': ('min', 'minimum'),
+    'max': ('max', 'maximum'),
+    'median': ('median',),
+    'target_correlation': ('target_correlation', 'correlation_with_target', 'correlation'),
+    'feature_importance': IMPORTANCE_FIELDS
+}
+SUMMARY_ALIASES = {
+    'rows': ('rows', 'number_of_rows', 'row_count', 'number_of_samples', 'samples'),
+    'columns': ('columns', 'number_of_columns', 'number_of_features', 'features'),
+    'missing_cells': ('missing_cells', 'missing_values', 'number_of_missing_values'),
+    'duplicate_rows': ('duplicate_rows', 'number_of_duplicate_rows', 'duplicates'),
+    'duplicate_rate': ('duplicate_rate', 'duplicate_ratio')
+}
+# Largest ranking section parsed; the Data Wrangler feature summary can hold more than scores
+RANKING_MAX_BYTES = 1024 * 1024
+
+TYPE_FIELDS = ('type', 'data_type', 'logical_type', 'inferred_type')
+DISTRIBUTION_FIELDS = ('ratios', 'distribution', 'class_distribution', 'label_distribution')
+
+# Drift flags against the baseline report
+MISSING_RATE_CHANGE = 0.05      # absolute change of the missing rate
+MEAN_SHIFT_STDS = 0.5           # mean moved by this many baseline standard deviations
+CARDINALITY_RATIO = 2.0         # distinct count grew or shrank by this factor
+IMPORTANCE_CHANGE = 0.1         # absolute change of the feature importance
+CORRELATION_CHANGE = 0.2        # absolute change of the target correlation
+MINORITY_SHARE_CHANGE = 0.2     # relative change of the minority class share
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _read_small_object(stream, limit=COLUMN_FIELD_MAX_BYTES):
+    """Fields of the next object that are small enough to parse."""
+    if stream.peek() != '{':
+        stream.skip_value()
+        return {}
+    result = {}
+    for field in stream.iter_object():
+        value = stream.read_value(limit)
+        if not isinstance(value, Oversized):
+            result[field] = value
+    return result
+
+
+def _flatten(entry):
+    """Fields of a column entry, with those of nested objects (such as statistics) merged in."""
+    flat = dict(entry)
+    for value in entry.values():
+        if isinstance(value, dict):
+            for field, nested in value.items():
+                flat.setdefault(field, nested)
+    return flat
+
+
+def _column_metrics(entry):
+    entry = _flatten(entry)
+    metrics = {field: _number(first_field(entry, aliases)) for field, aliases in METRIC_ALIASES.items()}
+    if metrics['missing_rate'] is None:
+        percentage = _number(first_field(entry, ('missing_percentage', 'missing_percent')))
+        metrics['missing_rate'] = percentage / 100 if percentage is not None else None
+    column_type = first_field(entry, TYPE_FIELDS)
+    return metrics, column_type if isinstance(column_type, str) else None
+
+
+def _minority_share(value):
+    """Smallest class share of a class balance or target section, from shares or counts."""
+    distribution = first_field(value, DISTRIBUTION_FIELDS)
+    if not isinstance(distribution, dict):
+        return None
+    values = [_number(share) for share in distribution.values()]
+    values = [share for share in values if share is not None and share >= 0]
+    if len(values) < 2 or not sum(values):
+        return None
+    total = sum(values)
+    # Counts are turned into shares, percentages too
+    return min(values) / total if abs(total - 1) > 1e-6 else min(values)
+
+
+def extract_metrics(chunks):
+    """
+    Build the metrics index of a report in one streaming pass: summary figures, class
+    balance and, per column, the METRIC_FIELDS as parallel lists. Histograms and
+    other large fields are skipped without being parsed. Reports of the Data Wrangler
+    job and of the local engine are both read, through the section names of
+    report_reader and the metric names of METRIC_ALIASES.
+    """
+    stream = JsonStream(chunks)
+    index = {
+        'version': INDEX_VERSION,
+        'summary': {},
+        'minority_share': None,
+        'columns': [],
+        'types': [],
+        'metrics': {field: [] for field in METRIC_FIELDS}
+    }
+    ranking, target_share, seen = {}, None, set()
+
+    def add_column(name, entry):
+        if name in seen:
+            return
+        seen.add(name)
+        metrics, column_type = _column_metrics(entry)
+        index['columns'].append(name)
+        index['types'].append(column_type)
+        for field in METRIC_FIELDS:
+            index['metrics'][field].append(metrics[field])
+
+    for key in iter_sections(stream):
+        name = section_name(key)
+        if name == 'summary':
+            summary = _flatten(_read_small_object(stream))
+            for field, aliases in SUMMARY_ALIASES.items():
+                value = _number(first_field(summary, aliases))
+                if value is not None:
+                    index['summary'][field] = value
+        elif name == 'target_column' and 'target_column' not in index:
+            value = _read_small_object(stream) if stream.peek() == '{' else stream.read_value(COLUMN_FIELD_MAX_BYTES)
+            if target_name(value):
+                index['target_column'] = target_name(value)
+            if isinstance(value, dict):
+                target_share = _minority_share(value)
+        elif name == 'class_balance':
+            index['minority_share'] = _minority_share(_read_small_object(stream))
+        elif name == 'feature_importance' and not ranking:
+            value = stream.read_value(RANKING_MAX_BYTES)
+            ranking = ranking_scores(value) if not isinstance(value, Oversized) else {}
+        elif name == COLUMNS_SECTION and stream.peek() == '{':
+            for column in stream.iter_object():
+                add_column(column, _read_small_object(stream))
+        elif name == COLUMNS_SECTION and stream.peek() == '[':
+            for position in stream.iter_array():
+                entry = _read_small_object(stream)
+                column = first_field(entry, NAME_FIELDS)
+                add_column(str(column) if column is not None else str(position), entry)
+        else:
+            stream.skip_value()
+
+    if index['minority_share'] is None:
+        index['minority_share'] = target_share
+    # Importance from the ranking section for columns whose entries do not carry one
+    importance = index['metrics']['feature_importance']
+    for i, column in enumerate(index['columns']):
+        if importance[i] is None:
+            importance[i] = _number(ranking.get(column))
+    return index
+
+
+def get_metrics_index(s3, bucket, key, etag):
+    """
+    Metrics index of a report, from its sidecar while the report's ETag is unchanged,
+    otherwise extracted from the report and stored for the next comparison.
+    """
+    etag = normalize_etag(etag)
+    index = read_sidecar(s3, bucket, key, INDEX_KIND)
+    if index and index.get('etag') == etag and index.get('version') == INDEX_VERSION:
+        return index
+    body = s3.get_object(Bucket=bucket, Key=key)['Body']
+    try:
+        index = extract_metrics(body.iter_chunks(REPORT_CHUNK_BYTES))
+    finally:
+        body.close()
+    index['etag'] = etag
+    write_sidecar(s3, bucket, key, INDEX_KIND, index)
+    logger.info(f"Indexed {len(index['columns'])} columns of s3://{bucket}/{key}")
+    return index
+
+
+def _positions(index):
+    """Position of every column in the index lists."""
+    return {name: i for i, name in enumerate(index['columns'])}
+
+
+def _column_flags(values, types, report_number):
+    """Drift flags of one column in one report against the baseline values."""
+    base, other = values[0], values[report_number]
+    flags = []
+
+    def add(flag, change):
+        flags.append({'type': flag, 'report': report_number, 'change': round(change, 6)})
+
+    if types[0] and types[report_number] and types[0] != types[report_number]:
+        flags.append({'type': 'type_change', 'report': report_number,
+                      'change': f"{types[0]} -> {types[report_number]}"})
+    if base['missing_rate'] is not None and other['missing_rate'] is not None:
+        change = other['missing_rate'] - base['missing_rate']
+        if abs(change) >= MISSING_RATE_CHANGE:
+            add('missing_rate_change', change)
+    if base['mean'] is not None and other['mean'] is not None and base['std']:
+        shift = (other['mean'] - base['mean']) / base['std']
+        if abs(shift) >= MEAN_SHIFT_STDS:
+            add('mean_shift_stds', shift)
+    if base['cardinality'] and other['cardinality']:
+        ratio = other['cardinality'] / base['cardinality']
+        if ratio >= CARDINALITY_RATIO or ratio <= 1 / CARDINALITY_RATIO:
+            add('cardinality_ratio', ratio)
+    for field, threshold in (('feature_importance', IMPORTANCE_CHANGE),
+                             ('target_correlation', CORRELATION_CHANGE)):
+        if base[field] is not None and other[field] is not None:
+            change = other[field] - base[field]
+            if abs(change) >= threshold:
+                add(f"{field}_change", change)
+    return flags
+
+
+def compare_indexes(indexes, labels):
+    """
+    Compare the metrics indexes of several reports against the first one. Returns
+    per-report summaries, the columns added or removed, and the metrics and drift
+    flags of every column that changed, most flagged first.
+    """
+    positions = [_positions(index) for index in indexes]
+    baseline_columns = set(indexes[0]['columns'])
+    reports = []
+    for i, (index, label) in enumerate(zip(indexes, labels)):
+        entry = {'report': label, **index.get('summary', {}),
+                 'minority_share': index.get('minority_share')}
+        if i:
+            names = set(index['columns'])
+            entry['added_columns'] = sorted(names - baseline_columns)
+            entry['removed_columns'] = sorted(baseline_columns - names)
+            base_share, share = indexes[0].get('minority_share'), index.get('minority_share')
+            if base_share and share is not None and abs(share - base_share) / base_share >= MINORITY_SHARE_CHANGE:
+                entry['class_balance_shift'] = round(share / base_share, 4)
+        reports.append(entry)
+
+    changed = []
+    unchanged = 0
+    for name in indexes[0]['columns']:
+        values, types = [], []
+        for index, position in zip(indexes, positions):
+            i = position.get(name)
+            values.append({field: index['metrics'][field][i] if i is not None else None
+                           for field in METRIC_FIELDS})
+            types.append(index['types'][i] if i is not None else None)
+        flags = []
+        for report_number in range(1, len(indexes)):
+            if types[report_number] is not None or values[report_number]['missing_rate'] is not None:
+                flags.extend(_column_flags(values, types, report_number))
+        if not flags:
+            unchanged += 1
+            continue
+        changed.append({
+            'column': name,
+            'flags': flags,
+            'metrics': {field: [value[field] for value in values]
+                        for field in METRIC_FIELDS if any(value[field] is not None for value in values)}
+        })
+    changed.sort(key=lambda column: len(column['flags']), reverse=True)
+    return {
+        'baseline': labels[0],
+        'reports': reports,
+        'changedColumns': changed,
+        'unchangedColumns': unchanged
+    }
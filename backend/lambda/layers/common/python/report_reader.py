@@ -0,0 +1,545 @@
+import codecs
+import heapq
+import json
+import os
+import re
+
+# Largest projected report returned to the agent. Bedrock action group responses are
+# limited to 25 KB, which also has to hold the rest of the response body.
+REPORT_MAX_BYTES = int(os.environ.get('REPORT_MAX_BYTES', '20000'))
+
+# Columns returned besides the target, by feature importance
+REPORT_TOP_K_COLUMNS = int(os.environ.get('REPORT_TOP_K_COLUMNS', '10'))
+
+# Larger per-column fields (histograms, value distributions) are left out
+COLUMN_FIELD_MAX_BYTES = 2048
+
+# Sections outside DEFAULT_SECTIONS are returned by default up to this size
+OTHER_SECTION_MAX_BYTES = 4096
+
+# Bytes read from S3 per chunk while streaming a report
+REPORT_CHUNK_BYTES = 64 * 1024
+
+# Sections returned when no sections are requested, besides the selected columns
+DEFAULT_SECTIONS = ('report_version', 'report_type', 'engine', 'dataset', 'target_column', 'problem_type',
+                    'summary', 'class_balance', 'duplicate_rows', 'feature_importance', 'warnings')
+
+COLUMNS_SECTION = 'columns'
+
+# Top-level sections of the Data Wrangler report and of the local engine's report,
+# by the name the projection returns them under. Names are compared in snake case.
+SECTION_ALIASES = {
+    'summary': ('summary', 'dataset_statistics', 'dataset_summary', 'statistics', 'overview'),
+    'target_column': ('target_column', 'target', 'target_column_insights', 'label_column'),
+    'class_balance': ('class_balance', 'target_distribution', 'label_distribution'),
+    'duplicate_rows': ('duplicate_rows', 'duplicates'),
+    'feature_importance': ('feature_importance', 'quick_model', 'prediction_power', 'feature_summary'),
+    COLUMNS_SECTION: ('columns', 'feature_details', 'features', 'column_statistics'),
+    'warnings': ('warnings', 'high_priority_warnings', 'alerts')
+}
+
+# Objects that wrap the whole report in some layouts; their sections are read as top-level ones
+WRAPPER_SECTIONS = ('report', 'data_insights_report', 'insights_report', 'data_quality_and_insights_report')
+
+# Fields naming a column, and holding its importance, in rankings and column entries
+NAME_FIELDS = ('column', 'name', 'feature', 'feature_name', 'column_name')
+IMPORTANCE_FIELDS = ('feature_importance', 'importance', 'prediction_power', 'score')
+
+# Lists such as feature_importance and warnings are shortened to this many items
+# before any column is dropped to fit the byte budget
+LIST_FLOOR = 20
+
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_STRING_END = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r'[,\]}\s]')
+_NON_SPACE = re.compile(r'\S')
+_NOT_WORD = re.compile(r'[^a-z0-9]+')
+_ALIASES = {alias: name for name, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+
+def snake_case(name):
+    """'Feature Details' -> 'feature_details'"""
+    return _NOT_WORD.sub('_', str(name).lower()).strip('_')
+
+
+def section_name(key):
+    """Name a top-level report section is returned under, in either report layout."""
+    key = snake_case(key)
+    return _ALIASES.get(key, key)
+
+
+def first_field(entry, fields):
+    """Value of the first of fields present in entry, with field names compared in snake case."""
+    if not isinstance(entry, dict):
+        return None
+    present = {snake_case(key): value for key, value in entry.items()}
+    for field in fields:
+        if present.get(field) is not None:
+            return present[field]
+    return None
+
+
+def target_name(value):
+    """Target column name from the target section: a name, or an object describing the column."""
+    if isinstance(value, str):
+        return value
+    name = first_field(value, NAME_FIELDS + ('target_column', 'target'))
+    return name if isinstance(name, str) else None
+
+
+class Oversized:
+    """Placeholder for a value skipped because it exceeded its byte limit."""
+
+    def __init__(self, size):
+        self.size = size
+
+
+class JsonStream:
+    """
+    Pull parser over a stream of JSON bytes.
+
+    Values the caller does not want are skipped by scanning for structural characters
+    without building them, and wanted values are parsed with json.loads from their
+    raw text, so memory is bounded by the largest value read, not by the document.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._capture = None
+        self._capture_start = 0
+        self._capture_size = 0
+        self._capture_limit = None
+        self.bytes_read = 0
+
+    def _fill(self):
+        """Replace the consumed buffer with the next chunk. False at the end of input."""
+        if self._eof:
+            return False
+        if self._capture is not None:
+            part = self._buf[self._capture_start:]
+            self._capture_size += len(part)
+            if self._capture_limit is None or self._capture_size <= self._capture_limit:
+                self._capture.append(part)
+            self._capture_start = 0
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            self._buf = self._decoder.decode(b'', final=True)
+        else:
+            self.bytes_read += len(chunk)
+            self._buf = self._decoder.decode(chunk)
+        self._pos = 0
+        return bool(self._buf) or not self._eof
+
+    def peek(self):
+        """Next non-whitespace character, without consuming it. None at the end."""
+        while True:
+            match = _NON_SPACE.search(self._buf, self._pos)
+            if match:
+                self._pos = match.start()
+                return self._buf[self._pos]
+            self._pos = len(self._buf)
+            if not self._fill():
+                return None
+
+    def _expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at byte {self.bytes_read}")
+        self._pos += 1
+
+    def _skip_string(self):
+        self._pos += 1
+        while True:
+            match = _STRING_END.search(self._buf, self._pos)
+            if not match:
+                self._pos = len(self._buf)
+                if not self._fill():
+                    raise ValueError("Unterminated string")
+                continue
+            self._pos = match.end()
+            if match.group() == '"':
+                return
+            # Escape: the escaped character may start the next chunk
+            if self._pos >= len(self._buf) and not self._fill():
+                raise ValueError("Unterminated string")
+            self._pos += 1
+
+    def skip_value(self):
+        char = self.peek()
+        if char is None:
+            raise ValueError("Unexpected end of JSON")
+        if char == '"':
+            self._skip_string()
+            return
+        if char not in '{[':
+            while True:
+                match = _SCALAR_END.search(self._buf, self._pos)
+                if match:
+                    self._pos = match.start()
+                    return
+                self._pos = len(self._buf)
+                if not self._fill():
+                    return
+        depth = 0
+        while True:
+            match = _STRUCTURAL.search(self._buf, self._pos)
+            if not match:
+                self._pos = len(self._buf)
+                if not self._fill():
+                    raise ValueError("Unexpected end of JSON")
+                continue
+            if match.group() == '"':
+                self._pos = match.start()
+                self._skip_string()
+                continue
+            self._pos = match.end()
+            depth += 1 if match.group() in '{[' else -1
+            if depth == 0:
+                return
+
+    def read_value(self, limit=None):
+        """
+        Parse the next value. Values whose raw text exceeds limit characters are
+        skipped and returned as Oversized.
+        """
+        self.peek()
+        self._capture, self._capture_start = [], self._pos
+        self._capture_size, self._capture_limit = 0, limit
+        try:
+            self.skip_value()
+            tail = self._buf[self._capture_start:self._pos]
+            size = self._capture_size + len(tail)
+            if limit is not None and size > limit:
+                return Oversized(size)
+            return json.loads(''.join(self._capture) + tail)
+        finally:
+            self._capture = None
+
+    def iter_object(self):
+        """Yield the keys of the next object. The caller consumes each value."""
+        self._expect('{')
+        while True:
+            char = self.peek()
+            if char == '}':
+                self._pos += 1
+                return
+            if char == ',':
+                self._pos += 1
+                continue
+            key = self.read_value()
+            self._expect(':')
+            yield key
+
+    def iter_array(self):
+        """Yield the indexes of the next array. The caller consumes each element."""
+        self._expect('[')
+        index = 0
+        while True:
+            char = self.peek()
+            if char == ']':
+                self._pos += 1
+                return
+            if char == ',':
+                self._pos += 1
+                continue
+            yield index
+            index += 1
+
+
+def path_tree(paths):
+    """
+    ['summary', 'columns.amount'] -> {'summary': True, 'columns': {'amount': True}}
+    A whole section wins over paths inside it.
+    """
+    tree = {}
+    for path in paths:
+        node = tree
+        parts = [part for part in path.split('.') if part]
+        for i, part in enumerate(parts):
+            if node.get(part) is True:
+                break
+            if i == len(parts) - 1:
+                node[part] = True
+            else:
+                node = node.setdefault(part, {})
+    return tree
+
+
+class _Projection:
+
+    def __init__(self, stream, max_bytes):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.omitted = []
+        self.truncated = []
+
+    def read_section(self, path):
+        """Read a whole value; arrays are kept up to the byte budget."""
+        if self.stream.peek() != '[':
+            value = self.stream.read_value(self.max_bytes)
+            if isinstance(value, Oversized):
+                self.omitted.append(path)
+                return None
+            return value
+        items, size, total = [], 0, 0
+        for _ in self.stream.iter_array():
+            total += 1
+            if size > self.max_bytes:
+                self.stream.skip_value()
+                continue
+            item = self.stream.read_value(self.max_bytes - size)
+            if isinstance(item, Oversized):
+                size = self.max_bytes + 1
+                continue
+            size += len(json.dumps(item, default=str)) + 2
+            items.append(item)
+        if len(items) < total:
+            self.truncated.append(f"{path} (first {len(items)} of {total})")
+        return items
+
+    def read_tree(self, tree, path=''):
+        """Read the parts of the next value selected by tree."""
+        if self.stream.peek() != '{':
+            return self.read_section(path)
+        result = {}
+        for key in self.stream.iter_object():
+            selection = tree.get(key, tree.get('*'))
+            key_path = f"{path}.{key}" if path else key
+            if selection is None:
+                self.stream.skip_value()
+            elif selection is True:
+                result[key] = self.read_section(key_path)
+            else:
+                result[key] = self.read_tree(selection, key_path)
+        return result
+
+    def read_column(self, path):
+        """One column's statistics without its oversized fields."""
+        if self.stream.peek() != '{':
+            return self.read_section(path)
+        column = {}
+        for field in self.stream.iter_object():
+            value = self.stream.read_value(COLUMN_FIELD_MAX_BYTES)
+            if isinstance(value, Oversized):
+                self.omitted.append(f"{path}.{field}")
+            else:
+                column[field] = value
+        return column
+
+
+def _column_name(index, entry):
+    name = first_field(entry, NAME_FIELDS)
+    return str(name) if name is not None else str(index)
+
+
+def _importance(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def ranking_scores(value):
+    """
+    Feature importance by column from a ranking section: a list of entries naming a
+    column and its importance, a mapping of column to score, or an object holding
+    either (such as the Data Wrangler quick model).
+    """
+    if isinstance(value, list):
+        ranking = {}
+        for item in value:
+            name, score = first_field(item, NAME_FIELDS), _importance(first_field(item, IMPORTANCE_FIELDS))
+            if name is not None and score is not None:
+                ranking[str(name)] = score
+        return ranking
+    if not isinstance(value, dict):
+        return {}
+    scores = {name: _importance(score) for name, score in value.items()}
+    if scores and all(score is not None for score in scores.values()):
+        return scores
+    nested = first_field(value, IMPORTANCE_FIELDS + ('feature_importances',))
+    if isinstance(nested, (dict, list)):
+        return ranking_scores(nested)
+    for item in value.values():
+        if isinstance(item, (dict, list)):
+            ranking = ranking_scores(item)
+            if ranking:
+                return ranking
+    return {}
+
+
+def iter_sections(stream):
+    """
+    Yield the top-level section keys of a report; the caller consumes each value.
+    Wrapper objects, and objects in a top-level array, are descended into so their
+    sections are yielded as top-level ones.
+    """
+    if stream.peek() == '[':
+        for _ in stream.iter_array():
+            if stream.peek() == '{':
+                yield from iter_sections(stream)
+            else:
+                stream.skip_value()
+        return
+    for key in stream.iter_object():
+        if snake_case(key) in WRAPPER_SECTIONS and stream.peek() == '{':
+            yield from iter_sections(stream)
+        else:
+            yield key
+
+
+def _select_columns(projection, ranking, target_column, wanted, top_k):
+    """
+    Stream the columns section and keep the target column, explicitly wanted columns
+    and the top_k columns by feature importance. The ranking section is used when it
+    came before the columns, otherwise each column's own feature_importance; columns
+    without one rank by file order. Only top_k candidates are held at any time.
+    """
+    stream = projection.stream
+    keyed = stream.peek() == '{'
+    keys = stream.iter_object() if keyed else stream.iter_array()
+    kept, heap, seen = {}, [], 0
+    for index, key in enumerate(keys):
+        seen += 1
+        name = key if keyed else None
+        if name is not None and name not in wanted and name != target_column and top_k <= 0:
+            stream.skip_value()
+            continue
+        if name is not None and name not in wanted and name != target_column and name in ranking \
+                and len(heap) >= top_k and ranking[name] <= heap[0][0]:
+            # Ranked below every column already kept
+            stream.skip_value()
+            continue
+        entry = projection.read_column(f"{COLUMNS_SECTION}.{name if name is not None else index}")
+        if name is None:
+            name = _column_name(index, entry)
+        if name in wanted or name == target_column:
+            kept[name] = entry
+            continue
+        score = ranking.get(name)
+        if score is None:
+            score = _importance(first_field(entry, IMPORTANCE_FIELDS))
+        candidate = (score if score is not None else float('-inf'), -index, name, entry)
+        if len(heap) < top_k:
+            heapq.heappush(heap, candidate)
+        elif top_k > 0 and candidate[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, candidate)
+    ranked = sorted(heap, key=lambda item: item[:2], reverse=True)
+    for _, _, name, entry in ranked:
+        kept[name] = entry
+    return kept, seen
+
+
+def _enforce_budget(report, max_bytes, target_column, truncated):
+    """
+    Cut the report down to max_bytes: long lists are shortened to LIST_FLOOR items
+    first, then the lowest ranked columns are dropped, then lists are shortened
+    further and finally whole sections are dropped.
+    """
+    def size():
+        return len(json.dumps(report, default=str))
+
+    def shorten(floor):
+        for key, value in report.items():
+            while isinstance(value, list) and len(value) > floor and size() > max_bytes:
+                del value[max(floor, len(value) // 2):]
+                truncated.append(f"{key} (shortened to {len(value)} items)")
+
+    shorten(LIST_FLOOR)
+    columns = report.get(COLUMNS_SECTION)
+    if isinstance(columns, dict):
+        # Columns are ordered explicitly wanted/target first, then by rank
+        droppable = [name for name in columns if name != target_column]
+        while size() > max_bytes and droppable:
+            columns.pop(droppable.pop())
+            truncated.append(f"{COLUMNS_SECTION}.* (lowest ranked columns dropped)")
+    shorten(1)
+    for key in reversed(list(report)):
+        if size() <= max_bytes:
+            break
+        if key not in ('report_type', 'target_column', 'summary'):
+            report.pop(key)
+            truncated.append(f"{key} (dropped)")
+    return report
+
+
+def load_report_projection(chunks, sections=None, columns=None, target_column=None,
+                           top_k=REPORT_TOP_K_COLUMNS, max_bytes=REPORT_MAX_BYTES):
+    """
+    Read the requested parts of an insights report from a stream of JSON bytes.
+
+    Reports of the Data Wrangler job and of the local engine are both read: sections
+    are returned under the names of SECTION_ALIASES whichever layout they came from.
+    sections are top-level sections or dotted paths inside them ('summary',
+    'columns.amount.histogram'); by default DEFAULT_SECTIONS plus the target column
+    and the top_k columns by feature importance are read. Reading stops as soon as
+    every requested section has been seen, and the result is cut down to max_bytes.
+    Returns the projected report and a description of what was left out, including
+    the sections that can be requested.
+    """
+    stream = JsonStream(chunks)
+    projection = _Projection(stream, max_bytes)
+    if sections:
+        sections = ['.'.join([section_name(path.split('.', 1)[0])] + path.split('.', 1)[1:])
+                    for path in sections]
+    tree = path_tree(sections) if sections else {name: True for name in DEFAULT_SECTIONS}
+    select_columns = not sections or tree.get(COLUMNS_SECTION) is True
+    if select_columns:
+        tree[COLUMNS_SECTION] = None
+    wanted = set(columns or [])
+    pending = set(tree)
+
+    report, ranking, columns_seen, skipped = {}, {}, 0, []
+    for key in iter_sections(stream):
+        name = section_name(key)
+        if name in report:
+            # Only the first section of each name is read
+            stream.skip_value()
+        elif name == COLUMNS_SECTION and select_columns:
+            report[name], columns_seen = _select_columns(
+                projection, ranking, target_column or target_name(report.get('target_column')), wanted, top_k)
+        elif tree.get(name) is True:
+            report[name] = projection.read_section(name)
+        elif isinstance(tree.get(name), dict):
+            report[name] = projection.read_tree(tree[name], name)
+        elif not sections:
+            # Small sections outside the defaults are kept, large ones can be requested
+            value = stream.read_value(OTHER_SECTION_MAX_BYTES)
+            if isinstance(value, Oversized):
+                skipped.append(name)
+            else:
+                report[name] = value
+        else:
+            stream.skip_value()
+            skipped.append(name)
+        if name == 'feature_importance' and name in report:
+            ranking = ranking_scores(report[name])
+        pending.discard(name)
+        if not pending:
+            break
+
+    layout = 'local' if 'report_version' in report else 'data_wrangler'
+    _enforce_budget(report, max_bytes, target_column or target_name(report.get('target_column')),
+                    projection.truncated)
+    info = {
+        'layout': layout,
+        'sections': list(report),
+        'skippedSections': skipped,
+        'columnsIncluded': list(report.get(COLUMNS_SECTION) or []),
+        'columnsAvailable': columns_seen,
+        'omitted': projection.omitted,
+        'truncated': list(dict.fromkeys(projection.truncated)),
+        # Defaults absent from a report are expected: the two layouts have different sections
+        'missingSections': sorted(pending) if sections else [],
+        'bytesScanned': stream.bytes_read
+    }
+    if skipped:
+        info['hint'] = (f"Sections {', '.join(skipped)} were left out; pass their names in "
+                        f"sections to read them")
+    return report, info
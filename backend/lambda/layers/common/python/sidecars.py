@@ -0,0 +1,54 @@
+import json
+import logging
+import os
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+# Sidecars live in the same bucket under their own prefix rather than beside the object.
+# Processing jobs and flows read datasets as S3 prefixes, so a sidecar sharing the
+# dataset's key prefix would be ingested as data.
+SIDECAR_PREFIX = os.environ.get('SIDECAR_PREFIX', '_sidecars')
+
+
+def sidecar_key(key, kind):
+    """
+    Key of the sidecar of the given kind for an object key.
+
+    input_data/transactions.csv, 'schema' -> _sidecars/schema/input_data/transactions.csv.json
+    """
+    return f"{SIDECAR_PREFIX}/{kind}/{key}.json"
+
+
+def read_sidecar(s3, bucket, key, kind):
+    """Return the parsed sidecar, or None when it does not exist or cannot be read."""
+    try:
+        response = s3.get_object(Bucket=bucket, Key=sidecar_key(key, kind))
+        return json.loads(response['Body'].read().decode('utf-8'))
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+            logger.warning(f"Error reading {kind} sidecar for s3://{bucket}/{key}: {str(e)}")
+        return None
+    except ValueError as e:
+        logger.warning(f"Ignoring malformed {kind} sidecar for s3://{bucket}/{key}: {str(e)}")
+        return None
+
+
+def write_sidecar(s3, bucket, key, kind, payload):
+    """Persist a sidecar. Failures are logged and swallowed: sidecars are only a cache."""
+    try:
+        s3.put_object(
+            Bucket=bucket,
+            Key=sidecar_key(key, kind),
+            Body=json.dumps(payload, default=str),
+            ContentType='application/json'
+        )
+        return True
+    except ClientError as e:
+        logger.warning(f"Error writing {kind} sidecar for s3://{bucket}/{key}: {str(e)}")
+        return False
+
+
+def normalize_etag(etag):
+    return (etag or '').strip('"')
@@ -0,0 +1,347 @@
+import base64
+import math
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# HyperLogLog registers are 2^p bytes; p=12 gives about 1.6% relative error
+HLL_PRECISION = 12
+
+# KLL accuracy parameter; rank error is about 1.7/k
+KLL_K = 200
+
+# Count-min sketch dimensions: counts are overestimated by at most e/width of the
+# column's rows with probability 1 - e^-depth
+CMS_WIDTH = 2048
+CMS_DEPTH = 4
+
+# Frequent items tracked per column
+TOP_K = 20
+
+# Rows read per chunk while sketching a CSV
+SKETCH_CHUNK_ROWS = 200000
+
+
+def hash_values(values):
+    """Stable 64-bit hashes of values, identical across processes and chunks."""
+    return pd.util.hash_pandas_object(pd.Series(values, dtype=object).astype(str),
+                                      index=False).to_numpy(dtype=np.uint64)
+
+
+def _pack(array):
+    return base64.b64encode(zlib.compress(np.ascontiguousarray(array).tobytes())).decode('ascii')
+
+
+def _unpack(text, dtype, shape=None):
+    array = np.frombuffer(zlib.decompress(base64.b64decode(text)), dtype=dtype).copy()
+    return array.reshape(shape) if shape else array
+
+
+class HyperLogLog:
+    """Distinct count estimate over hashed values."""
+
+    def __init__(self, p=HLL_PRECISION, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = registers if registers is not None else np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        if not len(hashes):
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # Position of the leftmost 1 bit in the remaining 64 - p bits
+        bit_length = np.zeros(len(rest), dtype=np.int64)
+        nonzero = rest > 0
+        bit_length[nonzero] = np.frexp(rest[nonzero].astype(np.float64))[1]
+        rank = (64 - self.p) - bit_length + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_dict(self):
+        return {'p': self.p, 'registers': _pack(self.registers)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['p'], _unpack(data['registers'], np.uint8))
+
+
+class KLLSketch:
+    """
+    Quantile sketch (Karnin, Lang, Liberty). Items at level h stand for 2^h values;
+    a full level is sorted and every other item is promoted to the next level.
+    """
+
+    def __init__(self, k=KLL_K, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                odd = len(items) % 2
+                promoted = items[odd:][self._rng.integers(2)::2]
+                self.levels[level] = items[:odd]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                # New levels lower the capacity of the ones below
+                level = 0
+                continue
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.sum += float(values.sum())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sum += other.sum
+        self._compress()
+        return self
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def quantiles(self, fractions):
+        if not self.count:
+            return [None for _ in fractions]
+        items, cumulative = self._weighted()
+        result = []
+        for fraction in fractions:
+            if fraction <= 0:
+                result.append(self.min)
+            elif fraction >= 1:
+                result.append(self.max)
+            else:
+                position = np.searchsorted(cumulative, fraction * cumulative[-1])
+                result.append(float(items[min(position, len(items) - 1)]))
+        return result
+
+    def cdf(self, points):
+        """Estimated fraction of values at or below each point."""
+        if not self.count:
+            return np.zeros(len(points))
+        items, cumulative = self._weighted()
+        positions = np.searchsorted(items, np.asarray(points, dtype=np.float64), side='right')
+        totals = np.concatenate([[0.0], cumulative])
+        return totals[positions] / cumulative[-1]
+
+    def to_dict(self):
+        return {
+            'k': self.k, 'count': self.count, 'sum': self.sum,
+            'min': self.min if self.count else None, 'max': self.max if self.count else None,
+            'levels': [_pack(items.astype(np.float64)) for items in self.levels]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['k'])
+        sketch.levels = [_unpack(items, np.float64) for items in data['levels']] or [np.empty(0)]
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        sketch.min = data['min'] if data['min'] is not None else math.inf
+        sketch.max = data['max'] if data['max'] is not None else -math.inf
+        return sketch
+
+
+class FrequentItems:
+    """Count-min sketch with a list of the values most likely to be the top K."""
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH, top_k=TOP_K, table=None, candidates=None):
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self.table = table if table is not None else np.zeros((depth, width), dtype=np.int64)
+        self.candidates = candidates or {}
+
+    def _positions(self, hashes):
+        low = (hashes & np.uint64(0xffffffff)).astype(np.int64)
+        high = (hashes >> np.uint64(32)).astype(np.int64) | 1
+        rows = np.arange(self.depth, dtype=np.int64)[:, None]
+        return (low[None, :] + rows * high[None, :]) % self.width
+
+    def estimate(self, values):
+        if not len(values):
+            return np.zeros(0, dtype=np.int64)
+        positions = self._positions(hash_values(values))
+        return np.min(self.table[np.arange(self.depth)[:, None], positions], axis=0)
+
+    def _refresh_candidates(self, values):
+        values = list(dict.fromkeys(values))
+        estimates = self.estimate(values)
+        ranked = sorted(zip(values, estimates.tolist()), key=lambda item: item[1], reverse=True)
+        # Twice K candidates so values just below the top K can still rise into it
+        self.candidates = dict(ranked[:2 * self.top_k])
+
+    def update_counts(self, counts, hashes=None):
+        """Add a Series of counts indexed by value (e.g. a chunk's value_counts)."""
+        if counts.empty:
+            return
+        positions = self._positions(hash_values(counts.index) if hashes is None else hashes)
+        weights = counts.to_numpy(dtype=np.int64)
+        for row in range(self.depth):
+            np.add.at(self.table[row], positions[row], weights)
+        self._refresh_candidates(list(self.candidates) + list(counts.index[:2 * self.top_k]))
+
+    def merge(self, other):
+        self.table += other.table
+        self._refresh_candidates(list(self.candidates) + list(other.candidates))
+        return self
+
+    def top(self, k=None):
+        items = sorted(self.candidates.items(), key=lambda item: item[1], reverse=True)
+        return items[:k or self.top_k]
+
+    def error_bound(self):
+        """Overestimate of any count, in rows, that holds with probability 1 - e^-depth."""
+        return math.e / self.width * int(self.table[0].sum())
+
+    def to_dict(self):
+        return {'width': self.width, 'depth': self.depth, 'top_k': self.top_k,
+                'table': _pack(self.table), 'candidates': list(self.candidates.items())}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['width'], data['depth'], data['top_k'],
+                   _unpack(data['table'], np.int64, (data['depth'], data['width'])),
+                   {value: count for value, count in data['candidates']})
+
+
+class ColumnSketch:
+    """Mergeable sketches of one column: distinct count, quantiles and frequent items."""
+
+    def __init__(self, hll=None, kll=None, frequent=None, count=0, missing=0, non_numeric=0):
+        self.hll = hll or HyperLogLog()
+        self.kll = kll or KLLSketch()
+        self.frequent = frequent or FrequentItems()
+        self.count = count
+        self.missing = missing
+        self.non_numeric = non_numeric
+
+    def update(self, series):
+        """Add a chunk of string values; missing values are NaN."""
+        present = series.dropna()
+        self.missing += len(series) - len(present)
+        self.count += len(present)
+        if present.empty:
+            return
+        # Sketches are fed distinct values with their counts, not every row
+        counts = present.value_counts()
+        hashes = hash_values(counts.index)
+        self.hll.add_hashes(hashes)
+        self.frequent.update_counts(counts, hashes)
+        if self.non_numeric:
+            # Quantiles are only kept while every value is a number
+            self.non_numeric += len(present)
+            return
+        numbers = pd.to_numeric(pd.Series(counts.index), errors='coerce').to_numpy(dtype=np.float64)
+        parsed = ~np.isnan(numbers)
+        self.non_numeric += int(counts.to_numpy()[~parsed].sum())
+        if not self.non_numeric:
+            self.kll.update(np.repeat(numbers[parsed], counts.to_numpy()[parsed]))
+
+    def merge(self, other):
+        self.hll.merge(other.hll)
+        self.kll.merge(other.kll)
+        self.frequent.merge(other.frequent)
+        self.count += other.count
+        self.missing += other.missing
+        self.non_numeric += other.non_numeric
+        return self
+
+    @property
+    def numeric(self):
+        return self.count > 0 and self.non_numeric == 0
+
+    def to_dict(self):
+        return {'count': self.count, 'missing': self.missing, 'non_numeric': self.non_numeric,
+                'hll': self.hll.to_dict(), 'kll': self.kll.to_dict(), 'frequent': self.frequent.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(HyperLogLog.from_dict(data['hll']), KLLSketch.from_dict(data['kll']),
+                   FrequentItems.from_dict(data['frequent']),
+                   data['count'], data['missing'], data['non_numeric'])
+
+
+class DatasetSketch:
+    """Column sketches of a dataset, or of any part of it."""
+
+    def __init__(self, columns=None, rows=0):
+        self.columns = columns or {}
+        self.rows = rows
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        for name in chunk.columns:
+            self.columns.setdefault(name, ColumnSketch()).update(chunk[name])
+
+    def merge(self, other):
+        for name, sketch in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(sketch)
+            else:
+                self.columns[name] = sketch
+        self.rows += other.rows
+        return self
+
+    def to_dict(self):
+        return {'rows': self.rows, 'columns': {name: sketch.to_dict() for name, sketch in self.columns.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({name: ColumnSketch.from_dict(sketch) for name, sketch in data['columns'].items()},
+                   data['rows'])
+
+
+def sketch_csv(handle, chunk_rows=SKETCH_CHUNK_ROWS):
+    """Sketch a CSV file object in one pass of chunk_rows rows at a time."""
+    sketch = DatasetSketch()
+    for chunk in pd.read_csv(handle, chunksize=chunk_rows, dtype=str):
+        sketch.update(chunk)
+    return sketch
@@ -0,0 +1,47 @@
+import logging
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger()
+
+# Connections kept open to one endpoint; notify_subscribers and the streaming handlers
+# post from a single thread, so a few are enough
+MAX_POOL_CONNECTIONS = int(os.environ.get('WEBSOCKET_MAX_POOL_CONNECTIONS', '10'))
+
+# post_to_connection is small and latency-bound: fail fast on a stuck connection and
+# retry throttling and transient errors with standard backoff. GoneException (the
+# client disconnected) is not retried.
+CLIENT_CONFIG = Config(
+    connect_timeout=2,
+    read_timeout=5,
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    retries={'max_attempts': 3, 'mode': 'standard'}
+)
+
+# API Gateway management clients of this container, keyed by endpoint URL
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_management_client(endpoint_url):
+    """
+    API Gateway management client posting to the WebSocket API at endpoint_url.
+
+    Clients are created once per endpoint and reused across warm invocations, so
+    messages after the first skip client creation and reuse the pooled keep-alive
+    connection instead of a new TLS handshake.
+    """
+    client = _clients.get(endpoint_url)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(endpoint_url)
+            if client is None:
+                client = boto3.client('apigatewaymanagementapi', endpoint_url=endpoint_url,
+                                      config=CLIENT_CONFIG)
+                _clients[endpoint_url] = client
+                logger.info(f"Created API Gateway management client for {endpoint_url}")
+    return client
@@ -0,0 +1,70 @@
+import json
+import boto3
+import os
+import logging
+from listing import list_all
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize the S3 client
+s3_client = boto3.client('s3')
+
+
+def lambda_handler(event, context):
+    """
+    AWS Lambda function to list datasets, flows and reports in one call.
+    :param event: dict, API Gateway event
+    :param context: LambdaContext object
+    :return: dict, Response with lists of S3, Flow and report URIs
+    """
+    try:
+        # Handle CORS preflight
+        if event.get('httpMethod') == 'OPTIONS':
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                    'Access-Control-Allow-Headers': 'Content-Type'
+                },
+                'body': ''
+            }
+
+        # Get bucket name from environment variables
+        bucket_name = os.getenv('S3_BUCKET_NAME')
+
+        if not bucket_name:
+            raise ValueError("S3_BUCKET_NAME environment variable must be set")
+
+        # The three prefixes are listed concurrently
+        body = list_all(s3_client, bucket_name, refresh=bool(event.get('refresh')),
+                        details=bool(event.get('details')))
+
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type'
+            },
+            'body': json.dumps(body)
+        }
+
+    except Exception as e:
+        logger.error(f"Error listing URIs: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type'
+            },
+            'body': json.dumps({
+                'error': 'Internal server error',
+                'message': str(e)
+            })
+        }
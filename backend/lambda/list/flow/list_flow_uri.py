@@ -2,6 +2,7 @@ import json
 import boto3
 import os
 import logging
+from listing import list_uris
 
 # Set up logging
 logger = logging.getLogger()
@@ -38,16 +39,9 @@ def lambda_handler(event, context):
         if not bucket_name:
             raise ValueError("S3_BUCKET_NAME environment variable must be set")
 
-        # List objects in the bucket with prefix
-        response = s3_client.list_objects_v2(
-            Bucket=bucket_name,
-            Prefix=prefix
-        )
-
-        # Format the URIs
-        flows = [f"s3://{bucket_name}/{obj['Key']}"
-                 for obj in response.get('Contents', [])
-                 if obj['Key'].endswith('.flow')]
+        # Served from the listing index, which covers every object under the prefix
+        flows = list_uris(s3_client, bucket_name, prefix, suffix='.flow',
+                          refresh=bool(event.get('refresh')))
 
         return {
             'statusCode': 200,
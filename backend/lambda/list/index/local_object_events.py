@@ -0,0 +1,65 @@
+"""
+Stand-in for the bucket's EventBridge notifications when running or testing without
+AWS events.
+
+LocalObjectEventSource wraps an S3 client. Writes and deletes made through it are
+forwarded to the client and then emitted as the Object Created and Object Deleted
+events EventBridge would deliver, into a handler (object_events.handle_event by
+default). It can be passed anywhere an S3 client is expected:
+
+    source = LocalObjectEventSource(s3_client)
+    source.put_object(Bucket=bucket, Key='input_data/transactions.csv', Body=data)
+    source.backfill(bucket, 'input_data')   # index objects written before
+
+Scripted events can be pushed with emit() without writing anything.
+"""
+import logging
+import object_index
+
+logger = logging.getLogger()
+
+
+class LocalObjectEventSource:
+
+    def __init__(self, s3_client, handler=None):
+        if handler is None:
+            from object_events import handle_event
+            handler = handle_event
+        self.s3_client = s3_client
+        self.handler = handler
+        self.emitted = []
+
+    def __getattr__(self, name):
+        # Reads and every other call go straight to the wrapped client
+        return getattr(self.s3_client, name)
+
+    def emit(self, bucket, key, created=True):
+        """Deliver an object event for key, as EventBridge would."""
+        event = object_index.object_event(bucket, key, created)
+        self.emitted.append(event)
+        return self.handler(event)
+
+    def put_object(self, **kwargs):
+        response = self.s3_client.put_object(**kwargs)
+        self.emit(kwargs['Bucket'], kwargs['Key'])
+        return response
+
+    def upload_file(self, filename, bucket, key, **kwargs):
+        response = self.s3_client.upload_file(filename, bucket, key, **kwargs)
+        self.emit(bucket, key)
+        return response
+
+    def delete_object(self, **kwargs):
+        response = self.s3_client.delete_object(**kwargs)
+        self.emit(kwargs['Bucket'], kwargs['Key'], created=False)
+        return response
+
+    def backfill(self, bucket, prefix):
+        """Emit a created event for every object already under prefix. Returns the count."""
+        count = 0
+        for page in self.s3_client.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                self.emit(bucket, obj['Key'])
+                count += 1
+        logger.info(f"Backfilled {count} objects under s3://{bucket}/{prefix}")
+        return count
@@ -0,0 +1,41 @@
+import json
+import boto3
+import os
+import logging
+import object_index
+from listing import LIST_OPERATIONS
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize the S3 client
+s3_client = boto3.client('s3')
+
+# Prefixes served by the list operations, each with its own object index, and the key
+# suffixes their listings keep
+INDEXED_PREFIXES = {spec['prefix']: spec['suffix'] for spec in LIST_OPERATIONS.values()}
+
+
+def handle_event(event):
+    """Apply one S3 Object Created or Object Deleted event to the object index"""
+    return object_index.apply_event(s3_client, os.environ.get('S3_BUCKET_NAME'), event, INDEXED_PREFIXES)
+
+
+def lambda_handler(event, context):
+    """
+    Lambda handler for S3 object events from EventBridge. Runs with a reserved
+    concurrency of one so updates of an index are never interleaved.
+    """
+    try:
+        logger.info(f"Received event: {json.dumps(event)}")
+        entry = handle_event(event)
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'indexed': entry is not None
+            })
+        }
+    except Exception as e:
+        logger.error(f"Error indexing object: {str(e)}")
+        raise
@@ -2,6 +2,7 @@ import json
 import boto3
 import os
 import logging
+from listing import list_uris
 
 # Set up logging
 logger = logging.getLogger()
@@ -35,19 +36,10 @@ def lambda_handler(event, context):
         bucket_name = os.getenv('S3_BUCKET_NAME', 'fraud-detection-ws')
         prefix = 'processor_output/'
 
-        # List objects in the bucket with prefix
-        paginator = s3_client.get_paginator('list_objects_v2')
-        reports = []
-
-        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
-            for obj in page.get('Contents', []):
-                key = obj['Key']
-                # Check if the file is a visualization job JSON
-                if key.endswith('data_wrangler_visualization_job.json'):
-                    reports.append(f"s3://{bucket_name}/{key}")
-
-        # Sort reports by last modified date (newest first)
-        reports.sort(reverse=True)
+        # Visualization job and local insights reports from the listing index, newest first
+        reports = list_uris(s3_client, bucket_name, prefix,
+                            suffix=('data_wrangler_visualization_job.json', 'local_insights_report.json'),
+                            newest_first=True, refresh=bool(event.get('refresh')))
 
         return {
             'statusCode': 200,
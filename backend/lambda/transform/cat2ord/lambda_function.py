@@ -2,6 +2,8 @@ import pandas as pd
 import boto3
 import io
 import json
+from compaction import read_csv_compact
+from column_stats import write_frame_stats
 
 def lambda_handler(event, context):
     try:
@@ -19,7 +21,8 @@ def lambda_handler(event, context):
         input_bucket, input_key = input_s3_path.split('/', 3)[2:]
         
         obj = s3.get_object(Bucket=input_bucket, Key=input_key)
-        df = pd.read_csv(io.BytesIO(obj['Body'].read()))
+        df, compaction = read_csv_compact(obj['Body'])
+        print("Memory compaction:", json.dumps(compaction))
         
         categorical_cols = ['billing_city', 'billing_state', 'merchant', 
                             'payment_currency', 'product_category', 'user_agent']
@@ -31,6 +34,7 @@ def lambda_handler(event, context):
         csv_buffer = io.StringIO()
         df.to_csv(csv_buffer, index=False)
         s3.put_object(Bucket=output_bucket, Key=output_key, Body=csv_buffer.getvalue())
+        write_frame_stats(s3, output_bucket, output_key, df)
         
         return {
             'messageVersion': '1.0',
@@ -0,0 +1,327 @@
+import pandas as pd
+import numpy as np
+import boto3
+from botocore.exceptions import ClientError
+import io
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+from column_stats import ColumnStats, write_column_stats, read_column_stats
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Rows per chunk while streaming the input object
+CHUNK_ROWS = int(os.environ.get('CHUNK_ROWS', '200000'))
+
+DEFAULT_FALSE_POSITIVE_RATE = 0.001
+
+# Second hash seed for double hashing (pandas hash keys must be 16 bytes)
+SECONDARY_HASH_KEY = 'fraud-dedup-bf-2'
+
+
+class BloomFilter:
+    """
+    Bit-packed Bloom filter over string keys.
+
+    Hashing is vectorized with pandas' stable 64-bit object hash and double hashing, so a
+    whole chunk of keys is tested or inserted with a handful of NumPy operations.
+    """
+
+    def __init__(self, num_bits, num_hashes, count=0, bits=None):
+        self.num_bits = int(num_bits)
+        self.num_hashes = int(num_hashes)
+        self.count = int(count)
+        self.bits = bits if bits is not None else np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+
+    @classmethod
+    def for_capacity(cls, capacity, false_positive_rate):
+        capacity = max(int(capacity), 1)
+        num_bits = math.ceil(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2))
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    def capacity_at(self, false_positive_rate):
+        return int(-self.num_bits * (math.log(2) ** 2) / math.log(false_positive_rate))
+
+    def _positions(self, keys):
+        keys = pd.Series(keys, copy=False).astype(str)
+        h1 = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+        h2 = pd.util.hash_pandas_object(keys, index=False, hash_key=SECONDARY_HASH_KEY).to_numpy() | np.uint64(1)
+        i = np.arange(self.num_hashes, dtype=np.uint64)
+        return (h1[:, None] + i[None, :] * h2[:, None]) % np.uint64(self.num_bits)
+
+    def contains(self, keys):
+        positions = self._positions(keys)
+        hit = self.bits[positions >> np.uint64(3)] & (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8))
+        return (hit != 0).all(axis=1)
+
+    def add(self, keys):
+        positions = self._positions(keys).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                         np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8))
+        self.count += len(keys)
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, bits=self.bits,
+                            meta=np.array([self.num_bits, self.num_hashes, self.count], dtype=np.int64))
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload):
+        data = np.load(io.BytesIO(payload))
+        num_bits, num_hashes, count = data['meta'].tolist()
+        return cls(num_bits, num_hashes, count, data['bits'])
+
+
+def load_filter(s3, filter_s3_path):
+    bucket, key = filter_s3_path.split('/', 3)[2:]
+    try:
+        obj = s3.get_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return None
+        raise
+    return BloomFilter.from_bytes(obj['Body'].read())
+
+
+def estimate_rows(s3, bucket, key):
+    """
+    Row count from the object's column stats when a transform wrote it, otherwise
+    estimated from the object size and the first 64 KB.
+    """
+    head = s3.head_object(Bucket=bucket, Key=key)
+    stats = read_column_stats(s3, bucket, key, head.get('ETag'))
+    if stats:
+        return stats['rows'] + 1
+    object_size = head['ContentLength']
+    head = s3.get_object(Bucket=bucket, Key=key, Range='bytes=0-65535')['Body'].read()
+    lines = head.split(b'\n')[1:-1] or [head]
+    bytes_per_row = sum(len(line) + 1 for line in lines) / len(lines)
+    return int(object_size / bytes_per_row) + 1
+
+
+def first_positions(spool_path, suspect_keys):
+    """
+    Exact check for suspected hits: scan the local key spool of this batch and return
+    the first row position at which each suspected key occurs.
+    """
+    first = {}
+    for keys in pd.read_csv(spool_path, header=None, names=['key'], dtype=str,
+                            keep_default_na=False, chunksize=CHUNK_ROWS):
+        matches = keys['key'][keys['key'].isin(suspect_keys)]
+        # Chunked readers keep a running index, so it is the row position in the batch
+        for position, key in matches.items():
+            first.setdefault(key, position)
+    return first
+
+
+def insert_rows(path, rows, insert_at):
+    """
+    Rewrite the CSV at path with each of rows inserted before the output row given by
+    insert_at, so rows held back during the pass land where they were in the input.
+    The existing rows are read as plain strings and written back unchanged.
+    """
+    order = np.argsort(insert_at, kind='stable')
+    rows = rows.iloc[order]
+    offsets = np.asarray(insert_at)[order]
+    merged_path = f"{path}.merged"
+    with open(merged_path, 'w', newline='') as out:
+        rows.iloc[0:0].to_csv(out, index=False)
+        written = 0
+        i = 0
+        for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS):
+            start = 0
+            while i < len(offsets) and offsets[i] - written < len(chunk):
+                cut = offsets[i] - written
+                j = i
+                while j < len(offsets) and offsets[j] == offsets[i]:
+                    j += 1
+                chunk.iloc[start:cut].to_csv(out, header=False, index=False)
+                rows.iloc[i:j].to_csv(out, header=False, index=False)
+                start, i = cut, j
+            chunk.iloc[start:].to_csv(out, header=False, index=False)
+            written += len(chunk)
+        rows.iloc[i:].to_csv(out, header=False, index=False)
+    os.replace(merged_path, path)
+
+
+def lambda_handler(event, context):
+    work_dir = None
+    try:
+        logger.info("Received event: %s", json.dumps(event))
+
+        # Extract parameters from Bedrock Agent event structure
+        if 'requestBody' in event:
+            try:
+                properties = event['requestBody']['content']['application/json']['properties']
+                params = {prop['name']: prop['value'] for prop in properties}
+                input_s3_path = params['input_s3_path']
+                output_s3_path = params['output_s3_path']
+            except Exception as e:
+                logger.error("Error parsing Bedrock event: %s",
+                             str(e), exc_info=True)
+                raise
+        else:
+            # Direct Lambda invocation format
+            params = event
+            input_s3_path = event['input_s3_path']
+            output_s3_path = event['output_s3_path']
+
+        key_column = params.get('key_column') or 'event_id'
+        false_positive_rate = float(params.get('false_positive_rate') or DEFAULT_FALSE_POSITIVE_RATE)
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("false_positive_rate must be between 0 and 1")
+        filter_s3_path = params.get('filter_s3_path')
+
+        logger.info("Processing request with input path: %s and output path: %s",
+                    input_s3_path, output_s3_path)
+
+        # Initialize S3 client
+        s3 = boto3.client('s3')
+
+        # Parse S3 paths
+        input_bucket, input_key = input_s3_path.split('/', 3)[2:]
+
+        # Reuse the saved filter so this batch is deduped against history
+        bloom = load_filter(s3, filter_s3_path) if filter_s3_path else None
+        has_history = bloom is not None
+        if bloom is None:
+            expected_items = params.get('expected_items')
+            if expected_items:
+                capacity = int(expected_items)
+            else:
+                # Leave room for later incremental batches when the filter is persisted
+                capacity = estimate_rows(s3, input_bucket, input_key) * (4 if filter_s3_path else 1)
+            bloom = BloomFilter.for_capacity(capacity, false_positive_rate)
+        logger.info("Bloom filter: %d bits, %d hashes, %d keys already inserted",
+                    bloom.num_bits, bloom.num_hashes, bloom.count)
+
+        work_dir = tempfile.mkdtemp(dir='/tmp')
+        local_path = os.path.join(work_dir, 'deduped.csv')
+        spool_path = os.path.join(work_dir, 'keys.csv')
+        suspects = []
+        output_stats = ColumnStats()
+        exact_duplicates = 0
+        row_offset = 0
+        rows_written = 0
+        header_written = False
+
+        with open(local_path, 'w', newline='') as handle, open(spool_path, 'w', newline='') as spool:
+            obj = s3.get_object(Bucket=input_bucket, Key=input_key)
+            # Keys are hashed as their exact text ('007', 'NA' and '' stay distinct); the
+            # other columns are parsed as usual
+            for chunk in pd.read_csv(obj['Body'], chunksize=CHUNK_ROWS, converters={key_column: str}):
+                if key_column not in chunk.columns:
+                    raise ValueError(f"Column {key_column} not found")
+                keys = chunk[key_column]
+                keys.to_csv(spool, header=False, index=False)
+
+                # Repeats inside the chunk are exact duplicates
+                repeated = keys.duplicated().to_numpy()
+                candidates = ~repeated
+                suspected = np.zeros(len(chunk), dtype=bool)
+                suspected[candidates] = bloom.contains(keys[candidates])
+                bloom.add(keys[candidates & ~suspected])
+                exact_duplicates += int(repeated.sum())
+
+                kept_mask = candidates & ~suspected
+                if suspected.any():
+                    suspect_rows = chunk[suspected].copy()
+                    suspect_rows['_position'] = np.flatnonzero(suspected) + row_offset
+                    # Output row the suspect is put back before if it turns out unique
+                    kept_before = np.cumsum(kept_mask) - kept_mask
+                    suspect_rows['_insert_at'] = kept_before[suspected] + rows_written
+                    suspects.append(suspect_rows)
+
+                kept = chunk[kept_mask]
+                kept.to_csv(handle, header=not header_written, index=False)
+                output_stats.update(kept)
+                header_written = True
+                row_offset += len(chunk)
+                rows_written += len(kept)
+
+            # Exact check: a suspected row is a duplicate when its key occurred earlier in
+            # this batch; otherwise it is either a history hit or a Bloom false positive
+            history_hits = 0
+            false_positives = 0
+            batch_duplicates = 0
+            put_back = None
+            if suspects:
+                suspects = pd.concat(suspects, ignore_index=True)
+                spool.flush()
+                first = first_positions(spool_path, set(suspects[key_column]))
+                earlier = suspects['_position'].to_numpy() > suspects[key_column].map(first).to_numpy()
+                batch_duplicates = int(earlier.sum())
+                unresolved = suspects[~earlier]
+                if has_history:
+                    # History is only known through the filter, so trust it at the configured rate
+                    history_hits = len(unresolved)
+                else:
+                    false_positives = len(unresolved)
+                    put_back = unresolved
+
+        # Unique rows the filter held back go back where they were in the input
+        if put_back is not None and not put_back.empty:
+            insert_at = put_back['_insert_at'].to_numpy()
+            put_back = put_back.drop(columns=['_position', '_insert_at'])
+            insert_rows(local_path, put_back, insert_at)
+            output_stats.update(put_back)
+            bloom.add(put_back[key_column])
+
+        # Save to S3
+        output_bucket, output_key = output_s3_path.split('/', 3)[2:]
+        s3.upload_file(local_path, output_bucket, output_key)
+        write_column_stats(s3, output_bucket, output_key, output_stats)
+
+        if filter_s3_path:
+            if bloom.count > bloom.capacity_at(false_positive_rate):
+                logger.warning("Bloom filter holds %d keys, above its capacity for a %.4f false positive rate",
+                               bloom.count, false_positive_rate)
+            filter_bucket, filter_key = filter_s3_path.split('/', 3)[2:]
+            s3.put_object(Bucket=filter_bucket, Key=filter_key, Body=bloom.to_bytes())
+
+        removed = exact_duplicates + batch_duplicates + history_hits
+        summary = (f'Removed {removed} duplicate {key_column} rows out of {row_offset} '
+                   f'({exact_duplicates + batch_duplicates} within this file, {history_hits} seen in earlier batches, '
+                   f'{false_positives} Bloom false positives kept)')
+
+        return {
+            'messageVersion': '1.0',
+            'response': {
+                'actionGroup': event.get('actionGroup', ''),
+                'apiPath': event.get('apiPath', ''),
+                'httpMethod': event.get('httpMethod', ''),
+                'httpStatusCode': 200,
+                'responseBody': {
+                    'application/json': {
+                        'body': f'{summary}. Data saved to {output_s3_path}'
+                    }
+                }
+            }
+        }
+
+    except Exception as e:
+        logger.error("Error in lambda execution: %s", str(e), exc_info=True)
+        return {
+            'messageVersion': '1.0',
+            'response': {
+                'actionGroup': event.get('actionGroup', ''),
+                'apiPath': event.get('apiPath', ''),
+                'httpMethod': event.get('httpMethod', ''),
+                'httpStatusCode': 500,
+                'responseBody': {
+                    'application/json': {
+                        'body': f'Error: {str(e)}'
+                    }
+                }
+            }
+        }
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
@@ -1,8 +1,9 @@
-import pandas as pd
 import boto3
 import io
 import json
 import logging
+from compaction import read_csv_compact
+from column_stats import write_frame_stats
 
 # Configure logging
 logger = logging.getLogger()
@@ -41,7 +42,8 @@ def lambda_handler(event, context):
 
         # Read data from S3
         obj = s3.get_object(Bucket=input_bucket, Key=input_key)
-        df = pd.read_csv(io.BytesIO(obj['Body'].read()))
+        df, compaction = read_csv_compact(obj['Body'])
+        logger.info("Memory compaction: %s", json.dumps(compaction))
 
         # Drop unnecessary columns
         columns_to_drop = ['label_name', 'entity_type', 'customer_name', 'billing_street',
@@ -58,6 +60,7 @@ def lambda_handler(event, context):
         df.to_csv(csv_buffer, index=False)
         s3.put_object(Bucket=output_bucket, Key=output_key,
                       Body=csv_buffer.getvalue())
+        write_frame_stats(s3, output_bucket, output_key, df)
 
         return {
             'messageVersion': '1.0',
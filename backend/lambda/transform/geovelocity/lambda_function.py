@@ -0,0 +1,195 @@
+import pandas as pd
+import numpy as np
+import boto3
+import io
+import json
+import logging
+from compaction import read_csv_compact
+from column_stats import write_frame_stats
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Commercial flights cruise below ~900 km/h, anything faster is treated as impossible travel
+DEFAULT_MAX_SPEED_KMH = 900.0
+
+# Ignore jitter between nearby coordinates recorded at the same second
+MIN_DISTANCE_KM = 1.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in kilometres between two sets of coordinates (degrees).
+    All arguments are NumPy arrays of equal length.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(a) for a in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2.0) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2)
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def add_geo_velocity_features(df, entity_column='entity_id', timestamp_column='event_timestamp',
+                              lat_column='billing_latitude', lon_column='billing_longitude',
+                              max_speed_kmh=DEFAULT_MAX_SPEED_KMH):
+    """
+    Add distance, elapsed time and implied speed since the previous transaction of the
+    same entity, plus an impossible travel flag.
+
+    Rows are ordered once by (entity, timestamp) with a lexsort, the features are computed
+    on arrays shifted by one position and then scattered back to the original row order,
+    so no per-group Python loop is involved.
+    """
+    missing = [col for col in (entity_column, timestamp_column, lat_column, lon_column)
+               if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+
+    n = len(df)
+    # A constant entity (e.g. entity_id masked to asterisks by the synthetic data
+    # transform) would chain every transaction into one traveller
+    if n > 1 and df[entity_column].nunique() <= 1:
+        raise ValueError(f"Entity column {entity_column} has a single distinct value, so transactions of "
+                         f"different entities cannot be told apart; pass an entity_column that identifies "
+                         f"the card or customer")
+
+    distance = np.full(n, np.nan)
+    elapsed = np.full(n, np.nan)
+    speed = np.full(n, np.nan)
+    impossible = np.zeros(n, dtype=np.int8)
+
+    if n > 1:
+        entity_codes, _ = pd.factorize(df[entity_column], use_na_sentinel=True)
+        timestamps = pd.to_datetime(df[timestamp_column], utc=True, errors='coerce')
+        seconds = (timestamps - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+        seconds = seconds.to_numpy(dtype='float64', na_value=np.nan)
+        lat = pd.to_numeric(df[lat_column], errors='coerce').to_numpy(dtype='float64')
+        lon = pd.to_numeric(df[lon_column], errors='coerce').to_numpy(dtype='float64')
+
+        # Single group-sort: primary key entity, secondary key time
+        order = np.lexsort((seconds, entity_codes))
+        codes_sorted = entity_codes[order]
+        seconds_sorted = seconds[order]
+        lat_sorted = lat[order]
+        lon_sorted = lon[order]
+
+        # Consecutive pairs that belong to the same (known) entity
+        same_entity = (codes_sorted[1:] == codes_sorted[:-1]) & (codes_sorted[1:] >= 0)
+
+        pair_distance = haversine_km(lat_sorted[:-1], lon_sorted[:-1],
+                                     lat_sorted[1:], lon_sorted[1:])
+        pair_elapsed = seconds_sorted[1:] - seconds_sorted[:-1]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pair_speed = np.where(pair_elapsed > 0,
+                                  pair_distance / (pair_elapsed / 3600.0), np.nan)
+
+        # Same-second hops across a real distance cannot be explained either
+        pair_impossible = (pair_speed > max_speed_kmh) | (
+            (pair_elapsed == 0) & (pair_distance > MIN_DISTANCE_KM))
+
+        pair_distance = np.where(same_entity, pair_distance, np.nan)
+        pair_elapsed = np.where(same_entity, pair_elapsed, np.nan)
+        pair_speed = np.where(same_entity, pair_speed, np.nan)
+        pair_impossible = same_entity & pair_impossible
+
+        # Feature of each pair belongs to the later transaction
+        target = order[1:]
+        distance[target] = pair_distance
+        elapsed[target] = pair_elapsed
+        speed[target] = pair_speed
+        impossible[target] = pair_impossible
+
+    df['prev_txn_distance_km'] = np.round(distance, 3)
+    df['prev_txn_elapsed_seconds'] = elapsed
+    df['prev_txn_speed_kmh'] = np.round(speed, 3)
+    df['impossible_travel'] = impossible
+    return df
+
+
+def lambda_handler(event, context):
+    try:
+        logger.info("Received event: %s", json.dumps(event))
+
+        # Extract parameters from Bedrock Agent event structure
+        if 'requestBody' in event:
+            try:
+                properties = event['requestBody']['content']['application/json']['properties']
+                params = {prop['name']: prop['value'] for prop in properties}
+                input_s3_path = params['input_s3_path']
+                output_s3_path = params['output_s3_path']
+            except Exception as e:
+                logger.error("Error parsing Bedrock event: %s",
+                             str(e), exc_info=True)
+                raise
+        else:
+            # Direct Lambda invocation format
+            params = event
+            input_s3_path = event['input_s3_path']
+            output_s3_path = event['output_s3_path']
+
+        entity_column = params.get('entity_column') or 'entity_id'
+        max_speed_kmh = float(params.get('max_speed_kmh') or DEFAULT_MAX_SPEED_KMH)
+
+        logger.info("Processing request with input path: %s and output path: %s",
+                    input_s3_path, output_s3_path)
+
+        # Initialize S3 client
+        s3 = boto3.client('s3')
+
+        # Parse S3 paths
+        input_bucket, input_key = input_s3_path.split('/', 3)[2:]
+
+        # Read data from S3
+        obj = s3.get_object(Bucket=input_bucket, Key=input_key)
+        df, compaction = read_csv_compact(obj['Body'])
+        logger.info("Memory compaction: %s", json.dumps(compaction))
+
+        df = add_geo_velocity_features(df, entity_column=entity_column,
+                                       max_speed_kmh=max_speed_kmh)
+        flagged = int(df['impossible_travel'].sum())
+        logger.info("Flagged %d impossible travel transactions out of %d",
+                    flagged, len(df))
+
+        # Save to S3
+        output_bucket, output_key = output_s3_path.split('/', 3)[2:]
+
+        csv_buffer = io.StringIO()
+        df.to_csv(csv_buffer, index=False)
+        s3.put_object(Bucket=output_bucket, Key=output_key,
+                      Body=csv_buffer.getvalue())
+        write_frame_stats(s3, output_bucket, output_key, df)
+
+        return {
+            'messageVersion': '1.0',
+            'response': {
+                'actionGroup': event.get('actionGroup', ''),
+                'apiPath': event.get('apiPath', ''),
+                'httpMethod': event.get('httpMethod', ''),
+                'httpStatusCode': 200,
+                'responseBody': {
+                    'application/json': {
+                        'body': f'Geo-velocity features added ({flagged} impossible travel transactions flagged). Data saved to {output_s3_path}'
+                    }
+                }
+            }
+        }
+
+    except Exception as e:
+        logger.error("Error in lambda execution: %s", str(e), exc_info=True)
+        return {
+            'messageVersion': '1.0',
+            'response': {
+                'actionGroup': event.get('actionGroup', ''),
+                'apiPath': event.get('apiPath', ''),
+                'httpMethod': event.get('httpMethod', ''),
+                'httpStatusCode': 500,
+                'responseBody': {
+                    'application/json': {
+                        'body': f'Error: {str(e)}'
+                    }
+                }
+            }
+        }
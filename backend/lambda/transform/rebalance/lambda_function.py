@@ -0,0 +1,247 @@
+import pandas as pd
+import numpy as np
+import boto3
+import json
+import logging
+import os
+import shutil
+import tempfile
+from column_stats import ColumnStats, write_column_stats
+from csv_sampling import sample_rows
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Rows per chunk while streaming the input object
+CHUNK_ROWS = int(os.environ.get('CHUNK_ROWS', '200000'))
+
+# Upper bound on floats held by one block of the neighbour distance matrix
+NEIGHBOUR_BLOCK_CELLS = 20_000_000
+
+
+def label_strings(series):
+    """
+    Class labels as strings. A label column with blanks is read as floats in the chunks
+    that hold them, so integral floats are written as integers ('1.0' -> '1').
+    """
+    if pd.api.types.is_float_dtype(series.dtype):
+        series = series.map(lambda value: str(int(value)) if pd.notna(value) and float(value).is_integer()
+                            else value)
+    return series.astype(str)
+
+
+def nearest_neighbours(features, base_indices, k):
+    """
+    Indices of the k nearest minority neighbours (Euclidean) of each base row.
+
+    Distances are computed in row blocks so memory stays bounded by
+    NEIGHBOUR_BLOCK_CELLS regardless of the minority class size.
+    """
+    m = len(features)
+    k = min(k, m - 1)
+    squared_norms = np.einsum('ij,ij->i', features, features)
+    block = max(1, NEIGHBOUR_BLOCK_CELLS // m)
+    neighbours = np.empty((len(base_indices), k), dtype=np.int64)
+
+    for start in range(0, len(base_indices), block):
+        rows = base_indices[start:start + block]
+        distances = (squared_norms[rows][:, None] + squared_norms[None, :]
+                     - 2.0 * features[rows] @ features.T)
+        # Exclude the point itself
+        distances[np.arange(len(rows)), rows] = np.inf
+        neighbours[start:start + len(rows)] = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    return neighbours
+
+
+def smote_oversample(minority, n_new, label_column, k=5, rng=None):
+    """
+    Generate n_new synthetic minority rows by SMOTE-style interpolation.
+
+    Numeric columns are interpolated between a random minority row and one of its k
+    nearest minority neighbours; non-numeric columns are copied from the base row.
+    """
+    rng = rng or np.random.default_rng()
+    if n_new <= 0 or len(minority) < 2:
+        return minority.iloc[0:0]
+
+    numeric_columns = [col for col in minority.select_dtypes(include='number').columns
+                       if col != label_column]
+    base_rows = rng.integers(0, len(minority), n_new)
+    synthetic = minority.iloc[base_rows].reset_index(drop=True)
+    if not numeric_columns:
+        return synthetic
+
+    values = minority[numeric_columns].to_numpy(dtype='float64')
+    column_means = np.nanmean(values, axis=0)
+    values = np.where(np.isnan(values), column_means, values)
+    # Standardise so no single column dominates the neighbour search
+    scale = values.std(axis=0)
+    scale[scale == 0] = 1.0
+    features = (values - values.mean(axis=0)) / scale
+
+    unique_bases, inverse = np.unique(base_rows, return_inverse=True)
+    neighbours = nearest_neighbours(features, unique_bases, k)
+    chosen = neighbours[inverse, rng.integers(0, neighbours.shape[1], n_new)]
+
+    gap = rng.random((n_new, 1))
+    interpolated = values[base_rows] + gap * (values[chosen] - values[base_rows])
+
+    for index, col in enumerate(numeric_columns):
+        column = interpolated[:, index]
+        if pd.api.types.is_integer_dtype(minority[col].dtype):
+            column = np.rint(column).astype(minority[col].dtype)
+        synthetic[col] = column
+    return synthetic
+
+
+def lambda_handler(event, context):
+    work_dir = None
+    try:
+        logger.info("Received event: %s", json.dumps(event))
+
+        # Extract parameters from Bedrock Agent event structure
+        if 'requestBody' in event:
+            try:
+                properties = event['requestBody']['content']['application/json']['properties']
+                params = {prop['name']: prop['value'] for prop in properties}
+                input_s3_path = params['input_s3_path']
+                output_s3_path = params['output_s3_path']
+            except Exception as e:
+                logger.error("Error parsing Bedrock event: %s",
+                             str(e), exc_info=True)
+                raise
+        else:
+            # Direct Lambda invocation format
+            params = event
+            input_s3_path = event['input_s3_path']
+            output_s3_path = event['output_s3_path']
+
+        label_column = params.get('label_column') or 'is_fraud'
+        target_ratio = float(params.get('target_ratio') or 0.5)
+        oversample_factor = float(params.get('oversample_factor') or 1.0)
+        if not 0 < target_ratio < 1:
+            raise ValueError("target_ratio must be between 0 and 1")
+        if oversample_factor < 1:
+            raise ValueError("oversample_factor must be at least 1")
+        seed = params.get('seed')
+        rng = np.random.default_rng(int(seed) if seed is not None else None)
+
+        logger.info("Processing request with input path: %s and output path: %s",
+                    input_s3_path, output_s3_path)
+
+        # Initialize S3 client
+        s3 = boto3.client('s3')
+
+        # Parse S3 paths
+        input_bucket, input_key = input_s3_path.split('/', 3)[2:]
+
+        # Estimate the class balance from a few sampled ranges instead of a full pass
+        head = s3.head_object(Bucket=input_bucket, Key=input_key)
+        sample, bytes_per_row = sample_rows(s3, input_bucket, input_key, head['ContentLength'])
+        if label_column not in sample.columns:
+            raise ValueError(f"Column {label_column} not found")
+        class_share = label_strings(sample[label_column].dropna()).value_counts(normalize=True)
+        if len(class_share) != 2:
+            raise ValueError(f"Expected a binary {label_column} column, found classes {list(class_share.index)}")
+        minority_label = str(params.get('minority_label') or class_share.idxmin())
+        if minority_label not in class_share.index:
+            # A share of 0 would drop almost every majority row
+            raise ValueError(f"minority_label {minority_label} not found in {label_column}, "
+                             f"classes are {list(class_share.index)}")
+        estimated_rows = head['ContentLength'] / bytes_per_row
+        estimated_minority = estimated_rows * class_share.get(minority_label, 0.0)
+        estimated_majority = estimated_rows - estimated_minority
+
+        # Keep enough majority rows for target_ratio after oversampling the minority
+        majority_target = estimated_minority * oversample_factor * (1 - target_ratio) / target_ratio
+        if params.get('majority_sample_rate') not in (None, ''):
+            keep_rate = float(params['majority_sample_rate'])
+            if not 0 < keep_rate <= 1:
+                raise ValueError("majority_sample_rate must be greater than 0 and at most 1")
+        else:
+            keep_rate = min(1.0, majority_target / max(estimated_majority, 1.0))
+        logger.info("Minority label %s, estimated %d minority / %d majority rows, majority keep rate %.4f",
+                    minority_label, estimated_minority, estimated_majority, keep_rate)
+
+        # Single streaming pass: Bernoulli-sample majority rows straight to disk and keep
+        # only the minority rows in memory for oversampling
+        work_dir = tempfile.mkdtemp(dir='/tmp')
+        local_path = os.path.join(work_dir, 'rebalanced.csv')
+        minority_chunks = []
+        output_stats = ColumnStats()
+        majority_kept = 0
+        majority_seen = 0
+        unlabelled = 0
+        header_written = False
+
+        with open(local_path, 'w', newline='') as handle:
+            obj = s3.get_object(Bucket=input_bucket, Key=input_key)
+            for chunk in pd.read_csv(obj['Body'], chunksize=CHUNK_ROWS):
+                is_minority = (label_strings(chunk[label_column]) == minority_label).to_numpy()
+                # Rows without a label belong to neither class and are kept unchanged
+                is_unlabelled = chunk[label_column].isna().to_numpy()
+                is_majority = ~is_minority & ~is_unlabelled
+                keep = ~is_majority | (rng.random(len(chunk)) < keep_rate)
+                majority_seen += int(is_majority.sum())
+                majority_kept += int((keep & is_majority).sum())
+                unlabelled += int(is_unlabelled.sum())
+                minority_chunks.append(chunk[is_minority])
+
+                chunk[keep].to_csv(handle, header=not header_written, index=False)
+                output_stats.update(chunk[keep])
+                header_written = True
+
+            minority = pd.concat(minority_chunks, ignore_index=True)
+            del minority_chunks
+            n_new = int(round(len(minority) * (oversample_factor - 1)))
+            synthetic = smote_oversample(minority, n_new, label_column, rng=rng)
+            if not synthetic.empty:
+                synthetic.to_csv(handle, header=False, index=False)
+                output_stats.update(synthetic)
+
+        # Save to S3
+        output_bucket, output_key = output_s3_path.split('/', 3)[2:]
+        s3.upload_file(local_path, output_bucket, output_key)
+        write_column_stats(s3, output_bucket, output_key, output_stats)
+
+        minority_total = len(minority) + len(synthetic)
+        summary = (f'{minority_total} {minority_label} rows ({len(minority)} original, {len(synthetic)} synthetic) '
+                   f'and {majority_kept} of {majority_seen} majority rows')
+        if unlabelled:
+            summary += f', plus {unlabelled} rows without a {label_column} value kept unchanged'
+
+        return {
+            'messageVersion': '1.0',
+            'response': {
+                'actionGroup': event.get('actionGroup', ''),
+                'apiPath': event.get('apiPath', ''),
+                'httpMethod': event.get('httpMethod', ''),
+                'httpStatusCode': 200,
+                'responseBody': {
+                    'application/json': {
+                        'body': f'Classes rebalanced: {summary}. Data saved to {output_s3_path}'
+                    }
+                }
+            }
+        }
+
+    except Exception as e:
+        logger.error("Error in lambda execution: %s", str(e), exc_info=True)
+        return {
+            'messageVersion': '1.0',
+            'response': {
+                'actionGroup': event.get('actionGroup', ''),
+                'apiPath': event.get('apiPath', ''),
+                'httpMethod': event.get('httpMethod', ''),
+                'httpStatusCode': 500,
+                'responseBody': {
+                    'application/json': {
+                        'body': f'Error: {str(e)}'
+                    }
+                }
+            }
+        }
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
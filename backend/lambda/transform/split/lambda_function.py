@@ -0,0 +1,234 @@
+import pandas as pd
+import numpy as np
+import boto3
+import json
+import logging
+import os
+import shutil
+import tempfile
+from column_stats import ColumnStats, write_column_stats
+from csv_sampling import sample_rows
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SPLITS = ('train', 'validation', 'test')
+
+# Rows per chunk while streaming the input object
+CHUNK_ROWS = int(os.environ.get('CHUNK_ROWS', '200000'))
+
+
+def split_output_paths(output_s3_path):
+    """
+    Derive one output path per split.
+
+    s3://bucket/out/data.csv -> s3://bucket/out/data_train.csv, ...
+    s3://bucket/out/         -> s3://bucket/out/train.csv, ...
+    """
+    if output_s3_path.endswith('.csv'):
+        base = output_s3_path[:-len('.csv')]
+        return {split: f"{base}_{split}.csv" for split in SPLITS}
+    base = output_s3_path.rstrip('/')
+    return {split: f"{base}/{split}.csv" for split in SPLITS}
+
+
+def estimate_cutoffs(sample, timestamp_column, train_ratio, validation_ratio, stratify_column=None):
+    """
+    Estimate (train_end, validation_end) timestamps from sampled time quantiles.
+
+    When stratify_column is set the quantiles are computed per class, so every split
+    receives the same share of each class and keeps the overall class ratio.
+    """
+    timestamps = pd.to_datetime(sample[timestamp_column], utc=True, errors='coerce')
+    quantiles = [train_ratio, train_ratio + validation_ratio]
+
+    def _cutoffs(values):
+        values = values.dropna()
+        if values.empty:
+            return None
+        q = values.quantile(quantiles)
+        return q.iloc[0], q.iloc[1]
+
+    cutoffs = {None: _cutoffs(timestamps)}
+    if cutoffs[None] is None:
+        raise ValueError(f"No parseable {timestamp_column} values found in sample")
+
+    if stratify_column:
+        if stratify_column not in sample.columns:
+            raise ValueError(f"Stratify column {stratify_column} not found")
+        for label, values in timestamps.groupby(sample[stratify_column].astype(str)):
+            class_cutoffs = _cutoffs(values)
+            if class_cutoffs is not None:
+                cutoffs[label] = class_cutoffs
+    return cutoffs
+
+
+def assign_splits(chunk, timestamp_column, cutoffs, stratify_column=None):
+    """
+    Return an array with 0 (train), 1 (validation) or 2 (test) for every row.
+    Rows without a parseable timestamp are kept in train.
+    """
+    timestamps = pd.to_datetime(chunk[timestamp_column], utc=True, errors='coerce')
+    train_end = np.empty(len(chunk), dtype='datetime64[ns]')
+    validation_end = np.empty(len(chunk), dtype='datetime64[ns]')
+
+    default_train_end, default_validation_end = cutoffs[None]
+    train_end[:] = default_train_end.tz_convert(None).to_datetime64()
+    validation_end[:] = default_validation_end.tz_convert(None).to_datetime64()
+
+    if stratify_column and len(cutoffs) > 1:
+        labels = chunk[stratify_column].astype(str).to_numpy()
+        for label, (class_train_end, class_validation_end) in cutoffs.items():
+            if label is None:
+                continue
+            mask = labels == label
+            train_end[mask] = class_train_end.tz_convert(None).to_datetime64()
+            validation_end[mask] = class_validation_end.tz_convert(None).to_datetime64()
+
+    values = timestamps.dt.tz_convert(None).to_numpy(dtype='datetime64[ns]')
+    split = np.zeros(len(chunk), dtype=np.int8)
+    split[values > train_end] = 1
+    split[values > validation_end] = 2
+    return split
+
+
+def parse_cutoff(value):
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        return timestamp.tz_localize('UTC')
+    return timestamp.tz_convert('UTC')
+
+
+def lambda_handler(event, context):
+    work_dir = None
+    try:
+        logger.info("Received event: %s", json.dumps(event))
+
+        # Extract parameters from Bedrock Agent event structure
+        if 'requestBody' in event:
+            try:
+                properties = event['requestBody']['content']['application/json']['properties']
+                params = {prop['name']: prop['value'] for prop in properties}
+                input_s3_path = params['input_s3_path']
+                output_s3_path = params['output_s3_path']
+            except Exception as e:
+                logger.error("Error parsing Bedrock event: %s",
+                             str(e), exc_info=True)
+                raise
+        else:
+            # Direct Lambda invocation format
+            params = event
+            input_s3_path = event['input_s3_path']
+            output_s3_path = event['output_s3_path']
+
+        timestamp_column = params.get('timestamp_column') or 'event_timestamp'
+        stratify = str(params.get('stratify', 'false')).lower() == 'true'
+        stratify_column = (params.get('stratify_column') or 'is_fraud') if stratify else None
+
+        logger.info("Processing request with input path: %s and output path: %s",
+                    input_s3_path, output_s3_path)
+
+        # Initialize S3 client
+        s3 = boto3.client('s3')
+
+        # Parse S3 paths
+        input_bucket, input_key = input_s3_path.split('/', 3)[2:]
+
+        if params.get('train_end') and params.get('validation_end'):
+            # Explicit time cutoffs apply to every class alike
+            if stratify_column:
+                raise ValueError("stratify only applies to train_ratio and validation_ratio, "
+                                 "not to explicit train_end and validation_end cutoffs")
+            cutoffs = {None: (parse_cutoff(params['train_end']),
+                              parse_cutoff(params['validation_end']))}
+        else:
+            train_ratio = float(params.get('train_ratio') or 0.7)
+            validation_ratio = float(params.get('validation_ratio') or 0.15)
+            if train_ratio <= 0 or validation_ratio < 0 or train_ratio + validation_ratio > 1:
+                raise ValueError("train_ratio and validation_ratio must be positive and sum to at most 1")
+            head = s3.head_object(Bucket=input_bucket, Key=input_key)
+            sample, _ = sample_rows(s3, input_bucket, input_key, head['ContentLength'])
+            cutoffs = estimate_cutoffs(sample, timestamp_column, train_ratio,
+                                       validation_ratio, stratify_column)
+        logger.info("Using split cutoffs: %s", cutoffs)
+
+        # Stream the input once, appending each chunk's rows to the matching part file
+        work_dir = tempfile.mkdtemp(dir='/tmp')
+        local_paths = {split: os.path.join(work_dir, f"{split}.csv") for split in SPLITS}
+        handles = {split: open(path, 'w', newline='') for split, path in local_paths.items()}
+        row_counts = dict.fromkeys(SPLITS, 0)
+        output_stats = {split: ColumnStats() for split in SPLITS}
+        class_counts = {split: {} for split in SPLITS}
+        header_written = dict.fromkeys(SPLITS, False)
+
+        try:
+            obj = s3.get_object(Bucket=input_bucket, Key=input_key)
+            for chunk in pd.read_csv(obj['Body'], chunksize=CHUNK_ROWS):
+                if timestamp_column not in chunk.columns:
+                    raise ValueError(f"Column {timestamp_column} not found")
+                assignment = assign_splits(chunk, timestamp_column, cutoffs, stratify_column)
+                for index, split in enumerate(SPLITS):
+                    part = chunk[assignment == index]
+                    if part.empty and header_written[split]:
+                        continue
+                    # The first chunk writes the header of every part, even one that stays empty
+                    part.to_csv(handles[split], header=not header_written[split], index=False)
+                    header_written[split] = True
+                    if part.empty:
+                        continue
+                    row_counts[split] += len(part)
+                    output_stats[split].update(part)
+                    if stratify_column:
+                        for label, count in part[stratify_column].astype(str).value_counts().items():
+                            class_counts[split][label] = class_counts[split].get(label, 0) + int(count)
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+        # Upload every part, including empty ones, so consumers always find all three
+        output_paths = split_output_paths(output_s3_path)
+        for split in SPLITS:
+            output_bucket, output_key = output_paths[split].split('/', 3)[2:]
+            s3.upload_file(local_paths[split], output_bucket, output_key)
+            write_column_stats(s3, output_bucket, output_key, output_stats[split])
+
+        summary = ', '.join(f"{split}: {row_counts[split]} rows ({output_paths[split]})"
+                            for split in SPLITS)
+        if stratify_column:
+            summary += f". Class counts by {stratify_column}: {json.dumps(class_counts)}"
+
+        return {
+            'messageVersion': '1.0',
+            'response': {
+                'actionGroup': event.get('actionGroup', ''),
+                'apiPath': event.get('apiPath', ''),
+                'httpMethod': event.get('httpMethod', ''),
+                'httpStatusCode': 200,
+                'responseBody': {
+                    'application/json': {
+                        'body': f'Data split by {timestamp_column}. {summary}'
+                    }
+                }
+            }
+        }
+
+    except Exception as e:
+        logger.error("Error in lambda execution: %s", str(e), exc_info=True)
+        return {
+            'messageVersion': '1.0',
+            'response': {
+                'actionGroup': event.get('actionGroup', ''),
+                'apiPath': event.get('apiPath', ''),
+                'httpMethod': event.get('httpMethod', ''),
+                'httpStatusCode': 500,
+                'responseBody': {
+                    'application/json': {
+                        'body': f'Error: {str(e)}'
+                    }
+                }
+            }
+        }
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
@@ -6,6 +6,7 @@ import json
 from datetime import datetime, timedelta
 from faker import Faker
 import secrets
+from column_stats import write_frame_stats
 
 # Note: Using secrets module for cryptographically secure random generation
 # This addresses security scan findings about standard pseudo-random generators
@@ -37,6 +38,7 @@ def lambda_handler(event, context):
         csv_buffer = io.StringIO()
         df.to_csv(csv_buffer, index=False)
         s3.put_object(Bucket=output_bucket, Key=output_key, Body=csv_buffer.getvalue())
+        write_frame_stats(s3, output_bucket, output_key, df)
         
         return {
             'messageVersion': '1.0',
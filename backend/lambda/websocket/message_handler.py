@@ -3,6 +3,8 @@ import boto3
 import os
 import logging
 from datetime import datetime
+from listing import list_all, run_list_operation, LIST_FILTERS
+from websocket_clients import get_management_client
 
 # Set up logging
 logger = logging.getLogger()
@@ -10,7 +12,7 @@ logger.setLevel(logging.INFO)
 
 # Initialize AWS clients
 lambda_client = boto3.client('lambda')
-apigateway_client = boto3.client('apigatewaymanagementapi')
+s3_client = boto3.client('s3')
 
 
 def send_websocket_message(connection_id, message_data):
@@ -21,11 +23,8 @@ def send_websocket_message(connection_id, message_data):
             raise ValueError(
                 "WEBSOCKET_API_ENDPOINT environment variable not set")
 
-        # Create API Gateway Management API client with the WebSocket endpoint
-        apigateway_client = boto3.client(
-            'apigatewaymanagementapi',
-            endpoint_url=websocket_endpoint
-        )
+        # Clients are pooled per endpoint and reused across warm invocations
+        apigateway_client = get_management_client(websocket_endpoint)
 
         apigateway_client.post_to_connection(
             ConnectionId=connection_id,
@@ -38,68 +37,38 @@ def send_websocket_message(connection_id, message_data):
         raise
 
 
-def handle_list_operation(connection_id, operation_type):
-    """Handle list operations (S3, Flow, Reports) synchronously."""
-    try:
-        # Map operation types to Lambda function names
-        function_mapping = {
-            'listS3URIs': 'fraud-list-s3-uri',
-            'listFlowURIs': 'fraud-list-flow-uri',
-            'listReportURIs': 'fraud-list-reports-uri'
-        }
-
-        function_name = function_mapping.get(operation_type)
-        if not function_name:
-            raise ValueError(f"Unknown list operation: {operation_type}")
+def list_operation_body(operation_type, refresh=False, details=False, filters=None):
+    """
+    Response body of a list operation. Listings are served in this function from the
+    shared listing index rather than by invoking the list functions. details adds the
+    objects' size, rows, columns and last-modified time from the object index;
+    filters are the listing.LIST_FILTERS of a single list type.
+    """
+    bucket_name = os.environ.get('S3_BUCKET_NAME')
+    if not bucket_name:
+        raise ValueError("S3_BUCKET_NAME environment variable not set")
 
-        logger.info(f"Invoking list function: {function_name}")
+    if operation_type == 'listAll':
+        return list_all(s3_client, bucket_name, refresh=refresh, details=details)
+    return run_list_operation(s3_client, bucket_name, operation_type, refresh=refresh,
+                              details=details, **(filters or {}))
 
-        # Invoke the list function synchronously
-        response = lambda_client.invoke(
-            FunctionName=function_name,
-            InvocationType='RequestResponse'  # Synchronous invocation
-        )
 
-        # Parse the response
-        payload = json.loads(response['Payload'].read())
-
-        if response['StatusCode'] == 200 and payload.get('statusCode') == 200:
-            # Parse the body which contains the actual data as JSON string
-            body_data = payload.get('body', '{}')
-            if isinstance(body_data, str):
-                try:
-                    parsed_body = json.loads(body_data)
-                except json.JSONDecodeError:
-                    parsed_body = {}
-            else:
-                parsed_body = body_data
-
-            # Send successful response back to client
-            response_message = {
-                'type': 'listResponse',
-                'operation': operation_type,
-                'data': parsed_body,
-                'success': True
-            }
-        else:
-            # Send error response back to client
-            error_msg = payload.get('errorMessage', 'Unknown error')
-            if payload.get('body'):
-                try:
-                    error_body = json.loads(payload['body']) if isinstance(
-                        payload['body'], str) else payload['body']
-                    error_msg = error_body.get('message', error_msg)
-                except (json.JSONDecodeError, KeyError, TypeError):
-                    # Unable to parse error body, use default error message
-                    pass
-
-            response_message = {
-                'type': 'listResponse',
-                'operation': operation_type,
-                'error': error_msg,
-                'success': False
-            }
+def handle_list_operation(connection_id, operation_type, refresh=False, details=False, filters=None):
+    """
+    Handle list operations (S3, Flow, Reports, or all three with listAll)
+    synchronously. refresh asks for a full listing instead of the cached one.
+    """
+    try:
+        logger.info(f"Running list operation: {operation_type}")
 
+        # Send successful response back to client
+        response_message = {
+            'type': 'listResponse',
+            'operation': operation_type,
+            'data': list_operation_body(operation_type, refresh, details, filters),
+            'success': True
+        }
         send_websocket_message(connection_id, response_message)
 
     except Exception as e:
@@ -143,7 +112,12 @@ def lambda_handler(event, context):
             if not operation:
                 raise ValueError("List operation type not specified")
 
-            handle_list_operation(connection_id, operation)
+            filters = {name: message_data[name] for name in LIST_FILTERS
+                       if message_data.get(name) is not None}
+            handle_list_operation(connection_id, operation,
+                                  refresh=bool(message_data.get('refresh')),
+                                  details=bool(message_data.get('details')),
+                                  filters=filters)
 
             return {
                 'statusCode': 200,
@@ -1,16 +1,13 @@
 import json
-import boto3
 import os
 import logging
 from datetime import datetime
+from websocket_clients import get_management_client
 
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS clients
-apigateway_client = boto3.client('apigatewaymanagementapi')
-
 
 def lambda_handler(event, context):
     """
@@ -32,11 +29,8 @@ def lambda_handler(event, context):
             f"Processing streaming chat for connection: {connection_id}")
         logger.info(f"Message: {user_message[:100]}...")
 
-        # Initialize API Gateway Management API client with WebSocket endpoint
-        apigateway_client = boto3.client(
-            'apigatewaymanagementapi',
-            endpoint_url=websocket_endpoint
-        )
+        # API Gateway Management API client of the WebSocket endpoint, reused across invocations
+        apigateway_client = get_management_client(websocket_endpoint)
 
         # Send a simple response back to the client
         # This is a placeholder - in production, this would call Bedrock
@@ -77,12 +71,7 @@ def lambda_handler(event, context):
                     'timestamp': datetime.utcnow().isoformat()
                 }
                 
-                apigateway_client = boto3.client(
-                    'apigatewaymanagementapi',
-                    endpoint_url=websocket_endpoint
-                )
-                
-                apigateway_client.post_to_connection(
+                get_management_client(websocket_endpoint).post_to_connection(
                     ConnectionId=connection_id,
                     Data=json.dumps(error_message)
                 )
@@ -3,6 +3,7 @@ import boto3
 import os
 import logging
 from datetime import datetime
+from websocket_clients import get_management_client
 
 # Set up logging
 logger = logging.getLogger()
@@ -10,7 +11,6 @@ logger.setLevel(logging.INFO)
 
 # Initialize AWS clients
 bedrock_client = boto3.client('bedrock-agent-runtime')
-apigateway_client = boto3.client('apigatewaymanagementapi')
 
 
 def lambda_handler(event, context):
@@ -33,11 +33,8 @@ def lambda_handler(event, context):
             f"Processing streaming chat for connection: {connection_id}")
         logger.info(f"Message: {user_message[:100]}...")
 
-        # Initialize API Gateway Management API client with WebSocket endpoint
-        apigateway_client = boto3.client(
-            'apigatewaymanagementapi',
-            endpoint_url=websocket_endpoint
-        )
+        # API Gateway Management API client of the WebSocket endpoint, reused across invocations
+        apigateway_client = get_management_client(websocket_endpoint)
 
         # Extract Agent ID and Alias from environment variables
         agent_id = os.getenv("BEDROCK_AGENT_ID")
@@ -78,7 +75,14 @@ def lambda_handler(event, context):
             sessionId=session_id or context.aws_request_id,
             endSession=False,
             enableTrace=True,
-            inputText=user_message
+            inputText=user_message,
+            # Action groups read these to notify this connection when a job they start finishes
+            sessionState={
+                'sessionAttributes': {
+                    'connectionId': connection_id,
+                    'websocketEndpoint': websocket_endpoint
+                }
+            }
         )
 
         # Process the streaming response
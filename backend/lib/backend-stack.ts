@@ -5,6 +5,8 @@ import * as lambda from 'aws-cdk-lib/aws-lambda';
 import * as iam from 'aws-cdk-lib/aws-iam';
 import * as s3 from 'aws-cdk-lib/aws-s3';
 import * as s3deploy from 'aws-cdk-lib/aws-s3-deployment';
+import * as events from 'aws-cdk-lib/aws-events';
+import * as eventsTargets from 'aws-cdk-lib/aws-events-targets';
 import * as path from 'path';
 import * as cognito from 'aws-cdk-lib/aws-cognito';
 import * as apigatewayv2 from 'aws-cdk-lib/aws-apigatewayv2';
@@ -58,6 +60,18 @@ export class BackendStack extends cdk.Stack {
             enforceSSL: true,
             serverAccessLogsBucket: accessLogsBucket,
             serverAccessLogsPrefix: 'fraud-detection-bucket-logs/',
+            // Object events feed the object index behind the listings
+            eventBridgeEnabled: true,
+            lifecycleRules: [{
+                // Input shards of processing jobs are never deleted while a job may read
+                // them; they expire instead. Keep above SHARD_REUSE_MAX_AGE_SECONDS of
+                // input_sharding.py plus the job runtime.
+                id: 'ExpireInputShards',
+                enabled: true,
+                prefix: '_shards/',
+                expiration: cdk.Duration.days(7),
+                abortIncompleteMultipartUploadAfter: cdk.Duration.days(1),
+            }]
         });
 
         new s3deploy.BucketDeployment(this, 'CreateInputDataFolder', {
@@ -105,6 +119,15 @@ export class BackendStack extends cdk.Stack {
             })
         );
 
+        // Listing indexes are persisted as sidecars
+        listLambdaRole.addToPolicy(
+            new iam.PolicyStatement({
+                effect: iam.Effect.ALLOW,
+                actions: ['s3:PutObject'],
+                resources: [`${this.bucket.bucketArn}/_sidecars/*`]
+            })
+        );
+
         // Custom SageMaker policy with minimal required permissions
         const customSageMakerPolicy = new iam.ManagedPolicy(this, 'CustomSageMakerPolicy', {
             statements: [
@@ -158,7 +181,9 @@ export class BackendStack extends cdk.Stack {
                 actions: [
                     's3:GetObject',
                     's3:PutObject',
-                    's3:ListBucket'
+                    's3:ListBucket',
+                    's3:AbortMultipartUpload',
+                    's3:DeleteObject'
                 ],
                 resources: [
                     this.bucket.bucketArn,
@@ -203,6 +228,13 @@ export class BackendStack extends cdk.Stack {
             }).stringValue
         );
 
+        // Layer with helpers shared by the Lambda functions (lambda/layers/common/python)
+        const commonLayer = new lambda.LayerVersion(this, 'CommonLayer', {
+            code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/layers/common')),
+            compatibleRuntimes: [lambda.Runtime.PYTHON_3_13],
+            description: 'Shared helpers for the fraud detection Lambda functions'
+        });
+
         // Layer for synthetic fraud transanction data generation
         const syntheticDataLayer = new lambda.LayerVersion(this, 'syntheticdata', {
             code: lambda.Code.fromAsset(path.join(__dirname, '../lib/layers/fraud_detection_layer.zip'))
@@ -220,9 +252,13 @@ export class BackendStack extends cdk.Stack {
             role: listLambdaRole,
             environment: {
                 S3_BUCKET_NAME: this.bucket.bucketName,
-                S3_FLOW_PREFIX: 'flows'
+                S3_FLOW_PREFIX: 'flows',
+                LISTING_CACHE_TTL_SECONDS: '30',
+                FULL_LISTING_SECONDS: '300',
+                LISTING_COALESCE_SECONDS: '5'
             },
-            timeout: cdk.Duration.minutes(1)
+            timeout: cdk.Duration.minutes(1),
+            layers: [commonLayer]
         });
 
         new lambda.Function(this, 'ListReportsUriFunction', {
@@ -233,9 +269,13 @@ export class BackendStack extends cdk.Stack {
             role: listLambdaRole,
             environment: {
                 S3_BUCKET_NAME: this.bucket.bucketName,
-                S3_DATA_PREFIX: 'reports'
+                S3_DATA_PREFIX: 'reports',
+                LISTING_CACHE_TTL_SECONDS: '30',
+                FULL_LISTING_SECONDS: '300',
+                LISTING_COALESCE_SECONDS: '5'
             },
-            timeout: cdk.Duration.minutes(1)
+            timeout: cdk.Duration.minutes(1),
+            layers: [commonLayer]
         });
 
         new lambda.Function(this, 'ListS3UriFunction', {
@@ -246,12 +286,71 @@ export class BackendStack extends cdk.Stack {
             role: listLambdaRole,
             environment: {
                 S3_BUCKET_NAME: this.bucket.bucketName,
-                S3_DATA_PREFIX: 'input_data'
+                S3_DATA_PREFIX: 'input_data',
+                LISTING_CACHE_TTL_SECONDS: '30',
+                FULL_LISTING_SECONDS: '300',
+                LISTING_COALESCE_SECONDS: '5'
+            },
+            timeout: cdk.Duration.minutes(1),
+            layers: [commonLayer]
+        });
+
+        new lambda.Function(this, 'ListAllUriFunction', {
+            functionName: 'fraud-list-all-uri',
+            runtime: lambda.Runtime.PYTHON_3_13,
+            handler: 'list_all_uri.lambda_handler',
+            code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/list/all')),
+            role: listLambdaRole,
+            environment: {
+                S3_BUCKET_NAME: this.bucket.bucketName,
+                LISTING_CACHE_TTL_SECONDS: '30',
+                FULL_LISTING_SECONDS: '300',
+                LISTING_COALESCE_SECONDS: '5'
             },
-            timeout: cdk.Duration.minutes(1)
+            timeout: cdk.Duration.minutes(1),
+            layers: [commonLayer]
         });
 
 
+        // Object index: size, rows and columns of listed objects, updated as objects land
+        const objectIndexFunction = new lambda.Function(this, 'ObjectIndexFunction', {
+            functionName: 'fraud-object-index',
+            runtime: lambda.Runtime.PYTHON_3_13,
+            handler: 'object_events.lambda_handler',
+            code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/list/index')),
+            role: listLambdaRole,
+            environment: {
+                S3_BUCKET_NAME: this.bucket.bucketName
+            },
+            timeout: cdk.Duration.minutes(1),
+            // Index updates are read-modify-write of one sidecar per index shard
+            reservedConcurrentExecutions: 1,
+            layers: [commonLayer]
+        });
+
+        new events.Rule(this, 'ObjectIndexRule', {
+            description: 'Object events of the listed objects for the object index',
+            eventPattern: {
+                source: ['aws.s3'],
+                detailType: ['Object Created', 'Object Deleted'],
+                detail: {
+                    bucket: { name: [this.bucket.bucketName] },
+                    object: {
+                        // Only keys the list operations serve, and the column stats of datasets;
+                        // keep in line with LIST_OPERATIONS in listing.py
+                        key: [
+                            { wildcard: 'input_data*.csv' },
+                            { wildcard: 'flows*.flow' },
+                            { wildcard: 'processor_output/*data_wrangler_visualization_job.json' },
+                            { wildcard: 'processor_output/*local_insights_report.json' },
+                            { wildcard: '_sidecars/column_stats/input_data*.csv.json' }
+                        ]
+                    }
+                }
+            },
+            targets: [new eventsTargets.LambdaFunction(objectIndexFunction)]
+        });
+
         // Functions called by Data Analysis Agent
         const processingFunction = new lambda.Function(this, 'ProcessingFunction', {
             functionName: 'fraud-processing',
@@ -263,11 +362,20 @@ export class BackendStack extends cdk.Stack {
                 BUCKET_NAME: this.bucket.bucketName,
                 SAGEMAKER_ROLE_ARN: analysisLambdaRole.roleArn,
                 CONTAINER_URI: '663277389841.dkr.ecr.us-east-1.amazonaws.com/sagemaker-data-wrangler-container:5.0.9',
-                INSTANCE_COUNT: '2',
-                INSTANCE_TYPE: 'ml.m5.4xlarge',
-                VOLUME_SIZE: '30'
+                // Job resources are sized per dataset; set INSTANCE_COUNT, INSTANCE_TYPE or VOLUME_SIZE to pin them
+                SIZING_MAX_INSTANCE_COUNT: '10',
+                LOCAL_INSIGHTS_MAX_BYTES: '104857600',
+                INPUT_DISTRIBUTION: 'auto',
+                SHARDS_PER_INSTANCE: '2',
+                STATUS_CACHE_TTL_SECONDS: '60',
+                REPORT_MAX_BYTES: '20000',
+                REPORT_TOP_K_COLUMNS: '10',
+                REPORT_CACHE_MAX_BYTES: '67108864',
+                PROFILE_WORKERS: '4'
             },
-            timeout: cdk.Duration.minutes(5)
+            timeout: cdk.Duration.minutes(5),
+            memorySize: 3008,
+            layers: [pandasLayer, commonLayer]
         });
 
         const processingFunc = new AgentActionGroup({
@@ -288,11 +396,10 @@ export class BackendStack extends cdk.Stack {
             environment: {
                 BUCKET_NAME: this.bucket.bucketName,
                 SAMPLE_SIZE: '10000',
-                INSTANCE_TYPE: 'ml.m5.xlarge',
-                INSTANCE_COUNT: '2'
+                SIZING_MAX_INSTANCE_COUNT: '10'
             },
             memorySize: 1024,
-            layers: [pandasLayer]
+            layers: [pandasLayer, commonLayer]
         });
 
         const flowFunction = new AgentActionGroup({
@@ -309,7 +416,7 @@ export class BackendStack extends cdk.Stack {
             runtime: lambda.Runtime.PYTHON_3_13,
             handler: 'lambda_function.lambda_handler',
             code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/transform/synthetic')),
-            layers: [syntheticDataLayer],
+            layers: [syntheticDataLayer, commonLayer],
             role: fraudTransformLambdaRole,
             timeout: cdk.Duration.minutes(5),
             memorySize: 10240,
@@ -330,7 +437,7 @@ export class BackendStack extends cdk.Stack {
             handler: "lambda_function.lambda_handler",
             runtime: lambda.Runtime.PYTHON_3_13,
             code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/transform/drop')),
-            layers: [pandasLayer],
+            layers: [pandasLayer, commonLayer],
             role: fraudTransformLambdaRole,
             memorySize: 10240,
             ephemeralStorageSize: cdk.Size.gibibytes(10),
@@ -351,7 +458,7 @@ export class BackendStack extends cdk.Stack {
             handler: "lambda_function.lambda_handler",
             runtime: lambda.Runtime.PYTHON_3_13,
             code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/transform/converttime')),
-            layers: [pandasLayer],
+            layers: [pandasLayer, commonLayer],
             role: fraudTransformLambdaRole,
             memorySize: 10240,
             ephemeralStorageSize: cdk.Size.gibibytes(10),
@@ -372,7 +479,7 @@ export class BackendStack extends cdk.Stack {
             handler: "lambda_function.lambda_handler",
             runtime: lambda.Runtime.PYTHON_3_13,
             code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/transform/symbolremoval')),
-            layers: [pandasLayer],
+            layers: [pandasLayer, commonLayer],
             role: fraudTransformLambdaRole,
             memorySize: 10240,
             ephemeralStorageSize: cdk.Size.gibibytes(10),
@@ -393,7 +500,7 @@ export class BackendStack extends cdk.Stack {
             handler: "lambda_function.lambda_handler",
             runtime: lambda.Runtime.PYTHON_3_13,
             code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/transform/text2lower')),
-            layers: [pandasLayer],
+            layers: [pandasLayer, commonLayer],
             role: fraudTransformLambdaRole,
             memorySize: 10240,
             ephemeralStorageSize: cdk.Size.gibibytes(10),
@@ -414,7 +521,7 @@ export class BackendStack extends cdk.Stack {
             handler: "lambda_function.lambda_handler",
             runtime: lambda.Runtime.PYTHON_3_13,
             code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/transform/eventtime')),
-            layers: [pandasLayer],
+            layers: [pandasLayer, commonLayer],
             role: fraudTransformLambdaRole,
             memorySize: 10240,
             ephemeralStorageSize: cdk.Size.gibibytes(10),
@@ -435,7 +542,7 @@ export class BackendStack extends cdk.Stack {
             handler: "lambda_function.lambda_handler",
             runtime: lambda.Runtime.PYTHON_3_13,
             code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/transform/convert2long')),
-            layers: [pandasLayer],
+            layers: [pandasLayer, commonLayer],
             role: fraudTransformLambdaRole,
             memorySize: 10240,
             ephemeralStorageSize: cdk.Size.gibibytes(10),
@@ -456,7 +563,7 @@ export class BackendStack extends cdk.Stack {
             handler: "lambda_function.lambda_handler",
             runtime: lambda.Runtime.PYTHON_3_13,
             code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/transform/onehotencode')),
-            layers: [pandasLayer],
+            layers: [pandasLayer, commonLayer],
             role: fraudTransformLambdaRole,
             memorySize: 10240,
             ephemeralStorageSize: cdk.Size.gibibytes(10),
@@ -477,7 +584,7 @@ export class BackendStack extends cdk.Stack {
             handler: "lambda_function.lambda_handler",
             runtime: lambda.Runtime.PYTHON_3_13,
             code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/transform/cat2ord')),
-            layers: [pandasLayer],
+            layers: [pandasLayer, commonLayer],
             role: fraudTransformLambdaRole,
             memorySize: 10240,
             ephemeralStorageSize: cdk.Size.gibibytes(10),
@@ -492,6 +599,90 @@ export class BackendStack extends cdk.Stack {
             apiSchema: bedrock.ApiSchema.fromLocalAsset(path.join(__dirname, '../lib/openapi/cardinal2ord.yaml')),
         });
 
+        const geovelocityfunction = new lambda.Function(this, 'GeoVelocityFunction', {
+            functionName: "geo_velocity",
+            description: "Geo-Velocity Feature Lambda Function",
+            handler: "lambda_function.lambda_handler",
+            runtime: lambda.Runtime.PYTHON_3_13,
+            code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/transform/geovelocity')),
+            layers: [pandasLayer, commonLayer],
+            role: fraudTransformLambdaRole,
+            memorySize: 10240,
+            ephemeralStorageSize: cdk.Size.gibibytes(10),
+            timeout: cdk.Duration.minutes(5).plus(cdk.Duration.seconds(3))
+        });
+
+        const geovelocity = new AgentActionGroup({
+            name: 'geo_velocity',
+            description: 'Use this function to add distance, speed and impossible travel features between consecutive transactions of the same entity.',
+            executor: bedrock.ActionGroupExecutor.fromlambdaFunction(geovelocityfunction),
+            enabled: true,
+            apiSchema: bedrock.ApiSchema.fromLocalAsset(path.join(__dirname, '../lib/openapi/geovelocity.yaml')),
+        });
+
+        const splitdatafunction = new lambda.Function(this, 'SplitDataFunction', {
+            functionName: "split_data",
+            description: "Train/Validation/Test Split Lambda Function",
+            handler: "lambda_function.lambda_handler",
+            runtime: lambda.Runtime.PYTHON_3_13,
+            code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/transform/split')),
+            layers: [pandasLayer, commonLayer],
+            role: fraudTransformLambdaRole,
+            memorySize: 10240,
+            ephemeralStorageSize: cdk.Size.gibibytes(10),
+            timeout: cdk.Duration.minutes(5).plus(cdk.Duration.seconds(3))
+        });
+
+        const splitdata = new AgentActionGroup({
+            name: 'split_data',
+            description: 'Use this function to split data into train, validation and test sets by event time.',
+            executor: bedrock.ActionGroupExecutor.fromlambdaFunction(splitdatafunction),
+            enabled: true,
+            apiSchema: bedrock.ApiSchema.fromLocalAsset(path.join(__dirname, '../lib/openapi/split.yaml')),
+        });
+
+        const rebalanceclassesfunction = new lambda.Function(this, 'RebalanceFunction', {
+            functionName: "rebalance_classes",
+            description: "Class Rebalancing Lambda Function",
+            handler: "lambda_function.lambda_handler",
+            runtime: lambda.Runtime.PYTHON_3_13,
+            code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/transform/rebalance')),
+            layers: [pandasLayer, commonLayer],
+            role: fraudTransformLambdaRole,
+            memorySize: 10240,
+            ephemeralStorageSize: cdk.Size.gibibytes(10),
+            timeout: cdk.Duration.minutes(5).plus(cdk.Duration.seconds(3))
+        });
+
+        const rebalanceclasses = new AgentActionGroup({
+            name: 'rebalance_classes',
+            description: 'Use this function to rebalance fraud and non-fraud classes by undersampling and SMOTE oversampling.',
+            executor: bedrock.ActionGroupExecutor.fromlambdaFunction(rebalanceclassesfunction),
+            enabled: true,
+            apiSchema: bedrock.ApiSchema.fromLocalAsset(path.join(__dirname, '../lib/openapi/rebalance.yaml')),
+        });
+
+        const dedupeventsfunction = new lambda.Function(this, 'DedupEventsFunction', {
+            functionName: "dedup_events",
+            description: "Event Deduplication Lambda Function",
+            handler: "lambda_function.lambda_handler",
+            runtime: lambda.Runtime.PYTHON_3_13,
+            code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/transform/dedup')),
+            layers: [pandasLayer, commonLayer],
+            role: fraudTransformLambdaRole,
+            memorySize: 10240,
+            ephemeralStorageSize: cdk.Size.gibibytes(10),
+            timeout: cdk.Duration.minutes(5).plus(cdk.Duration.seconds(3))
+        });
+
+        const dedupevents = new AgentActionGroup({
+            name: 'dedup_events',
+            description: 'Use this function to remove duplicate event_id rows, optionally against earlier batches.',
+            executor: bedrock.ActionGroupExecutor.fromlambdaFunction(dedupeventsfunction),
+            enabled: true,
+            apiSchema: bedrock.ApiSchema.fromLocalAsset(path.join(__dirname, '../lib/openapi/dedup.yaml')),
+        });
+
         /*
         Bedrock Worker Agents
         Data Analyst Agent
@@ -561,7 +752,11 @@ export class BackendStack extends cdk.Stack {
                     onehotencodefunction.functionArn,
                     symbolremovalfunction.functionArn,
                     syntheticDataFunction.functionArn,
-                    text2lowerfunction.functionArn
+                    text2lowerfunction.functionArn,
+                    geovelocityfunction.functionArn,
+                    splitdatafunction.functionArn,
+                    rebalanceclassesfunction.functionArn,
+                    dedupeventsfunction.functionArn
                 ]
             })
         );
@@ -644,6 +839,34 @@ export class BackendStack extends cdk.Stack {
         });
         transformAgent.addActionGroup(dropcol);
 
+        geovelocityfunction.addPermission('BedrockTransformAgentInvokePermission', {
+            principal: new iam.ServicePrincipal('bedrock.amazonaws.com'),
+            action: 'lambda:InvokeFunction',
+            sourceArn: transformAgent.agentArn
+        });
+        transformAgent.addActionGroup(geovelocity);
+
+        splitdatafunction.addPermission('BedrockTransformAgentInvokePermission', {
+            principal: new iam.ServicePrincipal('bedrock.amazonaws.com'),
+            action: 'lambda:InvokeFunction',
+            sourceArn: transformAgent.agentArn
+        });
+        transformAgent.addActionGroup(splitdata);
+
+        rebalanceclassesfunction.addPermission('BedrockTransformAgentInvokePermission', {
+            principal: new iam.ServicePrincipal('bedrock.amazonaws.com'),
+            action: 'lambda:InvokeFunction',
+            sourceArn: transformAgent.agentArn
+        });
+        transformAgent.addActionGroup(rebalanceclasses);
+
+        dedupeventsfunction.addPermission('BedrockTransformAgentInvokePermission', {
+            principal: new iam.ServicePrincipal('bedrock.amazonaws.com'),
+            action: 'lambda:InvokeFunction',
+            sourceArn: transformAgent.agentArn
+        });
+        transformAgent.addActionGroup(dedupevents);
+
 
         // Supervisor Agent
         const bedrockSupervisorAgentRole = new iam.Role(this, 'BedrockSupervisorAgentRole', {
@@ -793,6 +1016,24 @@ export class BackendStack extends cdk.Stack {
             })
         );
 
+        webSocketLambdaRole.addToPolicy(
+            new iam.PolicyStatement({
+                effect: iam.Effect.ALLOW,
+                actions: ['s3:ListBucket'],
+                resources: [this.bucket.bucketArn]
+            })
+        );
+
+        // Listing indexes are persisted as sidecars; list messages read nothing else.
+        // The role is shared with the Bedrock streaming handler, so no wider object access.
+        webSocketLambdaRole.addToPolicy(
+            new iam.PolicyStatement({
+                effect: iam.Effect.ALLOW,
+                actions: ['s3:GetObject', 's3:PutObject'],
+                resources: [`${this.bucket.bucketArn}/_sidecars/*`]
+            })
+        );
+
         // WebSocket Connect Handler
         const webSocketConnectHandler = new lambda.Function(this, 'WebSocketConnectHandler', {
             functionName: 'fraud-websocket-connect',
@@ -820,7 +1061,15 @@ export class BackendStack extends cdk.Stack {
             handler: 'message_handler.lambda_handler',
             code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/websocket')),
             role: webSocketLambdaRole,
-            timeout: cdk.Duration.seconds(30)
+            environment: {
+                // List operations are served in-process from the shared listing index
+                S3_BUCKET_NAME: this.bucket.bucketName,
+                LISTING_CACHE_TTL_SECONDS: '30',
+                FULL_LISTING_SECONDS: '300',
+                LISTING_COALESCE_SECONDS: '5'
+            },
+            timeout: cdk.Duration.seconds(30),
+            layers: [commonLayer]
         });
 
         // Streaming Chat Handler (modified version of existing chat handler for WebSocket streaming)
@@ -835,7 +1084,8 @@ export class BackendStack extends cdk.Stack {
                 BEDROCK_AGENT_ID: supervisorAgent.agentId,
                 BEDROCK_AGENT_ALIAS_ID: supervisorAgentAlias.aliasId
             },
-            timeout: cdk.Duration.minutes(15) // Longer timeout for streaming
+            timeout: cdk.Duration.minutes(15), // Longer timeout for streaming
+            layers: [commonLayer]
         });
 
         // WebSocket API
@@ -866,6 +1116,43 @@ export class BackendStack extends cdk.Stack {
 
         streamingChatHandler.addEnvironment('WEBSOCKET_API_ENDPOINT', `https://${webSocketApi.apiId}.execute-api.${this.region}.amazonaws.com/${webSocketStage.stageName}`);
 
+        // Job tracker: applies SageMaker processing job state changes to the tracked jobs
+        // and notifies the websocket connection that started a job when it finishes
+        analysisLambdaRole.addToPolicy(
+            new iam.PolicyStatement({
+                effect: iam.Effect.ALLOW,
+                actions: [
+                    'execute-api:ManageConnections'
+                ],
+                resources: [`arn:aws:execute-api:${this.region}:${this.account}:${webSocketApi.apiId}/*`]
+            })
+        );
+
+        const jobEventsFunction = new lambda.Function(this, 'JobEventsFunction', {
+            functionName: 'fraud-job-events',
+            runtime: lambda.Runtime.PYTHON_3_13,
+            handler: 'job_events.lambda_handler',
+            code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/analysis/jobs')),
+            role: analysisLambdaRole,
+            environment: {
+                BUCKET_NAME: this.bucket.bucketName
+            },
+            timeout: cdk.Duration.minutes(1),
+            layers: [commonLayer]
+        });
+
+        new events.Rule(this, 'ProcessingJobStateChangeRule', {
+            description: 'Processing job state changes for the job tracker',
+            eventPattern: {
+                source: ['aws.sagemaker'],
+                detailType: ['SageMaker Processing Job State Change'],
+                detail: {
+                    ProcessingJobName: [{ prefix: 'fraud-detection-' }]
+                }
+            },
+            targets: [new eventsTargets.LambdaFunction(jobEventsFunction)]
+        });
+
         // Grant permissions for WebSocket API to invoke Lambda functions
         webSocketConnectHandler.addPermission('WebSocketApiInvokeConnect', {
             principal: new iam.ServicePrincipal('apigateway.amazonaws.com'),
@@ -9,12 +9,21 @@ AVAILABLE FUNCTIONS:
      * input_s3_uri: S3 URI of the input data file
      * target_column: Name of the target column for prediction
      * problem_type: "Classification" or "Regression"
+   - Optional Parameters:
+     * sampling_strategy: "random" (default), "first_k", "stratified" (by target_column, for rare classes such as fraud) or "reservoir"
+     * sample_size: Number of rows to sample
+     * transform_steps: Comma separated transforms to run inside the flow, e.g. "drop,cat2ord,converttime". Prefer this over separate transformation steps for large datasets
    - Action: EXECUTE IMMEDIATELY, respond "Data Wrangler flow file created successfully"
+   - For stratified and reservoir sampling, use the returned datasetS3Uri as transactions_s3_uri of create_data_quality_insight
 
 2. analyze_report (from fraud_processing_job action group)
    - Purpose: Analyze existing reports from S3
    - Required Parameters:
      * report_uri: S3 URI of the report to analyze
+   - Optional Parameters:
+     * sections: comma separated sections or paths (e.g. "columns.amount") for follow-up questions about parts of the report
+     * columns: extra columns to include; top_k: number of columns by feature importance
+   - Large reports are returned in part; the projection field lists what was skipped, request it with sections or columns when needed
    - Action: EXECUTE IMMEDIATELY, provide comprehensive detailed analysis with:
      * Column statistics (mean, median, std dev, missing values, data types)
      * Data quality assessment (outliers, anomalies, completeness)
@@ -30,10 +39,41 @@ AVAILABLE FUNCTIONS:
      * flow_s3_uri: S3 URI of the flow file
      * transactions_s3_uri: S3 URI of the transactions file
    - Action: EXECUTE IMMEDIATELY, respond "Data quality insight job created successfully"
+   - Small datasets are profiled immediately: when the status is "Completed", share the returned reportUri so it can be analyzed right away
+   - Running jobs notify the chat when the report is ready; there is no need to poll
+
+4. compare_reports (from fraud_processing_job action group)
+   - Purpose: Compare data quality across reports, e.g. raw vs transformed data or weekly batches
+   - Required Parameters:
+     * report_uris: comma separated report URIs, baseline first
+   - Action: EXECUTE IMMEDIATELY in one call instead of analyzing each report; explain the flagged columns, added or removed columns and class balance shifts
+
+5. profile_dataset (from fraud_processing_job action group)
+   - Purpose: Quick approximate statistics of large datasets: distinct counts, quantiles, frequent values
+   - Required Parameters:
+     * s3_uri: S3 URI of the dataset
+   - Optional Parameters: columns, top_k
+   - Action: EXECUTE IMMEDIATELY; use encoding_hint to recommend one-hot (onehot) or ordinal (cat2ord) encoding, and say the figures are estimates
+
+6. detect_drift (from fraud_processing_job action group)
+   - Purpose: Check whether a new dataset drifted from a reference dataset, e.g. this week's transactions vs the training data
+   - Required Parameters:
+     * reference_s3_uri: S3 URI of the reference dataset
+     * current_s3_uri: S3 URI of the dataset to check
+   - Optional Parameters: columns
+   - Action: EXECUTE IMMEDIATELY; report the drifted columns with their PSI, KS and JS values and the largest category shifts, and recommend retraining on major drift
+
+7. get_job_status (from fraud_processing_job action group)
+   - Purpose: Check the status of a data quality insight job
+   - Required Parameters:
+     * job_name: jobName returned by create_data_quality_insight
+   - Action: EXECUTE IMMEDIATELY, report the status; when it is "Completed", share the reportUri so it can be analyzed
 
 CRITICAL RULES:
 - For flow creation: IMMEDIATELY call create_flow function - NO explanations
 - For processing jobs: IMMEDIATELY call create_data_quality_insight - NO explanations
+- For comparing reports: IMMEDIATELY call compare_reports with all report URIs
+- For drift checks between datasets: IMMEDIATELY call detect_drift
 - For report analysis: IMMEDIATELY call analyze_report and provide FULL DETAILED ANALYSIS with all statistics, insights, and recommendations
 - Always format responses using proper markdown syntax when requested
 - Never respond with just "Analysis completed successfully" - always provide the actual analysis results`
@@ -75,6 +115,10 @@ Available Transformation Functions:
 - convert_to_long: Reshape data from wide to long format
 - one_hot_encode: Convert categorical variables to binary vectors
 - categorical_to_ordinal: Convert categorical data to numerical ordinal values
+- geo_velocity: Add distance, speed and impossible travel features between consecutive transactions of the same entity
+- split_data: Split data into train, validation and test sets by event time in a single streaming pass
+- rebalance_classes: Rebalance rare fraud labels by undersampling the majority class and SMOTE-oversampling the minority class
+- dedup_events: Remove duplicate event_id rows with a streaming Bloom filter, optionally against earlier batches
 - generate_sample_data: Create sample transaction data with specified parameters
     Parameters:
     - num_records: Number of sample transactions to generate
@@ -231,7 +275,27 @@ Available Transformation Functions:
    - Purpose: Convert categorical data to numerical ordinal values
    - When to use: For algorithms that require numerical inputs
    - Parameters: input file, output file
-9.. generate_sample_data
+9. geo_velocity
+   - Purpose: Compute distance, elapsed time and implied speed between consecutive transactions of the same entity and flag impossible travel
+   - When to use: For location-based fraud signals from billing_latitude and billing_longitude
+   - Parameters: input file, output file, optional entity_column, optional max_speed_kmh
+
+10. split_data
+   - Purpose: Split data into time-ordered train, validation and test files in a single pass over the input
+   - When to use: For preparing leakage-free training data split by event_timestamp, optionally stratified by is_fraud
+   - Parameters: input file, output path, optional train_end and validation_end cutoffs or train_ratio and validation_ratio, optional stratify and stratify_column
+
+11. rebalance_classes
+   - Purpose: Undersample the majority class in a single streaming pass and oversample the minority class with SMOTE-style interpolation on numeric columns
+   - When to use: For imported datasets where fraud is too rare to train on
+   - Parameters: input file, output file, optional label_column, target_ratio, oversample_factor, majority_sample_rate, minority_label, seed
+
+12. dedup_events
+   - Purpose: Remove duplicate events in a single streaming pass using a Bloom filter with an exact check on suspected hits
+   - When to use: For merged exports that contain repeated event_id rows, or incremental batches that overlap earlier loads
+   - Parameters: input file, output file, optional key_column, false_positive_rate, expected_items, filter_s3_path
+
+13. generate_sample_data
    - Purpose: Create sample transaction data with specified parameters
    - When to use: For generating synthetic data for testing and validation
    - Parameters: num_records, anomaly_ratio, output_s3_path
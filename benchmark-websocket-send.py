@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Per-message latency of WebSocket sends: a new API Gateway management client per
+message (how the handlers used to send) against the pooled client registry in
+backend/lambda/layers/common/python/websocket_clients.py.
+
+By default messages go to a local endpoint that answers like post_to_connection, so
+the numbers isolate client creation and connection reuse. Pass --endpoint and
+--connection-id of a live WebSocket API (https://{api-id}.execute-api.{region}.amazonaws.com/{stage})
+to measure against API Gateway, TLS handshakes included.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'backend', 'lambda', 'layers', 'common', 'python'))
+from websocket_clients import get_management_client  # noqa: E402
+
+
+class ConnectionsHandler(BaseHTTPRequestHandler):
+    """Answers POST /@connections/{id} as API Gateway does"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_local_endpoint():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ConnectionsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # Requests are signed even locally
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def send_new_client(endpoint, connection_id, data):
+    client = boto3.client('apigatewaymanagementapi', endpoint_url=endpoint)
+    client.post_to_connection(ConnectionId=connection_id, Data=data)
+
+
+def send_pooled(endpoint, connection_id, data):
+    get_management_client(endpoint).post_to_connection(ConnectionId=connection_id, Data=data)
+
+
+def measure(send, endpoint, connection_id, messages):
+    data = json.dumps({'type': 'status', 'message': 'x' * 200})
+    send(endpoint, connection_id, data)  # warm up imports and credentials
+    latencies = []
+    for _ in range(messages):
+        start = time.perf_counter()
+        send(endpoint, connection_id, data)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        'mean': statistics.mean(latencies),
+        'p50': latencies[len(latencies) // 2],
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'max': latencies[-1]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--endpoint', help='WebSocket API endpoint; a local one by default')
+    parser.add_argument('--connection-id', default='benchmark', help='Open connection to send to')
+    parser.add_argument('--messages', type=int, default=200, help='Messages sent per variant')
+    args = parser.parse_args()
+
+    server, endpoint = (None, args.endpoint) if args.endpoint else start_local_endpoint()
+    print(f"Sending {args.messages} messages per variant to {endpoint}")
+    print(f"{'variant':<22}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    results = {}
+    for name, send in (('client per message', send_new_client), ('pooled client', send_pooled)):
+        results[name] = measure(send, endpoint, args.connection_id, args.messages)
+        r = results[name]
+        print(f"{name:<22}{r['mean']:>10.2f}{r['p50']:>10.2f}{r['p95']:>10.2f}{r['max']:>10.2f}")
+    speedup = results['client per message']['mean'] / results['pooled client']['mean']
+    print(f"Pooled sends are {speedup:.1f}x faster on average")
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
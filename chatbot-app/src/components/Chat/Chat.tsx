@@ -1,6 +1,6 @@
 import React, { useState, useRef, useEffect, useCallback } from 'react';
 import { useLocation } from 'react-router-dom';
-import { sendMessageViaWebSocket, disconnectWebSocket } from '../../services/api';
+import { sendMessageViaWebSocket, disconnectWebSocket, onJobStatus } from '../../services/api';
 import { useAuth } from 'react-oidc-context';
 import ReactMarkdown from 'react-markdown';
 
@@ -117,6 +117,17 @@ const Chat: React.FC = () => {
         };
     }, []);
 
+    useEffect(() => {
+        return onJobStatus(notification => {
+            setMessages(prev => [...prev, {
+                id: `${notification.jobName}-${notification.status}`,
+                content: notification.message,
+                sender: 'bot',
+                timestamp: new Date()
+            }]);
+        });
+    }, []);
+
     useEffect(() => {
         hasSubmitted.current = false;
         const quickAction = location.state?.quickAction;
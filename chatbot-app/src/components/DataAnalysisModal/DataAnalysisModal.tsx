@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { listS3URIs, listFlowURIs } from '../../services/api';
+import { listAllURIs } from '../../services/api';
 import './DataAnalysisModal.css';
 
 interface DataAnalysisModalProps {
@@ -32,10 +32,7 @@ const DataAnalysisModal: React.FC<DataAnalysisModalProps> = ({ isOpen, onClose,
             setSelectedS3URI('');
             setSelectedFlowURI('');
 
-            const [s3Data, flowData] = await Promise.all([
-                listS3URIs(),
-                listFlowURIs()
-            ]);
+            const { uris: s3Data, flows: flowData } = await listAllURIs();
             setS3URIs(s3Data);
             setFlowURIs(flowData);
             // Only set default selections if we have data
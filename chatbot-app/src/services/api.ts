@@ -1,5 +1,5 @@
 interface WebSocketMessage {
-    type: 'status' | 'chunk' | 'complete' | 'error' | 'trace';
+    type: 'status' | 'chunk' | 'complete' | 'error' | 'trace' | 'jobStatus';
     content?: string;
     message?: string;
     error?: string;
@@ -10,14 +10,32 @@ interface WebSocketMessage {
     trace?: any;
 }
 
+// Pushed by the job tracker when a data quality insight job finishes
+export interface JobStatusNotification {
+    type: 'jobStatus';
+    jobName: string;
+    status: string;
+    reportUri?: string;
+    resultsPath?: string;
+    message: string;
+    timestamp: string;
+}
+
 // Configuration for API endpoints
 const API_CONFIG = {
     CHAT_ENDPOINT: process.env.REACT_APP_API_GATEWAY_ENDPOINT || '',
     WEBSOCKET_ENDPOINT: process.env.REACT_APP_WEBSOCKET_ENDPOINT || ''
 };
 
-// WebSocket-based list operations
-const sendListRequest = (operation: string): Promise<string[]> => {
+// Datasets, flows and reports returned together by the listAll operation
+export interface AllURIs {
+    uris: string[];
+    flows: string[];
+    reports: string[];
+}
+
+// WebSocket-based list operations; resolves with the response body
+const requestList = (operation: string): Promise<any> => {
     return new Promise(async (resolve, reject) => {
         try {
             const ws = await connectWebSocket();
@@ -30,34 +48,15 @@ const sendListRequest = (operation: string): Promise<string[]> => {
                         ws.removeEventListener('message', messageHandler);
 
                         if (data.success) {
-                            // Handle different response formats from the Lambda functions
-                            let items: string[] = [];
-
-                            if (Array.isArray(data.data)) {
-                                items = data.data;
-                            } else if (data.data) {
-                                // Handle JSON response body - data.data is always a string from the backend
-                                let responseBody;
+                            let responseBody = data.data;
+                            if (typeof responseBody === 'string') {
                                 try {
-                                    responseBody = typeof data.data === 'string' ? JSON.parse(data.data) : data.data;
+                                    responseBody = JSON.parse(responseBody);
                                 } catch (parseError) {
                                     console.error('Error parsing data.data:', parseError);
-                                    responseBody = data.data;
-                                }
-
-                                if (operation === 'listS3URIs' && responseBody.uris) {
-                                    items = responseBody.uris;
-                                } else if (operation === 'listFlowURIs' && responseBody.flows) {
-                                    items = responseBody.flows;
-                                } else if (operation === 'listReportURIs' && responseBody.reports) {
-                                    items = responseBody.reports;
-                                } else if (Array.isArray(responseBody)) {
-                                    items = responseBody;
                                 }
                             }
-
-                            console.log(`${operation} resolved with items:`, items);
-                            resolve(items);
+                            resolve(responseBody);
                         } else {
                             reject(new Error(data.error || 'List operation failed'));
                         }
@@ -91,6 +90,27 @@ const sendListRequest = (operation: string): Promise<string[]> => {
     });
 };
 
+const sendListRequest = async (operation: string): Promise<string[]> => {
+    const responseBody = await requestList(operation);
+
+    // Handle different response formats from the list operations
+    let items: string[] = [];
+    if (Array.isArray(responseBody)) {
+        items = responseBody;
+    } else if (responseBody) {
+        if (operation === 'listS3URIs' && responseBody.uris) {
+            items = responseBody.uris;
+        } else if (operation === 'listFlowURIs' && responseBody.flows) {
+            items = responseBody.flows;
+        } else if (operation === 'listReportURIs' && responseBody.reports) {
+            items = responseBody.reports;
+        }
+    }
+
+    console.log(`${operation} resolved with items:`, items);
+    return items;
+};
+
 export const listS3URIs = async (): Promise<string[]> => {
     try {
         return await sendListRequest('listS3URIs');
@@ -118,11 +138,46 @@ export const listReportURIs = async (): Promise<string[]> => {
     }
 };
 
+// Datasets, flows and reports in one round trip
+export const listAllURIs = async (): Promise<AllURIs> => {
+    try {
+        const responseBody = await requestList('listAll');
+        return {
+            uris: responseBody?.uris || [],
+            flows: responseBody?.flows || [],
+            reports: responseBody?.reports || []
+        };
+    } catch (error) {
+        console.error('Error fetching URIs:', error);
+        return { uris: [], flows: [], reports: [] };
+    }
+};
+
 // WebSocket connection management
 let webSocket: WebSocket | null = null;
 let reconnectAttempts = 0;
 const maxReconnectAttempts = 5;
 const reconnectDelay = 1000; // Start with 1 second
+const jobStatusListeners = new Set<(notification: JobStatusNotification) => void>();
+
+const dispatchJobStatus = (event: MessageEvent) => {
+    try {
+        const data = JSON.parse(event.data);
+        if (data.type === 'jobStatus') {
+            jobStatusListeners.forEach(listener => listener(data));
+        }
+    } catch (error) {
+        // Other handlers report malformed messages
+    }
+};
+
+// Subscribe to job completion notifications; returns the unsubscribe function
+export const onJobStatus = (listener: (notification: JobStatusNotification) => void): (() => void) => {
+    jobStatusListeners.add(listener);
+    return () => {
+        jobStatusListeners.delete(listener);
+    };
+};
 
 export const connectWebSocket = (): Promise<WebSocket> => {
     return new Promise((resolve, reject) => {
@@ -138,6 +193,7 @@ export const connectWebSocket = (): Promise<WebSocket> => {
 
         try {
             webSocket = new WebSocket(API_CONFIG.WEBSOCKET_ENDPOINT);
+            webSocket.addEventListener('message', dispatchJobStatus);
 
             webSocket.onopen = () => {
                 console.log('WebSocket connected');
@@ -230,6 +286,10 @@ export const sendMessageViaWebSocket = (
                         console.log('Trace data:', data.trace);
                         break;
 
+                    case 'jobStatus':
+                        // Delivered through onJobStatus
+                        break;
+
                     default:
                         console.warn('Unknown message type:', data.type);
                     }
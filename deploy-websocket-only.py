@@ -6,15 +6,23 @@ import zipfile
 import os
 from pathlib import Path
 
-def create_lambda_zip(source_dir, zip_path):
-    """Create a zip file for Lambda deployment"""
+# Modules the handlers import from the common layer (listing, websocket_clients, ...).
+# Functions deployed by this script have no layer, so they are bundled at the zip root.
+COMMON_LAYER_DIR = Path('./backend/lambda/layers/common/python')
+
+# Same runtime as the functions of the CDK stack
+LAMBDA_RUNTIME = 'python3.13'
+
+def create_lambda_zip(source_dirs, zip_path):
+    """Create a zip file for Lambda deployment with the .py files of every source dir at its root"""
     with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(source_dir):
-            for file in files:
-                if file.endswith('.py'):
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, source_dir)
-                    zipf.write(file_path, arcname)
+        for source_dir in source_dirs:
+            for root, dirs, files in os.walk(source_dir):
+                for file in files:
+                    if file.endswith('.py'):
+                        file_path = os.path.join(root, file)
+                        arcname = os.path.relpath(file_path, source_dir)
+                        zipf.write(file_path, arcname)
 
 def deploy_websocket_functions():
     """Deploy WebSocket Lambda functions without Bedrock dependencies"""
@@ -23,6 +31,11 @@ def deploy_websocket_functions():
     lambda_client = boto3.client('lambda')
     iam_client = boto3.client('iam')
     apigateway_client = boto3.client('apigatewayv2')
+
+    # message_handler serves list messages from the data bucket of the CDK stack
+    account_id = boto3.client('sts').get_caller_identity()['Account']
+    region = boto3.session.Session().region_name or 'us-east-1'
+    bucket_name = os.environ.get('S3_BUCKET_NAME') or f"fraud-detection-{account_id}-{region}"
     
     # Create IAM role for Lambda functions
     trust_policy = {
@@ -63,6 +76,21 @@ def deploy_websocket_functions():
                     "lambda:InvokeFunction"
                 ],
                 "Resource": "*"
+            },
+            {
+                "Effect": "Allow",
+                "Action": [
+                    "s3:ListBucket"
+                ],
+                "Resource": f"arn:aws:s3:::{bucket_name}"
+            },
+            {
+                "Effect": "Allow",
+                "Action": [
+                    "s3:GetObject",
+                    "s3:PutObject"
+                ],
+                "Resource": f"arn:aws:s3:::{bucket_name}/_sidecars/*"
             }
         ]
     }
@@ -79,19 +107,19 @@ def deploy_websocket_functions():
         role_arn = role_response['Role']['Arn']
         print(f"Created IAM role: {role_arn}")
         
-        # Attach policy to role
-        iam_client.put_role_policy(
-            RoleName=role_name,
-            PolicyName='WebSocketLambdaPolicy',
-            PolicyDocument=json.dumps(lambda_policy)
-        )
-        print("Attached policy to role")
-        
     except iam_client.exceptions.EntityAlreadyExistsException:
         # Role already exists, get its ARN
         role_response = iam_client.get_role(RoleName=role_name)
         role_arn = role_response['Role']['Arn']
         print(f"Using existing IAM role: {role_arn}")
+
+    # Attach policy to role, also on existing roles so they get new permissions
+    iam_client.put_role_policy(
+        RoleName=role_name,
+        PolicyName='WebSocketLambdaPolicy',
+        PolicyDocument=json.dumps(lambda_policy)
+    )
+    print("Attached policy to role")
     
     # Wait a bit for role to propagate
     import time
@@ -148,7 +176,15 @@ def deploy_websocket_functions():
     # Create zip file for WebSocket functions
     websocket_dir = Path('./backend/lambda/websocket')
     zip_path = '/tmp/websocket_functions.zip'
-    create_lambda_zip(websocket_dir, zip_path)
+    create_lambda_zip([websocket_dir, COMMON_LAYER_DIR], zip_path)
+
+    environment = {
+        'Variables': {
+            'WEBSOCKET_API_ENDPOINT': websocket_endpoint,
+            'STREAMING_CHAT_HANDLER_NAME': 'fraud-websocket-streaming-chat',
+            'S3_BUCKET_NAME': bucket_name
+        }
+    }
     
     with open(zip_path, 'rb') as zip_file:
         zip_content = zip_file.read()
@@ -159,18 +195,13 @@ def deploy_websocket_functions():
             try:
                 lambda_client.create_function(
                     FunctionName=func['name'],
-                    Runtime='python3.9',
+                    Runtime=LAMBDA_RUNTIME,
                     Role=role_arn,
                     Handler=func['handler'],
                     Code={'ZipFile': zip_content},
                     Description=func['description'],
                     Timeout=60,
-                    Environment={
-                        'Variables': {
-                            'WEBSOCKET_API_ENDPOINT': websocket_endpoint,
-                            'STREAMING_CHAT_HANDLER_NAME': 'fraud-websocket-streaming-chat'
-                        }
-                    }
+                    Environment=environment
                 )
                 print(f"Created Lambda function: {func['name']}")
             except lambda_client.exceptions.ResourceConflictException:
@@ -179,14 +210,12 @@ def deploy_websocket_functions():
                     FunctionName=func['name'],
                     ZipFile=zip_content
                 )
+                # Wait for the code update before changing the configuration
+                lambda_client.get_waiter('function_updated_v2').wait(FunctionName=func['name'])
                 lambda_client.update_function_configuration(
                     FunctionName=func['name'],
-                    Environment={
-                        'Variables': {
-                            'WEBSOCKET_API_ENDPOINT': websocket_endpoint,
-                            'STREAMING_CHAT_HANDLER_NAME': 'fraud-websocket-streaming-chat'
-                        }
-                    }
+                    Runtime=LAMBDA_RUNTIME,
+                    Environment=environment
                 )
                 print(f"Updated Lambda function: {func['name']}")
                 